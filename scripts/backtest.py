@@ -0,0 +1,536 @@
+"""
+ベクトル化バックテスト・パラメータスイープ
+テクニカル指標（indicator_registry の計算グラフ）から売買ルールのポジションを作り、パラメータの組み合わせを列とする
+日付×組み合わせの2次元配列で全期間を一括評価する（日ごと・組み合わせごとのPythonループはない）
+
+- ポジションは買い（1）か手仕舞い（0）のみ。シグナルの出た日の終値で売買して翌日から損益に反映し（先読みなし）、
+  売買のたびに手数料を差し引く
+- 移動平均・標準偏差・EMAなどの中間結果は銘柄ごとの計算グラフに保持し、同じ期間を使う組み合わせ・売買ルール間で
+  1回だけ計算する（指標値は build_indicators.py の出力と同じ）
+- 組み合わせは COMBO_BATCH 列ずつ評価してメモリ使用量を抑え、複数銘柄はプロセスプールで並列に処理する
+
+売買ルールとパラメータの範囲は次の形式の文字列（--sweep）またはJSON設定ファイル（--sweep-config）で指定する
+    sma_cross:fast=5:50:5,slow=20:200:10;rsi_reversion:window=14/21
+    （ルール名:パラメータ=値、範囲は 開始:終了:刻み（終了を含む）、複数の値は '/' 区切り、
+      省略したパラメータは既定の範囲、パラメータをすべて省略したルール（例: 'bb_breakout'）は既定の範囲のみ）
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from build_indicators import load_price_frame
+from indicator_registry import INDICATORS, IndicatorGraph
+from storage import FORMATS, get_storage
+from universe import UNIVERSE_KEYWORD, load_universe, resolve_symbols
+
+# 年率換算の営業日数
+TRADING_DAYS = 245
+
+# 売買1回あたりの既定の手数料（ベーシスポイント）
+DEFAULT_FEE_BPS = 10.0
+
+# 一度に評価する組み合わせ数（日付×組み合わせの配列の列数の上限）
+COMBO_BATCH = 1024
+
+# 成績の指標（結果のカラム順）
+METRICS = ['total_return', 'cagr', 'max_drawdown', 'sharpe', 'trades', 'exposure']
+
+
+class Strategy:
+    """レジストリに登録する売買ルールの定義
+
+    Attributes:
+        name: ルール名
+        label: 表示用の名称
+        params: パラメータ名のタプル
+        defaults: パラメータ名 → 既定のスイープ範囲（値のリスト）
+        positions: (IndicatorGraph, パラメータごとの組み合わせ数の長さの配列) → 日付×組み合わせのポジション（真偽値）
+        valid: パラメータごとの配列 → 有効な組み合わせの真偽値配列（Noneの場合は全組み合わせ）
+    """
+
+    def __init__(self, name, label, params, defaults, positions, valid=None):
+        self.name = name
+        self.label = label
+        self.params = params
+        self.defaults = defaults
+        self.positions = positions
+        self.valid = valid
+
+
+STRATEGIES = {}
+
+
+def register_strategy(name, label, params, defaults, positions, valid=None):
+    """売買ルールをレジストリに登録
+
+    positions / valid はパラメータをパラメータ名の順の引数として受け取る
+    """
+    STRATEGIES[name] = Strategy(name, label, tuple(params), defaults, positions, valid)
+
+
+def indicator_column(graph, name, params, column=0):
+    """レジストリの指標を計算グラフ上で計算し、出力カラムの1つを返す
+
+    Args:
+        graph: IndicatorGraph
+        name: 指標名（例: 'sma', 'rsi', 'macd', 'bb'）
+        params: 指標のパラメータ
+        column: 出力カラムの位置（例: MACDの1はシグナル、2はヒストグラム）
+    """
+    params = tuple(np.asarray(p).item() for p in params)
+    indicator = INDICATORS[name]
+    return indicator.compute(graph, *params)[indicator.columns(*params)[column]]
+
+
+def indicator_matrix(graph, name, params, column=0):
+    """組み合わせごとの指標値を日付×組み合わせの配列に並べる（同じパラメータの指標は1回だけ計算）
+
+    Args:
+        graph: IndicatorGraph
+        name / column: indicator_column と同じ
+        params: 指標のパラメータごとの、組み合わせ数の長さの配列
+
+    Returns:
+        日付×組み合わせの配列
+    """
+    keys = list(zip(*(np.asarray(p).tolist() for p in params)))
+    unique = {key: i for i, key in enumerate(dict.fromkeys(keys))}
+    values = np.column_stack([indicator_column(graph, name, key, column).to_numpy(dtype=float) for key in unique])
+    return values[:, [unique[key] for key in keys]]
+
+
+def hold_positions(entry, exit):
+    """エントリーで買い、手仕舞いまでポジションを保持（同じ日は手仕舞いを優先）
+
+    各日の状態（買い / 手仕舞い / 変化なし）を作り、直前の買い・手仕舞いの日の状態を列ごとに前方補完する
+
+    Args:
+        entry: 日付×組み合わせのエントリー条件
+        exit: 日付×組み合わせの手仕舞い条件
+
+    Returns:
+        日付×組み合わせのポジション
+    """
+    rows = np.where(entry | exit, np.arange(len(entry))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return (entry & ~exit)[rows, np.arange(entry.shape[1])]
+
+
+def _close(graph):
+    return graph.nodes['close'].to_numpy(dtype=float)[:, None]
+
+
+def _buy_and_hold(graph):
+    return np.ones((len(graph.nodes['close']), 1), dtype=bool)
+
+
+def _sma_cross(graph, fast, slow):
+    return indicator_matrix(graph, 'sma', (fast,)) > indicator_matrix(graph, 'sma', (slow,))
+
+
+def _macd_cross(graph, fast, slow, signal):
+    return indicator_matrix(graph, 'macd', (fast, slow, signal), column=2) > 0
+
+
+def _rsi_reversion(graph, window, lower, upper):
+    rsi = indicator_matrix(graph, 'rsi', (window,))
+    return hold_positions(rsi < lower, rsi > upper)
+
+
+def _bb_breakout(graph, window, num_std):
+    close = _close(graph)
+    upper = indicator_matrix(graph, 'bb', (window, num_std), column=0)
+    middle = indicator_matrix(graph, 'bb', (window, num_std), column=1)
+    return hold_positions(close > upper, close < middle)
+
+
+register_strategy('buy_and_hold', '買い持ち（比較用）', (), {}, positions=_buy_and_hold)
+register_strategy('sma_cross', 'SMAクロス（短期 > 長期の間は買い）', ('fast', 'slow'),
+                  {'fast': list(range(2, 51)), 'slow': list(range(10, 201, 5))},
+                  positions=_sma_cross, valid=lambda fast, slow: fast < slow)
+register_strategy('macd_cross', 'MACDクロス（MACD > シグナルの間は買い）', ('fast', 'slow', 'signal'),
+                  {'fast': list(range(6, 17, 2)), 'slow': list(range(20, 41, 4)), 'signal': list(range(5, 14, 2))},
+                  positions=_macd_cross, valid=lambda fast, slow, signal: fast < slow)
+register_strategy('rsi_reversion', 'RSI逆張り（lower 未満で買い、upper 超で手仕舞い）', ('window', 'lower', 'upper'),
+                  {'window': [7, 14, 21, 28], 'lower': list(range(15, 41, 5)), 'upper': list(range(60, 86, 5))},
+                  positions=_rsi_reversion, valid=lambda window, lower, upper: lower < upper)
+register_strategy('bb_breakout', 'ボリンジャーバンド順張り（上限超で買い、中心線未満で手仕舞い）', ('window', 'num_std'),
+                  {'window': list(range(10, 61, 5)), 'num_std': [1.5, 2.0, 2.5, 3.0]},
+                  positions=_bb_breakout)
+
+# 既定のスイープ（ルール名 → パラメータ名 → 値のリスト）
+DEFAULT_SWEEP = {name: dict(strategy.defaults) for name, strategy in STRATEGIES.items()}
+
+
+def _parse_number(text):
+    """パラメータ文字列を数値に変換（整数として解釈できる場合は int）"""
+    value = float(text)
+    return int(value) if value.is_integer() and '.' not in text else value
+
+
+def parse_values(text):
+    """パラメータの値の指定（'5:50:5' は 5 から 50 まで 5 刻み、'14/21' は列挙）を値のリストに変換"""
+    if ':' not in text:
+        return [_parse_number(v) for v in text.split('/') if v.strip()]
+    parts = [_parse_number(v) for v in text.split(':')]
+    if len(parts) != 3 or parts[2] <= 0 or parts[1] < parts[0]:
+        raise ValueError(f"範囲は 開始:終了:刻み（刻みは正、終了 >= 開始）で指定してください: {text}")
+    start, stop, step = parts
+    values = start + step * np.arange(int(np.floor((stop - start) / step + 1e-9)) + 1)
+    if all(isinstance(p, int) for p in parts):
+        return values.astype(int).tolist()
+    return [round(float(v), 10) for v in values]
+
+
+def normalize_sweep(sweep):
+    """スイープ設定を検証して ルール名 → パラメータ名 → 値のリスト に揃える（省略したパラメータは既定の範囲）
+
+    Args:
+        sweep: ルール名 → パラメータ名 → 値（数値または値のリスト）、Noneの場合は既定値
+
+    Returns:
+        正規化したスイープ設定
+    """
+    if sweep is None:
+        return DEFAULT_SWEEP
+    normalized = {}
+    for name, grid in sweep.items():
+        if name not in STRATEGIES:
+            raise ValueError(f"未登録の売買ルールです: {name}（登録済み: {', '.join(STRATEGIES)}）")
+        strategy = STRATEGIES[name]
+        grid = grid or {}
+        unknown = set(grid) - set(strategy.params)
+        if unknown:
+            raise ValueError(f"{name} のパラメータではありません: {sorted(unknown)}（{', '.join(strategy.params)}）")
+        normalized[name] = {}
+        for param in strategy.params:
+            values = grid.get(param, strategy.defaults[param])
+            values = list(values) if isinstance(values, (list, tuple)) else [values]
+            if not values or any(v <= 0 for v in values):
+                raise ValueError(f"{name} の {param} が不正です: {values}（正の値を1つ以上）")
+            normalized[name][param] = list(dict.fromkeys(values))
+    if not normalized:
+        raise ValueError("売買ルールが1つも指定されていません")
+    return normalized
+
+
+def parse_sweep_spec(text):
+    """スイープ設定文字列（例: 'sma_cross:fast=5:50:5,slow=20:200:10;rsi_reversion'）を解析"""
+    sweep = {}
+    for item in text.split(';'):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, params = item.partition(':')
+        grid = {}
+        for assignment in params.split(','):
+            if not assignment.strip():
+                continue
+            param, sep, values = assignment.partition('=')
+            if not sep:
+                raise ValueError(f"パラメータは 名前=値 で指定してください: {assignment}")
+            grid[param.strip()] = parse_values(values.strip())
+        sweep[name.strip()] = grid
+    return normalize_sweep(sweep)
+
+
+def load_sweep_config(path):
+    """JSON設定ファイル（例: {"sma_cross": {"fast": [5, 10], "slow": [25, 75]}}）からスイープ設定を読み込み"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return normalize_sweep(json.load(f))
+
+
+def format_params(params, values):
+    """組み合わせの表示（例: 'fast=5,slow=25'）"""
+    return ','.join(f"{param}={value:g}" for param, value in zip(params, values))
+
+
+def expand_grid(name, grid):
+    """パラメータの範囲の全組み合わせ（無効な組み合わせを除く）
+
+    Args:
+        name: ルール名
+        grid: パラメータ名 → 値のリスト
+
+    Returns:
+        パラメータ名 → 組み合わせ数の長さの配列
+    """
+    strategy = STRATEGIES[name]
+    if not strategy.params:
+        return {}
+    mesh = np.meshgrid(*(np.asarray(grid[param]) for param in strategy.params), indexing='ij')
+    combos = {param: values.ravel() for param, values in zip(strategy.params, mesh)}
+    if strategy.valid is not None:
+        mask = np.asarray(strategy.valid(*combos.values()), dtype=bool)
+        combos = {param: values[mask] for param, values in combos.items()}
+    return combos
+
+
+def count_combinations(sweep):
+    """1銘柄あたりの組み合わせ数"""
+    return sum(len(next(iter(combos.values()))) if combos else 1
+               for combos in (expand_grid(name, grid) for name, grid in normalize_sweep(sweep).items()))
+
+
+def evaluate_positions(close, positions, fee_bps=DEFAULT_FEE_BPS):
+    """ポジションから組み合わせごとの成績を一括計算
+
+    Args:
+        close: 日付昇順の終値の配列
+        positions: 日付×組み合わせのポジション（その日の終値で売買し、翌日から損益に反映）
+        fee_bps: 売買1回あたりの手数料（ベーシスポイント）
+
+    Returns:
+        成績名（METRICS）→ 組み合わせごとの値の配列
+            total_return: 累積リターン、cagr: 年率リターン、max_drawdown: 最大ドローダウン（負の値）、
+            sharpe: 年率シャープレシオ（無リスク金利0）、trades: 買いの回数、exposure: 保有日数の割合
+    """
+    close = np.asarray(close, dtype=float)
+    positions = np.asarray(positions, dtype=float)
+    returns = np.zeros(len(close))
+    if len(close) > 1:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns[1:] = close[1:] / close[:-1] - 1
+    returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+    held = np.zeros_like(positions)
+    held[1:] = positions[:-1]
+    changes = np.diff(positions, axis=0, prepend=0)
+    daily = held * returns[:, None] - np.abs(changes) * (fee_bps / 10000)
+
+    equity = np.cumprod(1 + daily, axis=0)
+    drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+    final = equity[-1] if len(equity) else np.ones(positions.shape[1])
+    years = max(len(close) - 1, 1) / TRADING_DAYS
+    std = daily[1:].std(axis=0) if len(daily) > 1 else np.zeros(positions.shape[1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, daily[1:].mean(axis=0) / std * np.sqrt(TRADING_DAYS), 0.0)
+    return {
+        'total_return': final - 1,
+        'cagr': np.power(np.maximum(final, 0), 1 / years) - 1,
+        'max_drawdown': drawdown.min(axis=0) if len(drawdown) else np.zeros(positions.shape[1]),
+        'sharpe': sharpe,
+        'trades': (changes > 0).sum(axis=0),
+        'exposure': held.mean(axis=0) if len(held) else np.zeros(positions.shape[1]),
+    }
+
+
+def sweep_strategy(graph, name, grid, fee_bps=DEFAULT_FEE_BPS, batch=COMBO_BATCH):
+    """1つの売買ルールのパラメータの全組み合わせを評価
+
+    Args:
+        graph: 終値の IndicatorGraph（中間結果は売買ルール間で共有）
+        name: ルール名
+        grid: パラメータ名 → 値のリスト
+        fee_bps: 売買1回あたりの手数料（ベーシスポイント）
+        batch: 一度に評価する組み合わせ数
+
+    Returns:
+        strategy, params（例: 'fast=5,slow=25'）, パラメータごとのカラム, 成績のカラムのDataFrame
+    """
+    strategy = STRATEGIES[name]
+    combos = expand_grid(name, grid)
+    n_combos = len(next(iter(combos.values()))) if combos else 1
+    close = graph.nodes['close'].to_numpy(dtype=float)
+    metrics = {metric: [] for metric in METRICS}
+    for start in range(0, n_combos, batch):
+        params = [values[start:start + batch] for values in combos.values()]
+        result = evaluate_positions(close, strategy.positions(graph, *params), fee_bps)
+        for metric in METRICS:
+            metrics[metric].append(result[metric])
+
+    columns = {param: values for param, values in combos.items()}
+    labels = [format_params(strategy.params, values) for values in zip(*columns.values())] if columns else ['']
+    return pd.DataFrame({'strategy': name, 'params': labels, **columns,
+                         **{metric: np.concatenate(values) for metric, values in metrics.items()}})
+
+
+def backtest_symbol(symbol, price_dir, fmt='csv', sweep=None, fee_bps=DEFAULT_FEE_BPS):
+    """1銘柄の全売買ルール・全組み合わせを評価
+
+    Args:
+        symbol: 銘柄コード
+        price_dir: 株価データディレクトリ
+        fmt: 株価データの保存形式
+        sweep: スイープ設定（Noneの場合は既定値）
+        fee_bps: 売買1回あたりの手数料（ベーシスポイント）
+
+    Returns:
+        symbol, strategy, params, パラメータごとのカラム, 成績のカラムのDataFrame（株価データがない場合None）
+    """
+    price_store = get_storage(fmt, price_dir)
+    if not price_store.exists(symbol):
+        print(f"エラー: {price_store.path(symbol)} が存在しません")
+        return None
+    with instrumentation.stage('backtest.read') as measurement:
+        df = load_price_frame(price_store, symbol)
+        measurement.rows = len(df) if df is not None else 0
+    if df is None:
+        return None
+
+    graph = IndicatorGraph(df['close'].astype(float))
+    results = []
+    for name, grid in normalize_sweep(sweep).items():
+        started = time.perf_counter()
+        with instrumentation.stage('backtest.sweep', rows=len(df)):
+            result = sweep_strategy(graph, name, grid, fee_bps)
+        print(f"{STRATEGIES[name].label}: {len(result)} 通り（{time.perf_counter() - started:.2f}秒）")
+        results.append(result)
+    return pd.concat(results, ignore_index=True).assign(symbol=symbol)
+
+
+def run_backtest_symbol(symbol, price_dir, fmt='csv', sweep=None, fee_bps=DEFAULT_FEE_BPS, capture=False):
+    """1銘柄のバックテストを例外から隔離して実行（プロセスプールのワーカーとしても使用）
+
+    Args:
+        symbol / price_dir / fmt / sweep / fee_bps: backtest_symbol と同じ
+        capture: Trueの場合は進捗表示を戻り値のログとして、計測値を呼び出し元のプロセスで合算できるように返す
+
+    Returns:
+        (銘柄コード, 結果のDataFrame（失敗時None）, ログ文字列, 計測値（capture=Trueの場合のみ））
+    """
+    if capture:
+        instrumentation.reset()
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer) if capture else contextlib.nullcontext():
+        try:
+            result = backtest_symbol(symbol, price_dir, fmt, sweep, fee_bps)
+        except Exception as e:
+            print(f"エラー: {symbol} のバックテスト中に例外が発生しました: {e}")
+            traceback.print_exc(file=sys.stdout)
+            result = None
+    return symbol, result, buffer.getvalue(), instrumentation.current().snapshot() if capture else None
+
+
+def backtest_symbols(symbols, price_dir, fmt='csv', sweep=None, fee_bps=DEFAULT_FEE_BPS, jobs=1):
+    """複数銘柄のバックテスト（jobs > 1 の場合はプロセスプールで並列処理）
+
+    Args:
+        symbols: 銘柄コードリスト
+        price_dir / fmt / sweep / fee_bps: backtest_symbol と同じ
+        jobs: 並列プロセス数
+
+    Returns:
+        銘柄コード → 結果のDataFrame（失敗時None）の辞書（入力順）
+    """
+    sweep = normalize_sweep(sweep)
+    results = {}
+    if jobs <= 1:
+        for symbol in symbols:
+            print(f"--- {symbol} ---")
+            _, results[symbol], _, _ = run_backtest_symbol(symbol, price_dir, fmt, sweep, fee_bps)
+            print()
+        return results
+
+    # 完了した銘柄から順にログを出力
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(run_backtest_symbol, symbol, price_dir, fmt, sweep, fee_bps, True)
+                   for symbol in symbols]
+        for future in as_completed(futures):
+            symbol, result, log, metrics = future.result()
+            instrumentation.current().merge(metrics)
+            print(f"--- {symbol} ---")
+            print(log)
+            results[symbol] = result
+    return {symbol: results[symbol] for symbol in symbols}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ベクトル化バックテスト・パラメータスイープ')
+    parser.add_argument('--symbols', type=str, default=UNIVERSE_KEYWORD,
+                        help='銘柄コード（カンマ区切り、universe: ユニバースの全銘柄、'
+                             'ワイルドカード（例: "*"）は株価データに一致、デフォルト: universe）')
+    parser.add_argument('--universe', type=str, default=None,
+                        help='銘柄ユニバースファイル（デフォルト: scripts/universe.csv）')
+    parser.add_argument('--input', type=str, default='data/price',
+                        help='株価データディレクトリ（デフォルト: data/price）')
+    parser.add_argument('--format', type=str, choices=FORMATS, default='csv',
+                        help='株価データの保存形式（デフォルト: csv）')
+    parser.add_argument('--fee-bps', type=float, default=DEFAULT_FEE_BPS,
+                        help=f'売買1回あたりの手数料（ベーシスポイント、デフォルト: {DEFAULT_FEE_BPS:g}）')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='並列プロセス数（デフォルト: 1 = 逐次）')
+    parser.add_argument('--rank', type=str, choices=METRICS, default='sharpe',
+                        help='上位の組み合わせを選ぶ成績（max_drawdown は0に近い順、デフォルト: sharpe）')
+    parser.add_argument('--top', type=int, default=3,
+                        help='銘柄・売買ルールごとに表示する上位の組み合わせ数（デフォルト: 3）')
+    parser.add_argument('--output', type=str, default='data/backtest.csv',
+                        help='全組み合わせの成績の出力先（デフォルト: data/backtest.csv）')
+    parser.add_argument('--run-report', type=str, default='data/run_report.json',
+                        help='実行レポートの出力先（デフォルト: data/run_report.json）')
+    parser.add_argument('--profile', type=str, default=None,
+                        help='cProfile のプロファイルの出力先（.prof）')
+    sweep_group = parser.add_mutually_exclusive_group()
+    sweep_group.add_argument('--sweep', type=str, default=None,
+                             help='売買ルールとパラメータの範囲（例: "sma_cross:fast=5:50:5,slow=20:200:10;rsi_reversion"、'
+                                  f"ルール: {', '.join(STRATEGIES)}、デフォルト: 全ルールの既定の範囲）")
+    sweep_group.add_argument('--sweep-config', type=str, default=None,
+                             help='スイープ設定のJSONファイル（例: {"sma_cross": {"fast": [5, 10], "slow": [25, 75]}}）')
+    args = parser.parse_args()
+    instrumentation.start_profiling(args.profile)
+    try:
+        universe = load_universe(args.universe)
+    except (OSError, ValueError) as e:
+        parser.error(f"銘柄ユニバースを読み込めません: {e}")
+    symbols = resolve_symbols(args.symbols, universe, get_storage(args.format, args.input))
+    try:
+        if args.sweep_config:
+            sweep = load_sweep_config(args.sweep_config)
+        elif args.sweep:
+            sweep = parse_sweep_spec(args.sweep)
+        else:
+            sweep = DEFAULT_SWEEP
+    except (OSError, ValueError) as e:
+        parser.error(f"スイープ設定が不正です: {e}")
+
+    n_combos = count_combinations(sweep)
+    print("📈 バックテスト開始")
+    print(f"対象銘柄: {symbols}")
+    print(f"入力: {args.input}")
+    print(f"売買ルール: {', '.join(sweep)}（1銘柄あたり {n_combos} 通り）")
+    print(f"手数料: {args.fee_bps:g}bps\n")
+
+    started = time.perf_counter()
+    results = backtest_symbols(symbols, args.input, args.format, sweep, args.fee_bps, args.jobs)
+    elapsed = time.perf_counter() - started
+    frames = [result for result in results.values() if result is not None]
+    failed = [symbol for symbol, result in results.items() if result is None]
+
+    if frames:
+        table = pd.concat(frames, ignore_index=True)
+        columns = ['symbol', 'strategy', 'params'] + METRICS + \
+            [col for col in table.columns if col not in {'symbol', 'strategy', 'params', *METRICS}]
+        table = table[columns]
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        table.to_csv(output_path, index=False)
+
+        ranked = table.sort_values(args.rank, ascending=False, kind='stable')
+        top = ranked.groupby(['symbol', 'strategy'], sort=False).head(args.top)
+        top = top.sort_values(['symbol', 'strategy'], kind='stable')
+        print(f"上位の組み合わせ（{args.rank}）:")
+        print(top[['symbol', 'strategy', 'params'] + METRICS].to_string(index=False, float_format='{:.4f}'.format))
+        print(f"\n📄 出力: {output_path}（{len(table)} 行）")
+
+    print(f"✅ 完了: {len(frames)}/{len(symbols)} 銘柄（{n_combos * len(frames)} 通り、{elapsed:.2f}秒）")
+    if failed:
+        print(f"❌ 失敗: {', '.join(failed)}")
+    instrumentation.write_run_report(args.run_report, 'backtest', symbols=len(symbols), succeeded=len(frames),
+                                     combinations=n_combos * len(frames))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+テクニカル指標計算ベンチマーク
+銘柄ごとのループ計算（compute_indicators）と日付×銘柄パネルでの一括計算を比較する
+合成データをメモリ上で生成するため、ファイルI/Oとネットワークは含まない
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from build_indicators import compute_indicators
+from indicator_panel import build_close_panel, compute_panel_indicators, split_panel
+
+
+def make_frames(n_symbols, n_rows, seed=0):
+    """合成終値データ（銘柄コード → DataFrame）を生成"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2015-01-05', periods=n_rows)
+    returns = rng.normal(0, 0.015, size=(n_rows, n_symbols))
+    closes = 1000 * np.exp(np.cumsum(returns, axis=0))
+    return {
+        f"{1000 + i}.T": pd.DataFrame({'date': dates, 'close': closes[:, i]})
+        for i in range(n_symbols)
+    }
+
+
+def run_loop(frames):
+    """銘柄ごとに compute_indicators を実行（進捗表示は抑制）"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {symbol: compute_indicators(df.copy()) for symbol, df in frames.items()}
+
+
+def run_panel(frames):
+    """パネルで一括計算して銘柄ごとに分配"""
+    closes = build_close_panel(frames)
+    return split_panel(closes, compute_panel_indicators(closes))
+
+
+def best_of(fn, frames, repeat):
+    """repeat回実行した最短時間（秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(frames)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='テクニカル指標計算ベンチマーク（loop vs panel）')
+    parser.add_argument('--sizes', type=str, default='10,100,1000',
+                        help='銘柄数（カンマ区切り）')
+    parser.add_argument('--years', type=int, default=10,
+                        help='1銘柄あたりの期間（年、営業日換算で245日/年）')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='各計測の繰り返し回数（最短時間を採用）')
+    args = parser.parse_args()
+
+    n_rows = args.years * 245
+    sizes = [int(s) for s in args.sizes.split(',')]
+
+    print(f"⏱️  テクニカル指標計算ベンチマーク（{n_rows}行/銘柄）")
+    print(f"{'銘柄数':>8} {'loop [s]':>10} {'panel [s]':>10} {'速度比':>8}")
+    for n_symbols in sizes:
+        frames = make_frames(n_symbols, n_rows)
+        loop_time = best_of(run_loop, frames, args.repeat)
+        panel_time = best_of(run_panel, frames, args.repeat)
+        print(f"{n_symbols:>8} {loop_time:>10.3f} {panel_time:>10.3f} {loop_time / panel_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
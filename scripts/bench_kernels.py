@@ -0,0 +1,81 @@
+"""
+テクニカル指標カーネルのマイクロベンチマーク
+build_indicators の pandas 実装（calculate_rsi / calculate_macd）と kernels の NumPy / Numba 実装を比較する
+Numba のJITコンパイル時間は計測前のウォームアップで除外する
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import kernels
+from build_indicators import calculate_macd, calculate_rsi
+
+
+def make_closes(n_rows, seed=0):
+    """合成終値データを生成"""
+    rng = np.random.default_rng(seed)
+    return 1000 * np.exp(np.cumsum(rng.normal(0, 0.015, n_rows)))
+
+
+def best_of(fn, repeat):
+    """repeat回実行した最短時間（秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def cases(closes, backends):
+    """計測ケース名 → (pandas実装, バックエンド → カーネル実装)"""
+    df = pd.DataFrame({'close': closes})
+    return {
+        'EMA(26)': (lambda: df['close'].ewm(span=26, adjust=False).mean(),
+                    {b: (lambda b=b: kernels.ema(closes, span=26, backend=b)) for b in backends}),
+        'RSI(14)': (lambda: calculate_rsi(df.copy()),
+                    {b: (lambda b=b: kernels.rsi(closes, backend=b)) for b in backends}),
+        'RSI(14) Wilder': (None,
+                           {b: (lambda b=b: kernels.rsi(closes, method='wilder', backend=b)) for b in backends}),
+        'MACD(12,26,9)': (lambda: calculate_macd(df.copy()),
+                          {b: (lambda b=b: kernels.macd(closes, backend=b)) for b in backends}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='テクニカル指標カーネルのマイクロベンチマーク（pandas vs NumPy / Numba）')
+    parser.add_argument('--sizes', type=str, default='10000,100000,1000000',
+                        help='行数（カンマ区切り）')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='各計測の繰り返し回数（最短時間を採用）')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    backends = kernels.available_backends()
+
+    # JITコンパイル（Numba）を計測から除外
+    for fn in (kernels.ema, kernels.rsi, kernels.macd):
+        for backend in backends:
+            fn(make_closes(100), **({'span': 26} if fn is kernels.ema else {}), backend=backend)
+
+    print(f"⏱️  テクニカル指標カーネルベンチマーク（バックエンド: {', '.join(backends)}）")
+    header = f"{'指標':<16} {'行数':>9} {'pandas [ms]':>12}"
+    header += ''.join(f" {backend + ' [ms]':>12} {'速度比':>7}" for backend in backends)
+    print(header)
+    for n_rows in sizes:
+        closes = make_closes(n_rows)
+        for name, (reference, implementations) in cases(closes, backends).items():
+            base = best_of(reference, args.repeat) if reference is not None else None
+            line = f"{name:<16} {n_rows:>9} {base * 1e3 if base else float('nan'):>12.2f}"
+            for backend in backends:
+                elapsed = best_of(implementations[backend], args.repeat)
+                ratio = f"{base / elapsed:>6.1f}x" if base else f"{'-':>7}"
+                line += f" {elapsed * 1e3:>12.2f} {ratio}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+Pythonデータパイプラインのベンチマーク
+合成OHLCVデータ（銘柄数×年数、日足・日中足）をCSVで生成し、株価データの読み込み・指標計算（build_indicators）・
+データ検証（validate_data）・増分取得の統合（fetch_price_data、pdr.DataReader はスタブに差し替え）の
+処理速度（株価データの行/秒）とピークメモリ（tracemalloc）を計測する。ネットワークは使用しない
+
+--baseline のファイルがない場合（または --update-baseline 指定時）は計測結果をベースラインとして保存し、
+ある場合は比較して、処理速度の低下・メモリ増加が --tolerance を超えたケースがあれば終了コード1で終了する
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import fetch_price_data
+from build_indicators import process_symbols
+from storage import CsvStorage, read_price_frame
+from validate_data import INDICATOR_TYPES, use_universe, validate_files
+
+BASELINE_SCHEMA_VERSION = '1.0'
+TRADING_DAYS_PER_YEAR = 245
+
+# 日中足の取引時間（東証の前場・後場）
+SESSIONS = (('09:00', '11:25'), ('12:30', '15:25'))
+
+# 増分取得で新たに取得する営業日数
+NEW_DAYS = 5
+
+
+def session_times(interval):
+    """1営業日分の日中足の時刻（当日0時からの経過時間）"""
+    return pd.TimedeltaIndex(np.concatenate([
+        pd.timedelta_range(pd.Timedelta(f"{start}:00"), pd.Timedelta(f"{end}:00"), freq=interval)
+        for start, end in SESSIONS
+    ]))
+
+
+def make_ohlcv(n_days, interval=None, start='2015-01-05', seed=0):
+    """合成OHLCVデータ（営業日ベース）を生成
+
+    Args:
+        n_days: 営業日数
+        interval: 日中足の間隔（例: '5min'、Noneの場合は日足）
+        start: 開始日
+        seed: 乱数シード
+
+    Returns:
+        Date, Open, High, Low, Close, Volume カラムのDataFrame（日付昇順）
+    """
+    days = pd.bdate_range(start, periods=n_days)
+    if interval is None:
+        dates = days
+    else:
+        times = session_times(interval)
+        dates = pd.DatetimeIndex((days.values[:, None] + times.values[None, :]).ravel())
+    n_rows = len(dates)
+    rng = np.random.default_rng(seed)
+    volatility = 0.015 / np.sqrt(n_rows / n_days)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, volatility, n_rows)))
+    open_ = close * (1 + rng.normal(0, volatility / 5, n_rows))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, volatility, n_rows))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, volatility, n_rows))
+    return pd.DataFrame({
+        'Date': dates.strftime('%Y-%m-%d' if interval is None else '%Y-%m-%d %H:%M:%S'),
+        'Open': open_.round(1),
+        'High': high.round(1),
+        'Low': low.round(1),
+        'Close': close.round(1),
+        'Volume': rng.integers(1_000_000, 5_000_000, n_rows) // (n_rows // n_days),
+    })
+
+
+def write_dataset(price_dir, n_symbols, years, interval=None, holdback=0):
+    """合成株価データのCSVと、その銘柄のユニバースファイルを書き出す
+
+    Args:
+        price_dir: 株価データディレクトリ
+        n_symbols: 銘柄数
+        years: 1銘柄あたりの期間（年、営業日換算で245日/年）
+        interval: 日中足の間隔（Noneの場合は日足）
+        holdback: 保存せずに残す末尾の営業日数（増分取得で取得させる分）
+
+    Returns:
+        (銘柄コード → 全期間のDataFrame, ユニバースファイルのパス)
+    """
+    n_days = max(int(round(years * TRADING_DAYS_PER_YEAR)), 1)
+    store = CsvStorage(price_dir)
+    frames = {}
+    for i in range(n_symbols):
+        symbol = f"{1000 + i}.T"
+        frames[symbol] = make_ohlcv(n_days + holdback, interval, seed=i).assign(symbol=symbol)
+        store.write(symbol, frames[symbol].iloc[:len(frames[symbol]) - holdback], schema_version='1.0')
+    universe_path = Path(price_dir) / '.universe.csv'
+    pd.DataFrame({'symbol': list(frames)}).to_csv(universe_path, index=False)
+    return frames, universe_path
+
+
+class StubDataReader:
+    """pdr.DataReader の代替（Stooqと同じく日付降順・Dateインデックスで合成データを返す）
+
+    Attributes:
+        frames: Stooq銘柄コード → OHLCV DataFrame
+    """
+
+    def __init__(self, frames):
+        self.frames = {fetch_price_data.stooq_symbol(symbol): df.drop(columns='symbol')
+                       for symbol, df in frames.items()}
+
+    def __call__(self, name, data_source=None, start=None, end=None, **kwargs):
+        df = self.frames[name]
+        dates = pd.to_datetime(df['Date'])
+        selected = df[(dates >= pd.Timestamp(start)) & (dates <= pd.Timestamp(end))]
+        return selected.assign(Date=pd.to_datetime(selected['Date'])).set_index('Date').iloc[::-1]
+
+
+class Case:
+    """計測ケース（setup で作業ディレクトリを準備し、run を計測する）"""
+
+    def __init__(self, name, rows, run, setup=None):
+        self.name = name
+        self.rows = rows
+        self.run = run
+        self.setup = setup or (lambda: None)
+
+
+def pipeline_cases(workdir, n_symbols, years, interval=None):
+    """合成データを生成し、指標計算・検証・増分取得統合の計測ケースを返す"""
+    workdir = Path(workdir)
+    holdback = NEW_DAYS if interval is None else 0
+    frames, universe_path = write_dataset(workdir / 'source', n_symbols, years, interval, holdback=holdback)
+    symbols = list(frames)
+    rows = sum(len(df) - holdback for df in frames.values())
+    price_dir, indicator_dir = workdir / 'price', workdir / 'indicators'
+    shutil.copytree(workdir / 'source', price_dir)
+    price_store = CsvStorage(price_dir)
+
+    def load():
+        return [price_store.read(symbol) for symbol in symbols]
+
+    def load_compact():
+        return [read_price_frame(price_store, symbol, price_dtype='float32', symbol='drop') for symbol in symbols]
+
+    def build():
+        with contextlib.redirect_stdout(io.StringIO()):
+            process_symbols(symbols, price_dir, indicator_dir)
+
+    tasks = [(price_dir / f"{symbol}.csv", 'price') for symbol in symbols]
+    tasks += [(indicator_dir / f"{symbol}_{indicator_type}.csv", indicator_type)
+              for symbol in symbols for indicator_type in INDICATOR_TYPES]
+
+    def validate():
+        use_universe(str(universe_path))
+        try:
+            validate_files(tasks)
+        finally:
+            use_universe(None)
+
+    # 読み込み（既定の型 / 価格 float32・銘柄コードカラムなし）は読み込んだ全銘柄の保持メモリも計測
+    cases = [
+        Case('load', rows, load),
+        Case('load_compact', rows, load_compact),
+        Case('build', rows, build),
+        Case('validate', rows, validate, setup=lambda: indicator_dir.exists() or build()),
+    ]
+    if interval is not None:
+        # Stooqの日足のみ対象（日中足は取得しない）
+        return cases
+
+    stub = StubDataReader(frames)
+    end_date = max(df['Date'].iloc[-1] for df in frames.values())
+    revised = {symbol: df.copy() for symbol, df in frames.items()}
+    for df in revised.values():
+        df.loc[len(df) - holdback - 1, 'Volume'] += 100
+
+    def restore():
+        shutil.rmtree(price_dir)
+        shutil.copytree(workdir / 'source', price_dir)
+
+    def fetch(reader):
+        def run():
+            with mock.patch.object(fetch_price_data.pdr, 'DataReader', reader), \
+                    contextlib.redirect_stdout(io.StringIO()):
+                fetch_price_data.fetch_all(symbols, '2000-01-01', end_date, price_dir)
+        return run
+
+    # 新規行の追記のみ / 重複期間の訂正を含む全体の統合
+    cases.append(Case('fetch_append', rows, fetch(stub), setup=restore))
+    cases.append(Case('fetch_merge', rows, fetch(StubDataReader(revised)), setup=restore))
+    return cases
+
+
+def measure(case, repeat):
+    """ケースを repeat回実行した最短時間と、別途1回実行したtracemallocのピークメモリ
+
+    Returns:
+        {'rows', 'seconds', 'rows_per_second', 'peak_mb'}
+    """
+    timings = []
+    for _ in range(repeat):
+        case.setup()
+        start = time.perf_counter()
+        case.run()
+        timings.append(time.perf_counter() - start)
+
+    case.setup()
+    tracemalloc.start()
+    try:
+        case.run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    seconds = min(timings)
+    return {
+        'rows': case.rows,
+        'seconds': round(seconds, 6),
+        'rows_per_second': round(case.rows / seconds, 1),
+        'peak_mb': round(peak / (1024 * 1024), 2),
+    }
+
+
+def run_benchmarks(sizes, repeat=3, interval=None, workdir=None):
+    """sizes の各規模で計測
+
+    Args:
+        sizes: (銘柄数, 年数) のリスト
+        repeat: 各計測の繰り返し回数（最短時間を採用）
+        interval: 日中足の間隔（Noneの場合は日足）
+        workdir: 作業ディレクトリ（Noneの場合は一時ディレクトリ）
+
+    Returns:
+        ケース名（例: 'build/10x5y/daily'）→ measure の戻り値
+    """
+    results = {}
+    for n_symbols, years in sizes:
+        with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+            for case in pipeline_cases(tmp, n_symbols, years, interval):
+                key = f"{case.name}/{n_symbols}x{years:g}y/{interval or 'daily'}"
+                results[key] = measure(case, repeat)
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """ベースラインと比較し、処理速度の低下またはメモリ増加が許容範囲を超えたケースを返す
+
+    Args:
+        results: run_benchmarks の戻り値
+        baseline: ベースラインの計測結果（同じ形式）
+        tolerance: 許容する変化率（0.25 = 25%）
+
+    Returns:
+        (ケース名, 指標名, ベースライン値, 計測値) のリスト
+    """
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result['rows_per_second'] < base['rows_per_second'] * (1 - tolerance):
+            regressions.append((key, 'rows_per_second', base['rows_per_second'], result['rows_per_second']))
+        if result['peak_mb'] > base['peak_mb'] * (1 + tolerance):
+            regressions.append((key, 'peak_mb', base['peak_mb'], result['peak_mb']))
+    return regressions
+
+
+def load_baseline(path):
+    """ベースラインの計測結果を読み込み（存在しない・バージョン不一致の場合None）"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if baseline.get('schema_version') != BASELINE_SCHEMA_VERSION:
+        return None
+    return baseline.get('results', {})
+
+
+def save_baseline(path, results):
+    """計測結果をベースラインとして保存（計測環境も記録）"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'schema_version': BASELINE_SCHEMA_VERSION,
+            'timestamp': pd.Timestamp.now().isoformat(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'results': results,
+        }, f, ensure_ascii=False, indent=2)
+
+
+def parse_sizes(spec):
+    """'10x5,100x1.5' → [(10, 5.0), (100, 1.5)]（銘柄数x年数）"""
+    sizes = []
+    for item in filter(None, (s.strip() for s in spec.split(','))):
+        n_symbols, _, years = item.partition('x')
+        sizes.append((int(n_symbols), float(years)))
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pythonデータパイプラインのベンチマーク（指標計算・検証・増分取得統合）')
+    parser.add_argument('--sizes', type=str, default='10x5,100x5',
+                        help='日足の規模（銘柄数x年数、カンマ区切り）')
+    parser.add_argument('--intraday-sizes', type=str, default='5x0.5',
+                        help='日中足の規模（銘柄数x年数、カンマ区切り、空文字で省略）')
+    parser.add_argument('--interval', type=str, default='5min',
+                        help='日中足の間隔（デフォルト: 5min）')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='各計測の繰り返し回数（最短時間を採用）')
+    parser.add_argument('--baseline', type=str, default='data/bench_baseline.json',
+                        help='ベースラインファイル（存在しない場合は計測結果を保存）')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='比較せずに計測結果でベースラインを更新')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='ベースラインからの許容変化率（デフォルト: 0.25 = 25%%）')
+    args = parser.parse_args()
+
+    print("⏱️  Pythonデータパイプラインベンチマーク")
+    results = run_benchmarks(parse_sizes(args.sizes), args.repeat)
+    results.update(run_benchmarks(parse_sizes(args.intraday_sizes), args.repeat, interval=args.interval))
+
+    baseline = None if args.update_baseline else load_baseline(args.baseline)
+    print(f"{'ケース':<36} {'行数':>10} {'時間 [s]':>10} {'行/秒':>12} {'メモリ [MB]':>12} {'ベースライン比':>14}")
+    for key, result in results.items():
+        base = (baseline or {}).get(key)
+        ratio = f"{result['rows_per_second'] / base['rows_per_second']:>13.2f}x" if base else f"{'-':>14}"
+        print(f"{key:<36} {result['rows']:>10} {result['seconds']:>10.3f} {result['rows_per_second']:>12.0f} "
+              f"{result['peak_mb']:>12.1f} {ratio}")
+
+    if baseline is None:
+        save_baseline(args.baseline, results)
+        print(f"\n📄 ベースラインを保存: {args.baseline}")
+        return
+
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ ベースラインから{args.tolerance:.0%}を超える性能低下:")
+        for key, metric, base, value in regressions:
+            print(f"  - {key} {metric}: {base} → {value}")
+        sys.exit(1)
+    print("\n✅ ベースラインとの差は許容範囲内")
+
+
+if __name__ == "__main__":
+    main()
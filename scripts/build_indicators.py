@@ -6,9 +6,23 @@
 import pandas as pd
 import numpy as np
 import argparse
+import contextlib
+import io
+import json
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 import sys
 
+import instrumentation
+from changes import is_unchanged, load_manifest, manifest_path, outputs_up_to_date
+from indicator_panel import build_close_panel, compute_panel_indicators, find_gapped_columns, split_panel
+from indicator_registry import (DEFAULT_INDICATORS, IndicatorGraph, compute_indicator_columns, format_indicator_spec,
+                                indicator_lookback, indicator_outputs, load_indicator_config, parse_indicator_spec)
+from resample import DOWNSAMPLE_YEARS, RESAMPLE_PERIODS, downsample, merge_resampled, resample_ohlcv, trailing_window
+from storage import FORMATS, CsvStorage, get_storage, iter_price_frames, read_price_frame
+from universe import UNIVERSE_KEYWORD, load_universe, resolve_symbols
+
 def calculate_sma(df, windows=[5, 25, 50, 75]):
     """移動平均線（SMA）を計算
     
@@ -103,23 +117,193 @@ def calculate_bollinger_bands(df, window=20, num_std=2):
     return df
 
 
-def process_symbol(symbol, input_dir, output_dir):
-    """1銘柄のテクニカル指標を計算
+# 既定の指標設定での出力カラム（指標名 → カラム）
+INDICATOR_OUTPUTS = indicator_outputs(DEFAULT_INDICATORS)
+
+
+def combined_columns(indicators=None):
+    """全指標を1ファイルにまとめた出力のカラム"""
+    return ['date'] + [col for cols in indicator_outputs(indicators).values() for col in cols[1:]]
+
+
+COMBINED_COLUMNS = combined_columns(DEFAULT_INDICATORS)
+
+# 出力レイアウト（split: 指標ごとのファイル / combined: 1ファイル / both: 両方）
+LAYOUTS = ('split', 'combined', 'both')
+
+# 複数解像度の出力（downsample: 表示期間ごとの間引き系列 {銘柄}_3y / _5y のみ、
+# all: 週足・月足 {銘柄}_weekly / _monthly も出力、フロントエンドが読み込むのは間引き系列のみ）
+MULTIRES_MODES = ('downsample', 'all')
+
+
+def multires_outputs(multires=True):
+    """複数解像度の出力の接尾辞（multires が 'all' の場合のみ週足・月足を含む、偽の場合は出力なし）"""
+    if not multires:
+        return ()
+    return (tuple(RESAMPLE_PERIODS) if multires == 'all' else ()) + tuple(DOWNSAMPLE_YEARS)
+
+
+def multires_names(symbol, multires=True):
+    """複数解像度の出力データ名"""
+    return [f"{symbol}_{suffix}" for suffix in multires_outputs(multires)]
+
+
+def multires_columns(indicators=None):
+    """複数解像度の出力のカラム（株価と全指標）"""
+    return ['date', 'open', 'high', 'low', 'close', 'volume'] + combined_columns(indicators)[1:]
+
+# 状態には指標設定とEMAごとの最終値を保存（1.0.0 はMACD既定値のみ対応）
+STATE_SCHEMA_VERSION = '1.1.0'
+
+# 最新スナップショット表（全銘柄の直近 SNAPSHOT_ROWS 行の終値・出来高・指標、screen.py で使用）
+SNAPSHOT_NAME = '_snapshot'
+SNAPSHOT_ROWS = 5
+SNAPSHOT_SCHEMA_VERSION = '1.0.0'
+
+
+def compute_indicators(df, symbol='', indicators=None):
+    """テクニカル指標（既定: SMA / RSI / MACD / ボリンジャーバンド）を計算
+    
+    移動平均・標準偏差・EMAなどの中間結果は指標間で共有する
     
     Args:
-        symbol: 銘柄コード（例: '9501.T'）
-        input_dir: 株価CSVディレクトリ
-        output_dir: 出力ディレクトリ
+        df: 日付昇順の株価DataFrame（date, closeカラム必須）
+        symbol: 進捗表示用の銘柄コード
+        indicators: 指標設定（指標名 → パラメータのリスト、Noneの場合は既定値）
+    
+    Returns:
+        指標カラムを追加したDataFrame
     """
-    # 株価データ読み込み
-    input_file = Path(input_dir) / f"{symbol}.csv"
-    if not input_file.exists():
-        print(f"エラー: {input_file} が存在しません")
-        return False
+    columns = compute_indicator_columns(IndicatorGraph(df['close']), indicators,
+                                        progress=lambda label: print(f"{symbol}: {label}計算中..."))
+    for col, values in columns.items():
+        df[col] = values
+    return df
+
+
+def _trailing_state(work, graph, indicators):
+    """直近の終値・EMAの最終値・指標設定から状態辞書を作成"""
+    trailing = work.iloc[-indicator_lookback(indicators):]
+    return {
+        'schema_version': STATE_SCHEMA_VERSION,
+        'indicators': format_indicator_spec(indicators),
+        'last_date': work['date'].iloc[-1].strftime('%Y-%m-%d'),
+        'dates': trailing['date'].dt.strftime('%Y-%m-%d').tolist(),
+        'closes': trailing['close'].astype(float).tolist(),
+        'emas': graph.ema_values(),
+    }
+
+
+def snapshot_records(df, indicators=None, previous=()):
+    """状態に保存する直近 SNAPSHOT_ROWS 行の終値・出来高・指標（最新スナップショット表の元データ）
+    
+    Args:
+        df: 指標カラムを含む日付昇順のDataFrame
+        indicators: 指標設定
+        previous: 前回の状態のスナップショット（増分計算時、df より前の行）
+    
+    Returns:
+        行ごとの辞書のリスト（日付昇順）
+    """
+    columns = ['date'] + [col for col in ('close', 'volume') if col in df.columns] + combined_columns(indicators)[1:]
+    tail = df[columns].iloc[-SNAPSHOT_ROWS:]
+    records = tail.assign(date=tail['date'].dt.strftime('%Y-%m-%d')).to_dict('records')
+    return (list(previous) + records)[-SNAPSHOT_ROWS:]
+
+
+def build_indicator_state(df, indicators=None):
+    """増分計算用の状態（直近の終値とEMA値・行数）を作成
+    
+    Args:
+        df: compute_indicators 済みのDataFrame
+        indicators: compute_indicators に渡した指標設定
+    
+    Returns:
+        JSONシリアライズ可能な状態辞書
+    """
+    # EMAの最終値はEMAを含む指標のみ再計算して取得
+    graph = IndicatorGraph(df['close'])
+    compute_indicator_columns(graph, indicators, recursive_only=True)
+    return {**_trailing_state(df, graph, indicators), 'snapshot': snapshot_records(df, indicators), 'rows': len(df)}
+
+
+def extend_indicators(state, new_df, indicators=None):
+    """保存済みの状態から新規行のテクニカル指標のみを計算
+    
+    移動平均系は保持した直近の終値と新規行から、EMAは前回の最終値から漸化式を延長して計算する
+    
+    Args:
+        state: build_indicator_state / extend_indicators が返した状態
+        new_df: 状態の最終日より後の株価DataFrame（日付昇順）
+        indicators: 状態作成時と同じ指標設定
     
-    # コメント行（# schema_version:）をスキップして読み込み
-    df = pd.read_csv(input_file, comment='#')
+    Returns:
+        (新規行の指標DataFrame, 更新後の状態)
+    """
+    history = pd.DataFrame({'date': pd.to_datetime(state['dates']), 'close': state['closes']})
+    work = pd.concat([history, new_df[['date', 'close']]], ignore_index=True)
+    
+    graph = IndicatorGraph(work['close'], ema_seeds=state['emas'], start=len(history))
+    for col, values in compute_indicator_columns(graph, indicators).items():
+        work[col] = values
+    tail = work.iloc[len(history):].reset_index(drop=True)
+    recent = tail.assign(volume=new_df['volume'].to_numpy()) if 'volume' in new_df.columns else tail
+    snapshot = snapshot_records(recent, indicators, state.get('snapshot', []))
+    # 行数（追記した行の検証で出力ファイル内の行番号に使用）は行数を保持していない状態からは延長しない
+    rows = {'rows': state['rows'] + len(new_df)} if 'rows' in state else {}
+    
+    return tail, {**_trailing_state(work, graph, indicators), 'snapshot': snapshot, **rows}
+
+
+def state_path(output_dir, symbol):
+    """増分計算用状態ファイルのパス"""
+    return Path(output_dir) / '_state' / f"{symbol}.json"
+
+
+def load_indicator_state(path):
+    """状態ファイルを読み込み（存在しない・壊れている・バージョン不一致の場合None）"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get('schema_version') != STATE_SCHEMA_VERSION:
+        return None
+    return state
+
+
+def save_indicator_state(path, state):
+    """状態ファイルを保存"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+
+
+def load_price_frame(price_store, symbol, since=None):
+    """株価データを読み込み、カラム名を小文字に統一して日付順に並べる（銘柄コードカラムは読み込まない）
     
+    Args:
+        price_store: 株価データストア
+        symbol: 銘柄コード
+        since: 指定時はこの日付以降の行のみ読み込み
+    
+    Returns:
+        株価DataFrame（必須カラム不足の場合None）
+    """
+    return prepare_price_frame(read_price_frame(price_store, symbol, since=since, symbol='drop'), symbol)
+
+
+def prepare_price_frame(df, symbol):
+    """株価DataFrameのカラム名を小文字に統一して日付順に並べる（読み込み済み・取得直後のデータ用）
+    
+    Args:
+        df: 株価DataFrame（日付カラムは datetime64）
+        symbol: 銘柄コード（エラー表示用）
+    
+    Returns:
+        株価DataFrame（必須カラム不足の場合None）
+    """
     # カラム名を小文字に統一
     df.columns = df.columns.str.lower()
     
@@ -127,93 +311,634 @@ def process_symbol(symbol, input_dir, output_dir):
     required_cols = ['date', 'open', 'high', 'low', 'close', 'volume']
     if not all(col in df.columns for col in required_cols):
         print(f"エラー: {symbol} に必須カラムがありません: {required_cols}")
-        return False
+        return None
     
     # 日付でソート
-    df['date'] = pd.to_datetime(df['date'])
-    df = df.sort_values('date').reset_index(drop=True)
-    
-    # テクニカル指標計算
-    print(f"{symbol}: SMA計算中...")
-    df = calculate_sma(df)
-    
-    print(f"{symbol}: RSI計算中...")
-    df = calculate_rsi(df)
-    
-    print(f"{symbol}: MACD計算中...")
-    df = calculate_macd(df)
-    
-    print(f"{symbol}: ボリンジャーバンド計算中...")
-    df = calculate_bollinger_bands(df)
-    
-    # 出力ディレクトリ作成
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
-    
-    # SMA CSV出力
-    sma_cols = ['date', 'sma_5', 'sma_25', 'sma_50', 'sma_75']
-    sma_df = df[sma_cols].copy()
-    sma_file = output_path / f"{symbol}_sma.csv"
-    with open(sma_file, 'w', encoding='utf-8') as f:
-        f.write("# schema_version: 1.0.0\n")
-        sma_df.to_csv(f, index=False)
-    print(f"✅ 保存: {sma_file}")
-    
-    # RSI CSV出力
-    rsi_cols = ['date', 'rsi']
-    rsi_df = df[rsi_cols].copy()
-    rsi_file = output_path / f"{symbol}_rsi.csv"
-    with open(rsi_file, 'w', encoding='utf-8') as f:
-        f.write("# schema_version: 1.0.0\n")
-        rsi_df.to_csv(f, index=False)
-    print(f"✅ 保存: {rsi_file}")
-    
-    # MACD CSV出力
-    macd_cols = ['date', 'macd', 'macd_signal', 'macd_hist']
-    macd_df = df[macd_cols].copy()
-    macd_file = output_path / f"{symbol}_macd.csv"
-    with open(macd_file, 'w', encoding='utf-8') as f:
-        f.write("# schema_version: 1.0.0\n")
-        macd_df.to_csv(f, index=False)
-    print(f"✅ 保存: {macd_file}")
-    
-    # ボリンジャーバンド CSV出力
-    bb_cols = ['date', 'bb_upper', 'bb_middle', 'bb_lower']
-    bb_df = df[bb_cols].copy()
-    bb_file = output_path / f"{symbol}_bb.csv"
-    with open(bb_file, 'w', encoding='utf-8') as f:
-        f.write("# schema_version: 1.0.0\n")
-        bb_df.to_csv(f, index=False)
-    print(f"✅ 保存: {bb_file}")
+    return df.sort_values('date').reset_index(drop=True)
+
+
+def output_stores(output_dir, fmt='csv', csv_export=True):
+    """指標の出力先データストア（CSV以外の形式ではWebフロントエンド用CSVも出力）"""
+    stores = [get_storage(fmt, output_dir)]
+    if csv_export and fmt != 'csv':
+        stores.append(CsvStorage(output_dir))
+    return stores
+
+
+def output_names(symbol, layout='split', indicators=None):
+    """出力レイアウトに対応する出力データ名 → 出力カラム の辞書"""
+    outputs = {}
+    if layout in ('split', 'both'):
+        outputs.update({f"{symbol}_{indicator}": cols for indicator, cols in indicator_outputs(indicators).items()})
+    if layout in ('combined', 'both'):
+        outputs[f"{symbol}_indicators"] = combined_columns(indicators)
+    return outputs
+
+
+def write_indicator_outputs(df, symbol, stores, append=False, layout='split', indicators=None):
+    """指標を出力（split: 指標ごとのファイル（既定はSMA / RSI / MACD / ボリンジャーバンドの4ファイル）、combined: 1ファイル）
+    
+    部分DataFrameのコピーは作らず、出力カラムを指定して直接書き込む
+    
+    Args:
+        df: 指標カラムを含むDataFrame
+        symbol: 銘柄コード
+        stores: 出力先データストアのリスト
+        append: Trueの場合は既存出力の末尾に追記
+        layout: 出力レイアウト（'split', 'combined', 'both'）
+        indicators: 指標設定（Noneの場合は既定値）
+    """
+    for name, cols in output_names(symbol, layout, indicators).items():
+        for store in stores:
+            if append:
+                store.append(name, df, schema_version='1.0.0')
+                print(f"✅ 追記: {store.path(name)}（{len(df)}行）")
+            else:
+                store.write(name, df, schema_version='1.0.0', columns=cols)
+                print(f"✅ 保存: {store.path(name)}")
+
+
+def write_multires_outputs(df, symbol, stores, indicators=None, multires=True):
+    """複数解像度の出力（表示期間ごとの間引き系列と、multires が 'all' の場合は週足・月足）を書き込む
+    
+    週足・月足の指標は集計後の足で計算し、間引き系列は選んだ日の日足の指標値をそのまま使う
+    
+    Args:
+        df: 全期間の日足の株価と指標カラムを含むDataFrame（compute_indicators 済み）
+        symbol: 銘柄コード
+        stores: 出力先データストアのリスト
+        indicators: 指標設定（Noneの場合は既定値）
+        multires: 複数解像度の出力の種類（MULTIRES_MODES、True は 'downsample' と同じ）
+    """
+    resampled = {suffix: resample_ohlcv(df, RESAMPLE_PERIODS[suffix])
+                 for suffix in multires_outputs(multires) if suffix in RESAMPLE_PERIODS}
+    write_multires_frames(resampled, df, symbol, stores, indicators)
+
+
+def write_multires_frames(resampled, recent, symbol, stores, indicators=None):
+    """集計済みの週足・月足と直近の日足から複数解像度の出力を書き込む（write_multires_outputs の本体）
+    
+    Args:
+        resampled: 出力名の接尾辞（'weekly', 'monthly'）→ 集計済みの足（指標は未計算、週足・月足を出力しない場合は空）
+        recent: 直近 max(DOWNSAMPLE_YEARS) 年以上の日足の株価と指標カラムを含むDataFrame
+        symbol: 銘柄コード
+        stores: 出力先データストアのリスト
+        indicators: 指標設定（Noneの場合は既定値）
+    """
+    frames = {suffix: compute_indicators(bars, f"{symbol}（{suffix}）", indicators)
+              for suffix, bars in resampled.items()}
+    frames.update({suffix: downsample(recent, years) for suffix, years in DOWNSAMPLE_YEARS.items()})
+    columns = multires_columns(indicators)
+    for suffix, frame in frames.items():
+        for store in stores:
+            store.write(f"{symbol}_{suffix}", frame, schema_version='1.0.0', columns=columns)
+            print(f"✅ 保存: {store.path(f'{symbol}_{suffix}')}（{len(frame)}行）")
+
+
+def update_multires_outputs(symbol, price_store, stores, since, layout='split', indicators=None, multires=True):
+    """新規行の追記後、複数解像度の出力のうち新規行で変わる直近の期間のみ作り直す
     
+    間引き系列は最長の表示期間分の日足（株価と追記済みの指標の出力）のみ読み込み、
+    週足・月足は新規行を含む週・月以降の足のみ集計し直して保存済みの足に続ける（指標は足の全期間で計算）
+    
+    Args:
+        symbol: 銘柄コード
+        price_store: 株価データストア（新規行の保存後）
+        stores: 出力先データストアのリスト（指標の新規行は追記済み）
+        since: 新規行の先頭日
+        layout: 追記した指標の出力レイアウト
+        indicators: 指標設定（Noneの場合は既定値）
+        multires: 複数解像度の出力の種類（write_multires_outputs と同じ）
+    """
+    periods = {suffix: RESAMPLE_PERIODS[suffix] for suffix in multires_outputs(multires) if suffix in RESAMPLE_PERIODS}
+    if not all(stores[0].exists(f"{symbol}_{suffix}") for suffix in periods):
+        # 保存済みの週足・月足がない場合（複数解像度の出力を初めて指定した場合など）は全期間から作る
+        full = compute_indicators(load_price_frame(price_store, symbol), symbol, indicators)
+        write_multires_outputs(full, symbol, stores, indicators, multires)
+        return
+    
+    cutoff = pd.Timestamp(price_store.last_date(symbol)) - pd.DateOffset(years=max(DOWNSAMPLE_YEARS.values()))
+    starts = {suffix: pd.Timestamp(since).to_period(period).start_time for suffix, period in periods.items()}
+    prices = load_price_frame(price_store, symbol, since=min([cutoff, *starts.values()]))
+    
+    recent = prices[prices['date'] >= cutoff]
+    for name, cols in output_names(symbol, layout, indicators).items():
+        values = stores[0].read_since(name, cutoff, columns=cols)
+        recent = recent.merge(values[[col for col in cols if col == 'date' or col not in recent]], on='date', how='left')
+    
+    price_cols = ['date', 'open', 'high', 'low', 'close', 'volume']
+    resampled = {}
+    for suffix, period in periods.items():
+        bars = stores[0].read(f"{symbol}_{suffix}", columns=price_cols)
+        resampled[suffix] = pd.concat([bars[bars['date'] < starts[suffix]],
+                                       resample_ohlcv(prices[prices['date'] >= starts[suffix]], period)],
+                                      ignore_index=True)
+    write_multires_frames(resampled, recent, symbol, stores, indicators)
+
+
+def load_incremental_state(symbol, output_dir, stores, layout='split', indicators=None):
+    """増分計算に使える状態を読み込む
+    
+    Returns:
+        状態辞書、増分計算できない場合（状態なし・指標設定の変更・EMAの初期値不足・出力なし）None
+    """
+    state = load_indicator_state(state_path(output_dir, symbol))
+    if state is None or 'snapshot' not in state:
+        return None
+    if state.get('indicators') != format_indicator_spec(indicators):
+        print(f"{symbol}: 指標設定の変更を検出")
+        return None
+    if any(np.isnan(value) for value in state['emas'].values()):
+        # 初期値の計算に必要な本数が揃う前の状態からは漸化式を延長できない
+        return None
+    if not all(store.exists(name) for store in stores for name in output_names(symbol, layout, indicators)):
+        return None
+    return state
+
+
+def matches_state(df, state):
+    """状態に保持した直近の日付・終値と株価データ（状態の先頭日以降、prepare_price_frame 済み）が一致するか
+    
+    一致しなければ過去データが訂正されている
+    """
+    stored = df[df['date'] <= state['last_date']]
+    return (stored['date'].dt.strftime('%Y-%m-%d').tolist() == state['dates']
+            and np.array_equal(stored['close'].to_numpy(dtype=float), np.asarray(state['closes'], dtype=float)))
+
+
+def _process_symbol_incremental(symbol, price_store, stores, output_dir, layout='split', indicators=None,
+                                multires=False):
+    """保存済みの状態から新規行のみ指標を計算して追記
+    
+    Returns:
+        成功時True、増分計算できない場合（状態なし・指標設定の変更・過去データ訂正など）None
+    """
+    path = state_path(output_dir, symbol)
+    state = load_incremental_state(symbol, output_dir, stores, layout, indicators)
+    if state is None:
+        return None
+    
+    with instrumentation.stage('build.read') as measurement:
+        df = load_price_frame(price_store, symbol, since=state['dates'][0])
+        measurement.rows = len(df) if df is not None else 0
+    if df is None:
+        return False
+    
+    if not matches_state(df, state):
+        print(f"{symbol}: 過去データの変更を検出")
+        return None
+    
+    new_df = df[df['date'] > state['last_date']].reset_index(drop=True)
+    if new_df.empty:
+        print(f"{symbol}: 新規データなし（既に最新）")
+        return True
+    
+    print(f"{symbol}: 増分計算中（{len(new_df)}行）...")
+    with instrumentation.stage('build.compute', rows=len(new_df)):
+        tail, new_state = extend_indicators(state, new_df, indicators)
+    with instrumentation.stage('build.write', rows=len(tail)):
+        write_indicator_outputs(tail, symbol, stores, append=True, layout=layout, indicators=indicators)
+        save_indicator_state(path, new_state)
+    if multires:
+        # 間引き系列と週足・月足の最終足は新規行で変わるため、直近の期間のみ作り直す（追記できない）
+        with instrumentation.stage('build.write'):
+            update_multires_outputs(symbol, price_store, stores, new_df['date'].iloc[0], layout, indicators,
+                                    multires)
+    return True
+
+
+def _process_symbol_chunked(symbol, price_store, stores, output_dir, chunk_rows, layout='split', indicators=None,
+                            multires=False):
+    """株価データを chunk_rows 行ずつ読み込み、増分計算と同じ状態（直近の終値・EMAの最終値）を
+    チャンク間で引き継いで指標を計算・追記する（メモリに保持するのは1チャンク分のみ）
+    
+    Returns:
+        成功時True、読み込みエラー時False、チャンク処理できない場合（日付順でない・EMAの初期値不足など）None
+    """
+    # 移動平均系は直近 lookback 行を状態に保持するため、1チャンクはそれより長くする
+    chunk_rows = max(chunk_rows, indicator_lookback(indicators) + 1)
+    path = state_path(output_dir, symbol)
+    state = None
+    periods = {suffix: RESAMPLE_PERIODS[suffix] for suffix in multires_outputs(multires) if suffix in RESAMPLE_PERIODS}
+    resampled = dict.fromkeys(periods)
+    recent = None
+    for chunk in iter_price_frames(price_store, symbol, chunk_rows, symbol='drop'):
+        with instrumentation.stage('build.read', rows=len(chunk)):
+            chunk = prepare_price_frame(chunk, symbol)
+        if chunk is None:
+            return False
+        
+        if state is None:
+            print(f"{symbol}: チャンク処理中（{chunk_rows}行ずつ）...")
+            with instrumentation.stage('build.compute', rows=len(chunk)):
+                chunk = compute_indicators(chunk, symbol, indicators)
+                state = build_indicator_state(chunk, indicators)
+            append = False
+        else:
+            if chunk['date'].iloc[0] <= pd.Timestamp(state['last_date']):
+                print(f"{symbol}: 株価データが日付順に保存されていません")
+                return None
+            if any(np.isnan(value) for value in state['emas'].values()):
+                return None
+            with instrumentation.stage('build.compute', rows=len(chunk)):
+                tail, state = extend_indicators(state, chunk, indicators)
+                chunk = chunk.assign(**{col: tail[col].to_numpy() for col in tail.columns if col not in chunk})
+            append = True
+        
+        with instrumentation.stage('build.write', rows=len(chunk)):
+            write_indicator_outputs(chunk, symbol, stores, append=append, layout=layout, indicators=indicators)
+        if multires:
+            # 週足・月足は集計済みの足、間引き系列は直近の日足（最長の表示期間分）のみ保持する
+            resampled = {suffix: merge_resampled(resampled[suffix], chunk, period)
+                         for suffix, period in periods.items()}
+            recent = trailing_window(chunk if recent is None else pd.concat([recent, chunk], ignore_index=True),
+                                     max(DOWNSAMPLE_YEARS.values()))
+    
+    if state is None:
+        print(f"エラー: {price_store.path(symbol)} にデータがありません")
+        return False
+    with instrumentation.stage('build.write'):
+        if multires:
+            write_multires_frames(resampled, recent, symbol, stores, indicators)
+        save_indicator_state(path, state)
     return True
 
 
+def process_symbol(symbol, input_dir, output_dir, fmt='csv', csv_export=True, incremental=False, layout='split',
+                   indicators=None, multires=False, chunk_rows=None):
+    """1銘柄のテクニカル指標を計算
+    
+    Args:
+        symbol: 銘柄コード（例: '9501.T'）
+        input_dir: 株価データディレクトリ
+        output_dir: 出力ディレクトリ
+        fmt: 入出力の保存形式（'csv', 'parquet', 'npy'）
+        csv_export: CSV以外の形式の場合にWebフロントエンド用CSVも出力するか
+        incremental: 保存済みの状態から新規行のみ計算して追記するか
+        layout: 出力レイアウト（'split', 'combined', 'both'）
+        indicators: 指標設定（指標名 → パラメータのリスト、Noneの場合は既定値）
+        multires: 複数解像度の出力も書き込むか（MULTIRES_MODES、'downsample' / True: 表示期間ごとの間引き系列、
+                  'all': 週足・月足も出力）
+        chunk_rows: 指定時は株価データをこの行数ずつ読み込んで計算（メモリ使用量の上限、Noneの場合は全体を読み込み）
+    """
+    # 株価データ読み込み
+    price_store = get_storage(fmt, input_dir)
+    if not price_store.exists(symbol):
+        print(f"エラー: {price_store.path(symbol)} が存在しません")
+        return False
+    
+    stores = output_stores(output_dir, fmt, csv_export)
+    
+    if incremental:
+        result = _process_symbol_incremental(symbol, price_store, stores, output_dir, layout, indicators, multires)
+        if result is not None:
+            return result
+        print(f"{symbol}: 増分計算できないため全期間を再計算します")
+    
+    if chunk_rows:
+        result = _process_symbol_chunked(symbol, price_store, stores, output_dir, chunk_rows, layout, indicators,
+                                         multires)
+        if result is not None:
+            return result
+        print(f"{symbol}: チャンク処理できないため全体を読み込んで計算します")
+    
+    # 日付カラムは datetime64 で読み込まれる
+    with instrumentation.stage('build.read') as measurement:
+        df = load_price_frame(price_store, symbol)
+        measurement.rows = len(df) if df is not None else 0
+    if df is None:
+        return False
+    
+    # テクニカル指標計算（次回の増分計算用の状態を含む）
+    with instrumentation.stage('build.compute', rows=len(df)):
+        df = compute_indicators(df, symbol, indicators)
+        state = build_indicator_state(df, indicators)
+    
+    # 出力ディレクトリ作成・出力
+    with instrumentation.stage('build.write', rows=len(df)):
+        write_indicator_outputs(df, symbol, stores, layout=layout, indicators=indicators)
+        if multires:
+            write_multires_outputs(df, symbol, stores, indicators, multires)
+        save_indicator_state(state_path(output_dir, symbol), state)
+    
+    return True
+
+
+def is_up_to_date(symbol, input_dir, output_dir, fmt='csv', csv_export=True, layout='split', indicators=None,
+                  multires=False):
+    """指標の出力が株価データより新しく、同じ指標設定で計算済みか（変更のない銘柄の処理省略の判定用）"""
+    state = load_indicator_state(state_path(output_dir, symbol))
+    if state is None or state.get('indicators') != format_indicator_spec(indicators) or 'snapshot' not in state:
+        return False
+    names = list(output_names(symbol, layout, indicators)) + multires_names(symbol, multires)
+    outputs = [store.path(name) for store in output_stores(output_dir, fmt, csv_export) for name in names]
+    return outputs_up_to_date([get_storage(fmt, input_dir).path(symbol)], outputs + [state_path(output_dir, symbol)])
+
+
+def update_snapshot(output_dir, symbols, fmt='csv', csv_export=True):
+    """最新スナップショット表の指定銘柄の行を状態ファイルのスナップショットで置き換える
+    
+    他の銘柄の行はそのまま残すため、一部の銘柄のみ処理した場合も表全体を作り直さない
+    
+    Args:
+        output_dir: 指標の出力ディレクトリ（状態ファイルと表の保存先）
+        symbols: 更新する銘柄コード（状態ファイルがない銘柄は表から削除）
+        fmt: 保存形式
+        csv_export: CSV以外の形式の場合にCSVも出力するか
+    
+    Returns:
+        更新後の表（symbol, date, close, volume, 指標カラム、銘柄・日付順）
+    """
+    stores = output_stores(output_dir, fmt, csv_export)
+    frames = []
+    if stores[0].exists(SNAPSHOT_NAME):
+        existing = stores[0].read(SNAPSHOT_NAME)
+        frames.append(existing[~existing['symbol'].isin(symbols)])
+    for symbol in symbols:
+        state = load_indicator_state(state_path(output_dir, symbol))
+        if state and state.get('snapshot'):
+            rows = pd.DataFrame(state['snapshot'])
+            frames.append(rows.assign(symbol=symbol, date=pd.to_datetime(rows['date'])))
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return None
+    
+    table = pd.concat(frames, ignore_index=True).sort_values(['symbol', 'date'], kind='stable')
+    columns = ['symbol'] + [col for col in table.columns if col != 'symbol']
+    for store in stores:
+        store.write(SNAPSHOT_NAME, table, schema_version=SNAPSHOT_SCHEMA_VERSION, columns=columns)
+    print(f"✅ 最新スナップショット: {stores[0].path(SNAPSHOT_NAME)}（{table['symbol'].nunique()}銘柄）")
+    return table[columns].reset_index(drop=True)
+
+
+def refresh_snapshot(output_dir, rebuilt, unchanged=(), fmt='csv', csv_export=True):
+    """計算し直した銘柄の行のみ最新スナップショット表を更新
+    
+    計算し直した銘柄がなく表もある場合は、状態ファイル・表を読み書きしない（変更のない日はほぼ何もしない）
+    
+    Args:
+        output_dir: 指標の出力ディレクトリ
+        rebuilt: 計算し直した銘柄コード
+        unchanged: 変更がなく計算を省略した銘柄コード（表がない場合のみ表に含める）
+        fmt: 保存形式
+        csv_export: CSV以外の形式の場合にCSVも出力するか
+    
+    Returns:
+        更新後の表、更新しなかった場合None
+    """
+    exists = output_stores(output_dir, fmt, csv_export)[0].exists(SNAPSHOT_NAME)
+    symbols = list(rebuilt) if exists else [*rebuilt, *unchanged]
+    if not symbols:
+        print("最新スナップショット: 計算し直した銘柄がないため更新なし")
+        return None
+    return update_snapshot(output_dir, symbols, fmt, csv_export)
+
+
+def run_symbol(symbol, input_dir, output_dir, fmt='csv', csv_export=True, incremental=False, layout='split',
+               indicators=None, multires=False, chunk_rows=None, capture=False):
+    """1銘柄の処理を例外から隔離して実行（プロセスプールのワーカーとしても使用）
+    
+    Args:
+        symbol: 銘柄コード
+        input_dir / output_dir / fmt / csv_export / incremental / layout / indicators / multires / chunk_rows:
+            process_symbol と同じ
+        capture: Trueの場合は進捗表示を戻り値のログとして、計測値を呼び出し元のプロセスで合算できるように返す
+                 （並列実行時の出力混在防止）
+    
+    Returns:
+        (銘柄コード, 成功フラグ, ログ文字列, 計測値（capture=Trueの場合のみ、instrumentation の snapshot）)
+    """
+    if capture:
+        instrumentation.reset()
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer) if capture else contextlib.nullcontext():
+        try:
+            ok = process_symbol(symbol, input_dir, output_dir, fmt=fmt, csv_export=csv_export,
+                                incremental=incremental, layout=layout, indicators=indicators, multires=multires,
+                                chunk_rows=chunk_rows)
+        except Exception as e:
+            print(f"エラー: {symbol} の処理中に例外が発生しました: {e}")
+            traceback.print_exc(file=sys.stdout)
+            ok = False
+    return symbol, ok, buffer.getvalue(), instrumentation.current().snapshot() if capture else None
+
+
+def process_symbols(symbols, input_dir, output_dir, fmt='csv', csv_export=True, incremental=False,
+                    layout='split', indicators=None, jobs=1, multires=False, chunk_rows=None):
+    """複数銘柄を銘柄ごとに処理（jobs > 1 の場合はプロセスプールで並列処理）
+    
+    Args:
+        symbols: 銘柄コードリスト
+        input_dir / output_dir / fmt / csv_export / incremental / layout / indicators / multires / chunk_rows:
+            process_symbol と同じ
+        jobs: 並列プロセス数
+    
+    Returns:
+        銘柄コード → 成功フラグ の辞書（入力順）
+    """
+    results = {}
+    if jobs <= 1:
+        for symbol in symbols:
+            print(f"--- {symbol} ---")
+            _, results[symbol], _, _ = run_symbol(symbol, input_dir, output_dir, fmt, csv_export, incremental, layout,
+                                               indicators, multires, chunk_rows)
+            print()
+        return results
+    
+    # 完了した銘柄から順にログを出力
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(run_symbol, symbol, input_dir, output_dir, fmt, csv_export, incremental, layout,
+                            indicators, multires, chunk_rows, True)
+            for symbol in symbols
+        ]
+        for future in as_completed(futures):
+            symbol, ok, log, metrics = future.result()
+            instrumentation.current().merge(metrics)
+            print(f"--- {symbol} ---")
+            print(log)
+            results[symbol] = ok
+    return {symbol: results[symbol] for symbol in symbols}
+
+
+def process_symbols_panel(symbols, input_dir, output_dir, fmt='csv', csv_export=True, layout='split',
+                          indicators=None, multires=False):
+    """複数銘柄のテクニカル指標を日付×銘柄パネルで一括計算
+    
+    途中に欠損（売買停止など）のある銘柄のみ銘柄単独で計算する
+    
+    Args:
+        symbols: 銘柄コードリスト
+        input_dir: 株価データディレクトリ
+        output_dir: 出力ディレクトリ
+        fmt: 入出力の保存形式（'csv', 'parquet', 'npy'）
+        csv_export: CSV以外の形式の場合にWebフロントエンド用CSVも出力するか
+        layout: 出力レイアウト（'split', 'combined', 'both'）
+        indicators: 指標設定（Noneの場合は既定値）
+        multires: 複数解像度の出力も書き込むか（process_symbol と同じ）
+    
+    Returns:
+        銘柄コード → 成功フラグ の辞書
+    """
+    price_store = get_storage(fmt, input_dir)
+    stores = output_stores(output_dir, fmt, csv_export)
+    results = {}
+    
+    # 株価データ読み込み
+    frames = {}
+    for symbol in symbols:
+        if not price_store.exists(symbol):
+            print(f"エラー: {price_store.path(symbol)} が存在しません")
+            results[symbol] = False
+            continue
+        with instrumentation.stage('build.read') as measurement:
+            df = load_price_frame(price_store, symbol)
+            measurement.rows = len(df) if df is not None else 0
+        if df is None:
+            results[symbol] = False
+            continue
+        frames[symbol] = df
+    
+    if frames:
+        closes = build_close_panel(frames)
+        gapped = find_gapped_columns(closes)
+        closes = closes.drop(columns=gapped)
+        print(f"パネル計算中（{closes.shape[0]}日 × {closes.shape[1]}銘柄）...")
+        with instrumentation.stage('build.compute', rows=sum(len(df) for df in frames.values())):
+            computed = split_panel(closes, compute_panel_indicators(closes, indicators))
+            # パネルの計算結果は日付・終値・指標のみのため、株価カラム（始値・高値・安値・出来高）を日付で結合する
+            # （複数解像度の出力の集計と最新スナップショット表に使用）
+            computed = {symbol: frames[symbol].merge(df.drop(columns='close'), on='date', how='left')
+                        for symbol, df in computed.items()}
+            for symbol in gapped:
+                print(f"{symbol}: 途中に欠損があるため銘柄単独で計算します")
+                computed[symbol] = compute_indicators(frames[symbol], symbol, indicators)
+        
+        for symbol in frames:
+            df = computed[symbol]
+            with instrumentation.stage('build.write', rows=len(df)):
+                write_indicator_outputs(df, symbol, stores, layout=layout, indicators=indicators)
+                if multires:
+                    write_multires_outputs(df, symbol, stores, indicators, multires)
+                save_indicator_state(state_path(output_dir, symbol), build_indicator_state(df, indicators))
+            results[symbol] = True
+    
+    return {symbol: results[symbol] for symbol in symbols}
+
+
 def main():
     parser = argparse.ArgumentParser(description='テクニカル指標計算スクリプト')
-    parser.add_argument('--symbols', type=str, default='9501.T,9502.T',
-                        help='銘柄コード（カンマ区切り）')
+    parser.add_argument('--symbols', type=str, default=UNIVERSE_KEYWORD,
+                        help='銘柄コード（カンマ区切り、universe: ユニバースの全銘柄、'
+                             'ワイルドカード（例: "*"）は入力ディレクトリの株価データに一致、デフォルト: universe）')
+    parser.add_argument('--universe', type=str, default=None,
+                        help='銘柄ユニバースファイル（デフォルト: scripts/universe.csv）')
     parser.add_argument('--input', type=str, default='data/price',
                         help='株価CSVディレクトリ')
     parser.add_argument('--output', type=str, default='data/indicators',
                         help='指標CSV出力ディレクトリ')
+    parser.add_argument('--format', type=str, choices=FORMATS, default='csv',
+                        help='入出力の保存形式（csv / parquet / npy、デフォルト: csv）')
+    parser.add_argument('--no-csv-export', action='store_true',
+                        help='CSV以外の形式の場合にWebフロントエンド用CSVを出力しない')
+    parser.add_argument('--incremental', action='store_true',
+                        help='増分モード（保存済みの状態から新規行のみ計算して追記）')
+    parser.add_argument('--engine', type=str, choices=['loop', 'panel'], default='loop',
+                        help='計算方式（loop: 銘柄ごと / panel: 全銘柄を日付×銘柄パネルで全期間を一括計算、'
+                             'panel は --incremental / --chunk-rows と併用不可）')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='並列プロセス数（loop方式のみ、デフォルト: 1 = 逐次）')
+    parser.add_argument('--layout', type=str, choices=LAYOUTS, default='split',
+                        help='出力レイアウト（split: 指標ごとのファイル / combined: {銘柄}_indicators の1ファイル / both: 両方）')
+    parser.add_argument('--chunk-rows', type=int, default=None,
+                        help='株価データをこの行数ずつ読み込んで計算（長期間・分足データのメモリ使用量の上限、'
+                             'loop方式のみ、デフォルト: 全体を読み込み）')
+    parser.add_argument('--multires', nargs='?', choices=MULTIRES_MODES, const='downsample', default=None,
+                        help='長期間の表示用の間引き系列（{銘柄}_3y / _5y）も出力（all: 週足・月足 {銘柄}_weekly / _monthly も出力、'
+                             'フロントエンドは間引き系列のみ使用）')
+    parser.add_argument('--manifest', type=str, default=None,
+                        help='変更銘柄マニフェスト（fetch_price_data.py の出力、デフォルト: 入力ディレクトリの _changes.json）')
+    parser.add_argument('--force', action='store_true',
+                        help='変更銘柄マニフェストにかかわらず全銘柄を計算')
+    parser.add_argument('--run-report', type=str, default='data/run_report.json',
+                        help='実行レポート（段階ごとの処理時間・処理行数・ピークメモリ）の出力パス')
+    parser.add_argument('--profile', type=str, default=None,
+                        help='cProfileのプロファイル出力パス（例: data/build.prof、指定時はtracemallocも有効化）')
+    indicator_group = parser.add_mutually_exclusive_group()
+    indicator_group.add_argument('--indicators', type=str, default=None,
+                                 help='計算する指標と期間（例: "sma:5,25,50,75;rsi:14;macd:12/26/9;bb:20/2"、'
+                                      'デフォルト: この既定値）')
+    indicator_group.add_argument('--indicator-config', type=str, default=None,
+                                 help='指標設定のJSONファイル（例: {"sma": [5, 25], "macd": [[12, 26, 9]]}）')
     
     args = parser.parse_args()
-    symbols = [s.strip() for s in args.symbols.split(',')]
+    if args.chunk_rows is not None and (args.chunk_rows <= 0 or args.engine == 'panel'):
+        parser.error("--chunk-rows は正の整数で、loop方式でのみ指定できます")
+    if args.incremental and args.engine == 'panel':
+        parser.error("--incremental は loop方式でのみ指定できます（panel方式は常に全期間を計算）")
+    instrumentation.start_profiling(args.profile)
+    try:
+        universe = load_universe(args.universe)
+    except (OSError, ValueError) as e:
+        parser.error(f"銘柄ユニバースを読み込めません: {e}")
+    symbols = resolve_symbols(args.symbols, universe, get_storage(args.format, args.input))
+    try:
+        if args.indicator_config:
+            indicators = load_indicator_config(args.indicator_config)
+        elif args.indicators:
+            indicators = parse_indicator_spec(args.indicators)
+        else:
+            indicators = DEFAULT_INDICATORS
+    except (OSError, ValueError) as e:
+        parser.error(f"指標設定が不正です: {e}")
     
     print(f"📊 テクニカル指標計算開始")
     print(f"対象銘柄: {symbols}")
     print(f"入力: {args.input}")
-    print(f"出力: {args.output}\n")
-    
-    success_count = 0
-    for symbol in symbols:
-        print(f"--- {symbol} ---")
-        if process_symbol(symbol, args.input, args.output):
-            success_count += 1
+    print(f"出力: {args.output}")
+    print(f"保存形式: {args.format}")
+    print(f"モード: {'増分' if args.incremental else '全期間'}")
+    print(f"計算方式: {args.engine}")
+    print(f"並列数: {args.jobs}")
+    if args.chunk_rows:
+        print(f"チャンク: {args.chunk_rows} 行ずつ読み込み")
+    print(f"出力レイアウト: {args.layout}{f'（複数解像度の出力: {args.multires}）' if args.multires else ''}")
+    print(f"指標: {format_indicator_spec(indicators)}\n")
+    
+    # 株価データが変更されておらず出力も最新の銘柄は省略（make と同様）
+    changes = None if args.force else load_manifest(args.manifest or manifest_path(args.input))
+    skipped = [
+        symbol for symbol in symbols
+        if is_unchanged(changes, symbol) and is_up_to_date(symbol, args.input, args.output, args.format,
+                                                           not args.no_csv_export, args.layout, indicators,
+                                                           args.multires)
+    ]
+    if skipped:
+        print(f"変更なし（省略）: {len(skipped)} 銘柄\n")
+    skipped_set = set(skipped)
+    targets = [symbol for symbol in symbols if symbol not in skipped_set]
+    
+    if args.engine == 'panel':
+        results = process_symbols_panel(targets, args.input, args.output, fmt=args.format,
+                                        csv_export=not args.no_csv_export, layout=args.layout,
+                                        indicators=indicators, multires=args.multires)
         print()
-    
-    print(f"✅ 完了: {success_count}/{len(symbols)} 銘柄")
+    else:
+        results = process_symbols(targets, args.input, args.output, fmt=args.format,
+                                  csv_export=not args.no_csv_export, incremental=args.incremental,
+                                  layout=args.layout, indicators=indicators, jobs=args.jobs,
+                                  multires=args.multires, chunk_rows=args.chunk_rows)
+    refresh_snapshot(args.output, [symbol for symbol, ok in results.items() if ok], skipped, args.format,
+                     not args.no_csv_export)
+    results.update(dict.fromkeys(skipped, True))
+    success_count = sum(results.values())
+    failed = [symbol for symbol, ok in results.items() if not ok]
+    
+    print(f"✅ 完了: {success_count}/{len(symbols)} 銘柄（うち変更なし {len(skipped)} 銘柄）")
+    if failed:
+        print(f"❌ 失敗: {', '.join(failed)}")
+    instrumentation.write_run_report(args.run_report, 'build_indicators', symbols=len(symbols),
+                                     succeeded=success_count, skipped=len(skipped))
     if success_count < len(symbols):
         sys.exit(1)
 
@@ -0,0 +1,105 @@
+"""
+変更銘柄マニフェスト
+fetch_price_data.py が株価データを更新した銘柄と変更行の日付範囲を記録し、
+build_indicators.py / validate_data.py は変更のない銘柄の処理を省略する（make と同様に
+出力が入力より新しいことも確認し、途中で失敗した実行の後でも古い出力が残らないようにする）
+
+マニフェストは株価データディレクトリの _changes.json:
+    {"schema_version": "1.0", "timestamp": "...",
+     "symbols": {"9501.T": {"status": "updated", "new_rows": 1, "revised_rows": 0,
+                            "first_date": "2025-12-15", "last_date": "2025-12-15"},
+                 "9502.T": {"status": "unchanged"}}}
+"""
+
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+MANIFEST_SCHEMA_VERSION = '1.0'
+MANIFEST_NAME = '_changes.json'
+
+# 銘柄ごとの状態（unchanged / failed の銘柄は株価データが変更されていない）
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+FAILED = 'failed'
+
+
+def manifest_path(price_dir):
+    """変更銘柄マニフェストのパス（株価データディレクトリ内）"""
+    return Path(price_dir) / MANIFEST_NAME
+
+
+def change_record(new_dates, revised_dates=()):
+    """変更内容の記録（新規行・訂正行の件数と、変更行の日付範囲）
+
+    Args:
+        new_dates: 追加した行の日付
+        revised_dates: 訂正・補完した行の日付
+
+    Returns:
+        マニフェストの銘柄ごとの項目（変更がない場合は status: unchanged）
+    """
+    dates = pd.to_datetime(pd.Series(list(new_dates) + list(revised_dates), dtype=object))
+    if dates.empty:
+        return {'status': UNCHANGED}
+    return {
+        'status': UPDATED,
+        'new_rows': len(new_dates),
+        'revised_rows': len(revised_dates),
+        'first_date': dates.min().strftime('%Y-%m-%d'),
+        'last_date': dates.max().strftime('%Y-%m-%d'),
+    }
+
+
+def save_manifest(path, changes):
+    """変更銘柄マニフェストを保存
+
+    Args:
+        path: マニフェストのパス
+        changes: 銘柄コード → change_record の戻り値（または {'status': 'failed'}）
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'schema_version': MANIFEST_SCHEMA_VERSION,
+            'timestamp': pd.Timestamp.now().isoformat(),
+            'symbols': changes,
+        }, f, ensure_ascii=False, indent=2)
+
+
+def load_manifest(path):
+    """変更銘柄マニフェストを読み込み（存在しない・壊れている・バージョン不一致の場合None）
+
+    Returns:
+        銘柄コード → 変更内容 の辞書
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('schema_version') != MANIFEST_SCHEMA_VERSION:
+        return None
+    return manifest.get('symbols', {})
+
+
+def is_unchanged(changes, symbol):
+    """マニフェスト上で株価データが変更されていない銘柄か（マニフェストにない銘柄はFalse）"""
+    return changes is not None and changes.get(symbol, {}).get('status') in (UNCHANGED, FAILED)
+
+
+def outputs_up_to_date(inputs, outputs):
+    """すべての出力が存在し、どの入力よりも新しいか（make と同じ更新日時による判定）
+
+    Args:
+        inputs: 入力ファイルパスのリスト（存在しないファイルは無視）
+        outputs: 出力ファイルパスのリスト
+    """
+    try:
+        oldest_output = min(os.stat(path).st_mtime_ns for path in outputs)
+    except (OSError, ValueError):
+        return False
+    return all(os.stat(path).st_mtime_ns <= oldest_output for path in inputs if os.path.exists(path))
@@ -0,0 +1,163 @@
+"""
+Stooq取得結果のディスクキャッシュ
+銘柄・期間（と接続先URL）ごとに取得したDataFrameをCSVで保存し、失敗したジョブの再実行や
+--full の再構築ではダウンロードせずに使用する。オフラインモードではキャッシュのみから返し、
+ネットワークなしで取得処理を再現する
+
+    <キャッシュディレクトリ>/<接続先URLのハッシュ>/<Stooq銘柄コード>_<開始日>_<終了日>.csv
+
+要求期間を含む別期間の項目も、要求期間に絞り込んで使用する。有効期限（TTL）は取得日時
+（ファイルの更新日時）から判定し、合計サイズが上限を超えた場合は期限切れ・古い項目から削除する
+（項目の一覧・サイズ・取得日時はメモリに保持し、キャッシュディレクトリの走査は初回のみ）
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+
+class CacheMiss(LookupError):
+    """オフラインモードで要求期間のキャッシュがない"""
+
+
+def _date_str(value) -> str:
+    """日付値を YYYY-MM-DD 形式の文字列に変換"""
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+class ResponseCache:
+    """Stooq取得結果のディスクキャッシュ（スレッドセーフ）
+
+    Args:
+        cache_dir: キャッシュディレクトリ
+        ttl_hours: 有効期限（時間、オフラインモードでは無視）
+        max_mb: 合計サイズの上限（MB）
+        offline: オフラインモード（ダウンロードせず、キャッシュにない場合は CacheMiss）
+
+    Attributes:
+        hits: キャッシュから返した回数
+        misses: キャッシュになかった回数（オフラインモード以外ではダウンロード）
+    """
+
+    def __init__(self, cache_dir, ttl_hours=6.0, max_mb=512, offline=False):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl_hours * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = None
+        self._symbols = {}
+        self._total = 0
+
+    def _directory(self, url):
+        return self.cache_dir / hashlib.sha256(url.encode('utf-8')).hexdigest()[:12]
+
+    def entry_path(self, url, symbol, start_date, end_date):
+        """キャッシュ項目のパス"""
+        return self._directory(url) / f"{symbol}_{_date_str(start_date)}_{_date_str(end_date)}.csv"
+
+    def _is_fresh(self, path):
+        return self.offline or time.time() - path.stat().st_mtime <= self.ttl
+
+    def _candidates(self, url, symbol, start, end):
+        """要求期間を含む項目（完全一致、次に取得日時の新しい順、メモリ上の項目一覧から検索）"""
+        exact = self.entry_path(url, symbol, start, end)
+        with self._lock:
+            entries = self._index()
+            paths = self._symbols.get((exact.parent, symbol), ())
+            covering = []
+            for path in paths:
+                _, entry_start, entry_end = path.stem.rsplit('_', 2)
+                if path != exact and entry_start <= start and entry_end >= end:
+                    covering.append((entries[path][0], path))
+        return [exact] + [path for _, path in sorted(covering, reverse=True)]
+
+    def get(self, url, symbol, start_date, end_date):
+        """要求期間の取得結果（Stooqと同じく日付降順・Dateインデックス）、ない場合はNone
+
+        Args:
+            url: 接続先URL
+            symbol: Stooq銘柄コード
+            start_date / end_date: 要求期間
+        """
+        start, end = _date_str(start_date), _date_str(end_date)
+        for path in self._candidates(url, symbol, start, end):
+            try:
+                if not self._is_fresh(path):
+                    continue
+                df = pd.read_csv(path, index_col='Date', parse_dates=['Date'])
+            except (OSError, ValueError):
+                continue
+            with self._lock:
+                self.hits += 1
+            return df[(df.index >= start) & (df.index <= end)]
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, url, symbol, start_date, end_date, df):
+        """取得結果を保存（空の結果は一時的な障害の可能性があるため保存しない）"""
+        if df is None or df.empty:
+            return
+        path = self.entry_path(url, symbol, start_date, end_date)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+        os.close(fd)
+        try:
+            df.rename_axis('Date').to_csv(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        stat = path.stat()
+        with self._lock:
+            self._index()
+            self._remove(path)
+            self._add(path, stat.st_mtime, stat.st_size)
+        self.evict()
+
+    def _index(self):
+        """キャッシュ項目のパス → (取得日時, サイズ)（取得日時の古い順、初回のみキャッシュディレクトリを走査、ロック内で呼ぶ）"""
+        if self._entries is None:
+            found = []
+            for path in self.cache_dir.glob('*/*.csv'):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, path, stat.st_size))
+            self._entries = OrderedDict()
+            for mtime, path, size in sorted(found):
+                self._add(path, mtime, size)
+        return self._entries
+
+    def _add(self, path, mtime, size):
+        """項目一覧の末尾（最新）に追加（ロック内で呼ぶ）"""
+        self._entries[path] = (mtime, size)
+        self._symbols.setdefault((path.parent, path.stem.rsplit('_', 2)[0]), set()).add(path)
+        self._total += size
+
+    def _remove(self, path):
+        """項目一覧から削除（ロック内で呼ぶ）"""
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._symbols[(path.parent, path.stem.rsplit('_', 2)[0])].discard(path)
+            self._total -= entry[1]
+
+    def evict(self):
+        """合計サイズが上限以下になるまで、取得日時の古い項目から削除（期限切れの項目は取得日時が最も古いため先に削除）"""
+        with self._lock:
+            entries = self._index()
+            while self._total > self.max_bytes and entries:
+                path = next(iter(entries))
+                self._remove(path)
+                path.unlink(missing_ok=True)
@@ -7,47 +7,323 @@ Stooq経由でpandas_datareaderを使用して株価データを取得
 
 import argparse
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
+from urllib.parse import urlparse
 
 try:
     import pandas as pd
     from pandas_datareader import data as pdr
+    from pandas_datareader.stooq import StooqDailyReader
+    from storage import FORMATS, CsvStorage, get_storage
+    import instrumentation
+    from fetch_cache import CacheMiss, ResponseCache
+    from changes import FAILED, UPDATED, change_record, manifest_path, save_manifest
+    from universe import UNIVERSE_KEYWORD, load_universe, resolve_symbols, stooq_symbol
 except ImportError:
     print("エラー: 必要なライブラリがインストールされていません")
     print("実行: pip install -r scripts/requirements.txt")
     sys.exit(1)
 
 
-def get_existing_dates(csv_path: Path) -> set:
+STOOQ_URL = 'https://stooq.com/q/d/l/'
+
+
+class StooqReader(StooqDailyReader):
+    """接続先URLを差し替え可能なStooqリーダー（ローカル検証サーバー用）"""
+
+    def __init__(self, *args, base_url: str = STOOQ_URL, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._base_url = base_url
+
+    @property
+    def url(self):
+        return self._base_url
+
+
+class HostRateLimiter:
+    """ホスト単位でリクエスト間隔を制限するレートリミッター（スレッドセーフ）
+
+    Args:
+        min_interval: 同一ホストへの連続リクエストの最小間隔（秒）
+    """
+
+    def __init__(self, min_interval: float = 0.0):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url: str) -> None:
+        """次のリクエスト枠まで待機"""
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def read_stooq(stooq_code: str, start_date: str, end_date: str, base_url: str = None,
+               retries: int = 0, backoff: float = 1.0, rate_limiter: HostRateLimiter = None,
+               cache: ResponseCache = None):
+    """Stooqから株価データを取得（レート制限・指数バックオフ付きリトライ、キャッシュ指定時はキャッシュを優先）
+
+    Args:
+        stooq_code: Stooq銘柄コード (例: 9501.JP)
+        start_date: 開始日 (YYYY-MM-DD)
+        end_date: 終了日 (YYYY-MM-DD)
+        base_url: 接続先URL（Noneの場合はpandas_datareader標準のStooq）
+        retries: 失敗時の再試行回数
+        backoff: 初回再試行までの待機秒数（以降2倍ずつ増加）
+        rate_limiter: ホスト単位のレートリミッター
+        cache: 取得結果のキャッシュ（オフラインモードでキャッシュにない場合は CacheMiss）
+
+    Returns:
+        pandas_datareaderが返すDataFrame
     """
-    既存CSVファイルから保存済みの日付セットを取得
+    url = base_url or STOOQ_URL
+    if cache is not None:
+        cached = cache.get(url, stooq_code, start_date, end_date)
+        if cached is not None:
+            print(f"[INFO] {stooq_code} はキャッシュを使用")
+            return cached
+        if cache.offline:
+            raise CacheMiss(f"{stooq_code} の {start_date} ～ {end_date} のキャッシュがありません（オフライン）")
+    for attempt in range(retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.wait(url)
+        try:
+            if base_url is None:
+                # 再試行はこのループのみで行う（pandas_datareader 側の再試行はバックオフ・レート制限の対象外のため無効化）
+                df = pdr.DataReader(stooq_code, 'stooq', start_date, end_date, retry_count=0)
+            else:
+                df = StooqReader(stooq_code, start_date, end_date, retry_count=0, base_url=base_url).read()
+        except Exception as e:
+            if attempt >= retries:
+                raise
+            delay = backoff * (2 ** attempt)
+            print(f"[WARNING] {stooq_code} 取得失敗（{attempt + 1}/{retries + 1}回目）: {str(e)}")
+            print(f"          {delay:.1f}秒後に再試行します")
+            time.sleep(delay)
+            continue
+        if cache is not None:
+            cache.put(url, stooq_code, start_date, end_date, df)
+        return df
+
+
+def download_price_data(symbol: str, stooq_code: str, start_date: str, end_date: str, **read_kwargs):
+    """
+    Stooqから株価データを取得し、保存用のカラム（Date, Open, High, Low, Close, Volume, symbol）に揃える
     
     Args:
-        csv_path: CSVファイルのパス
+        symbol: 銘柄コード (例: 9501.T)
+        stooq_code: Stooq銘柄コード (例: 9501.JP)
+        start_date: 開始日 (YYYY-MM-DD)
+        end_date: 終了日 (YYYY-MM-DD)
+        **read_kwargs: read_stooq へ渡す追加引数（base_url, retries, backoff, rate_limiter, cache）
         
     Returns:
-        保存済み日付のセット（YYYY-MM-DD形式の文字列）
+        日付昇順の株価DataFrame（データがない場合は空のDataFrame）
     """
-    if not csv_path.exists():
-        return set()
+    df = read_stooq(stooq_code, start_date, end_date, **read_kwargs)
+    if df.empty:
+        return df
     
-    try:
-        # スキーマバージョン行をスキップして読み込み
-        df = pd.read_csv(csv_path, comment='#')
-        if 'Date' in df.columns:
-            dates = pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d').tolist()
-            return set(dates)
-        return set()
-    except Exception as e:
-        print(f"[WARNING] 既存ファイル読み込みエラー: {str(e)}")
-        return set()
+    # カラム名を小文字に統一
+    df.columns = df.columns.str.lower()
+    
+    # インデックスをリセット（日付列を明示的に作成）
+    df.reset_index(inplace=True)
+    if 'date' in df.columns:
+        df.rename(columns={'date': 'Date'}, inplace=True)
+    else:
+        df.rename(columns={df.columns[0]: 'Date'}, inplace=True)
+    
+    # カラム名を標準化
+    column_mapping = {
+        'open': 'Open',
+        'high': 'High',
+        'low': 'Low',
+        'close': 'Close',
+        'volume': 'Volume'
+    }
+    df.rename(columns=column_mapping, inplace=True)
+    
+    # 必要なカラムのみ選択
+    required_columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+    df = df[required_columns]
+    
+    # 銘柄コード列を追加
+    df['symbol'] = symbol
+    
+    # 日付を正規化して昇順に並べる（Stooqは降順で返す）
+    df['Date'] = pd.to_datetime(df['Date']).dt.normalize()
+    return df.sort_values('Date', kind='stable')
+
+
+def get_revised_rows(existing_df, overlap_df):
+    """
+    重複期間の取得データのうち、保存済みの値から変更された行を抽出
+    
+    Args:
+        existing_df: 保存済みデータ
+        overlap_df: 保存済み日付と重複する取得データ
+        
+    Returns:
+        値が訂正された行（overlap_dfの部分集合）
+    """
+    value_columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+    stored = existing_df.set_index('Date').reindex(overlap_df['Date'])[value_columns]
+    fetched = overlap_df.set_index('Date')[value_columns]
+    changed = (stored.ne(fetched) & ~(stored.isna() & fetched.isna())).any(axis=1)
+    return overlap_df[changed.to_numpy()]
+
+
+def merge_price_chunks(chunks, backdated_df, new_df, columns):
+    """
+    保存済みデータのチャンクに訂正・補完行と新規行を日付順に統合するイテレータ（全体をメモリに保持しない）
+    
+    Args:
+        chunks: 保存済みデータのチャンク（日付昇順）
+        backdated_df: 訂正・補完行（日付昇順、保存済みの同じ日付の行を置き換える）
+        new_df: 最新保存日より後の行
+        columns: 出力するカラム（保存済みデータのカラムに取得データのみのカラムを加えたもの）
+        
+    Yields:
+        統合後のチャンク
+    """
+    replaced = set(backdated_df['Date'])
+    pending = backdated_df
+    for chunk in chunks:
+        chunk = chunk[~chunk['Date'].isin(replaced)]
+        # このチャンクの最終日までの訂正・補完行を挿入（以降の日付の行は次のチャンクへ）
+        inserted = pending[pending['Date'] <= chunk['Date'].max()] if not chunk.empty else pending.iloc[0:0]
+        pending = pending.iloc[len(inserted):]
+        merged = pd.concat([chunk, inserted], ignore_index=True).sort_values('Date', kind='stable')
+        yield merged.reindex(columns=columns)
+    yield pd.concat([pending, new_df], ignore_index=True).reindex(columns=columns)
 
 
-def fetch_stock_data(symbol: str, start_date: str, end_date: str, output_dir: Path, incremental: bool = True) -> bool:
+def save_price_data(store, symbol: str, df, latest_date, chunk_rows: int = None) -> dict:
     """
-    指定された銘柄の株価データを取得してCSVに保存
-    incrementalモード時は既存データと統合し、未保存の日付のみ取得
+    取得データをデータストアへ反映
+    最新保存日より後の行のみなら追記、さかのぼった行（訂正・欠損補完）があれば全体を統合
+    
+    Args:
+        store: 保存先データストア
+        symbol: 銘柄コード
+        df: 取得データ（日付昇順）
+        latest_date: 保存済みデータの最新日（Noneの場合は全体を書き込み）
+        chunk_rows: 指定時は全体の統合で保存済みデータをこの行数ずつ読み込む（メモリ使用量の上限）
+        
+    Returns:
+        変更内容（changes.change_record の戻り値、変更がない場合は status: unchanged）
+    """
+    output_path = store.path(symbol)
+    if latest_date is None:
+        store.write(symbol, df, schema_version='1.0')
+        print(f"[SUCCESS] {len(df)} 行のデータを保存: {output_path}")
+        return change_record(df['Date'].tolist())
+    
+    new_df = df[df['Date'] > latest_date]
+    overlap_df = df[df['Date'] <= latest_date]
+    backdated_df = overlap_df.iloc[0:0]
+    if not overlap_df.empty:
+        stored_df = store.read_since(symbol, overlap_df['Date'].min())
+        backdated_df = get_revised_rows(stored_df, overlap_df)
+    
+    record = change_record(new_df['Date'].tolist(), backdated_df['Date'].tolist())
+    if record['status'] != UPDATED:
+        return record
+    
+    print(f"[INFO] {symbol} の新規データ: {len(new_df)} 日分")
+    
+    if backdated_df.empty and sorted(store.columns(symbol)) == sorted(new_df.columns):
+        store.append(symbol, new_df, schema_version='1.0')
+        print(f"[SUCCESS] {len(new_df)} 行のデータを追記: {output_path}")
+        return record
+    
+    # さかのぼった行がある場合のみ全体を統合
+    print(f"[INFO] {symbol} の訂正・補完データ: {len(backdated_df)} 日分（全体を再構築）")
+    if chunk_rows:
+        columns = list(dict.fromkeys([*store.columns(symbol), *df.columns]))
+        store.write_chunks(symbol, merge_price_chunks(store.read_chunks(symbol, chunk_rows), backdated_df, new_df,
+                                                      columns), schema_version='1.0')
+        print(f"[SUCCESS] {chunk_rows} 行ずつ統合して保存: {output_path}")
+        print(f"          新規追加: {len(new_df)} 行")
+        return record
+    existing_df = store.read(symbol)
+    existing_df = existing_df[~existing_df['Date'].isin(backdated_df['Date'])]
+    merged_df = pd.concat([existing_df, backdated_df, new_df], ignore_index=True)
+    merged_df = merged_df.sort_values('Date', kind='stable')
+    store.write(symbol, merged_df, schema_version='1.0')
+    print(f"[SUCCESS] {len(merged_df)} 行のデータを保存: {output_path}")
+    print(f"          新規追加: {len(new_df)} 行")
+    return record
+
+
+def merge_price_data(existing_df, df):
+    """
+    保存済みデータと取得データをメモリ上で統合（save_price_data と同じ規則、書き込みは行わない）
+    
+    Args:
+        existing_df: 保存済みデータ（Noneの場合は取得データをそのまま使用）
+        df: 取得データ（日付昇順）
+        
+    Returns:
+        (統合後のDataFrame, 変更内容（changes.change_record の戻り値）)
+    """
+    if existing_df is None or existing_df.empty:
+        return df.reset_index(drop=True), change_record(df['Date'].tolist())
+    
+    latest_date = existing_df['Date'].max()
+    new_df = df[df['Date'] > latest_date]
+    overlap_df = df[df['Date'] <= latest_date]
+    backdated_df = get_revised_rows(existing_df, overlap_df) if not overlap_df.empty else overlap_df
+    record = change_record(new_df['Date'].tolist(), backdated_df['Date'].tolist())
+    if record['status'] != UPDATED:
+        return existing_df, record
+    
+    kept_df = existing_df[~existing_df['Date'].isin(backdated_df['Date'])]
+    merged_df = pd.concat([kept_df, backdated_df, new_df], ignore_index=True)
+    merged_df = merged_df.sort_values('Date', kind='stable').reset_index(drop=True)
+    return merged_df, record
+
+
+def fetch_start_date(start_date: str, end_date: str, latest_date, overlap_days: int = 5):
+    """
+    増分取得の取得開始日（最新保存日から重複期間分さかのぼった日、データ訂正の反映用）
+    
+    Args:
+        start_date: 取得開始日 (YYYY-MM-DD)
+        end_date: 取得終了日 (YYYY-MM-DD)
+        latest_date: 保存済みデータの最新日（YYYY-MM-DD、Noneの場合は start_date から取得）
+        overlap_days: 最新保存日からさかのぼって再取得する日数
+        
+    Returns:
+        取得開始日 (YYYY-MM-DD)、保存済みデータが既に最新の場合None
+    """
+    if not latest_date:
+        return start_date
+    if latest_date >= end_date:
+        return None
+    overlap_start = (datetime.strptime(latest_date, '%Y-%m-%d') - timedelta(days=overlap_days)).strftime('%Y-%m-%d')
+    return max(start_date, overlap_start)
+
+
+def fetch_stock_data(symbol: str, start_date: str, end_date: str, output_dir: Path, incremental: bool = True,
+                     base_url: str = None, retries: int = 0, backoff: float = 1.0,
+                     rate_limiter: HostRateLimiter = None, overlap_days: int = 5,
+                     fmt: str = 'csv', csv_export: bool = True, universe=None, changes: dict = None,
+                     cache: ResponseCache = None, chunk_rows: int = None) -> bool:
+    """
+    指定された銘柄の株価データを取得して保存
+    incrementalモード時は最新保存日以降（重複期間を含む）のみ取得して既存データと統合
     
     Args:
         symbol: 銘柄コード (例: 9501.T)
@@ -55,23 +331,41 @@ def fetch_stock_data(symbol: str, start_date: str, end_date: str, output_dir: Pa
         end_date: 終了日 (YYYY-MM-DD)
         output_dir: 出力ディレクトリ
         incremental: 増分モード（既存データに追加）
+        base_url: Stooq接続先URL（ローカル検証サーバー用、Noneで本番）
+        retries: 取得失敗時の再試行回数
+        backoff: 再試行の初回待機秒数
+        rate_limiter: ホスト単位のレートリミッター
+        overlap_days: 増分モードで最新保存日からさかのぼって再取得する日数（訂正反映用）
+        fmt: 保存形式（'csv', 'parquet', 'npy'）
+        csv_export: CSV以外の形式で保存する場合にWebフロントエンド用CSVも出力するか
+        universe: 銘柄ユニバース（Stooqの銘柄コードの対応に使用、Noneの場合はサフィックスの対応表のみ）
+        changes: 変更内容の記録先（銘柄コード → changes.change_record の戻り値、変更銘柄マニフェスト用）
+        cache: 取得結果のキャッシュ（Noneの場合はキャッシュしない）
+        chunk_rows: 指定時は保存済みデータの統合・CSVの再出力をこの行数ずつ行う（メモリ使用量の上限）
         
     Returns:
         成功時True、失敗時False
     """
+    def record(entry):
+        if changes is not None:
+            changes[symbol] = entry
+    
     try:
-        # ファイル名を生成（9501.T.csv）
-        filename = f"{symbol}.csv"
-        output_path = output_dir / filename
+        store = get_storage(fmt, output_dir)
+        export = CsvStorage(output_dir) if csv_export and fmt != 'csv' else None
         
-        # 既存データの日付を取得
-        existing_dates = get_existing_dates(output_path) if incremental else set()
+        # 既存データの最新保存日を取得（CSVはファイル末尾のみ読み込み）
+        with instrumentation.stage('fetch.read'):
+            latest_date = store.last_date(symbol) if incremental else None
         
-        if existing_dates:
-            print(f"[INFO] {symbol} の既存データ: {len(existing_dates)} 日分")
-            # 最新の保存済み日付を確認
-            latest_date = max(existing_dates)
-            print(f"       最新保存日: {latest_date}")
+        if latest_date:
+            print(f"[INFO] {symbol} の最新保存日: {latest_date}")
+        # 最新保存日から重複期間分さかのぼって取得（データ訂正の反映用）
+        start_date = fetch_start_date(start_date, end_date, latest_date, overlap_days)
+        if start_date is None:
+            print(f"[INFO] {symbol} の新規データなし（既に最新）")
+            record(change_record([]))
+            return True
         
         print(f"[INFO] {symbol} のデータを取得中...")
         print(f"       期間: {start_date} ～ {end_date}")
@@ -79,94 +373,98 @@ def fetch_stock_data(symbol: str, start_date: str, end_date: str, output_dir: Pa
         
         # Stooqからデータ取得（pandas_datareader）
         # Stooqの銘柄コードフォーマット: 9501.JP (Tokyo), 9502.JP
-        stooq_symbol = symbol.replace('.T', '.JP')
-        print(f"       Stooq銘柄コード: {stooq_symbol}")
+        stooq_code = universe.stooq_symbol(symbol) if universe is not None else stooq_symbol(symbol)
+        print(f"       Stooq銘柄コード: {stooq_code}")
         
-        df = pdr.DataReader(stooq_symbol, 'stooq', start_date, end_date)
+        with instrumentation.stage('fetch.download') as measurement:
+            df = download_price_data(symbol, stooq_code, start_date, end_date, base_url=base_url,
+                                     retries=retries, backoff=backoff, rate_limiter=rate_limiter, cache=cache)
+            measurement.rows = len(df)
         
         if df.empty:
             print(f"[WARNING] {symbol} のデータが取得できませんでした")
+            record({'status': FAILED})
             return False
         
-        # カラム名を小文字に統一
-        df.columns = df.columns.str.lower()
-        
-        # インデックスをリセット（日付列を明示的に作成）
-        df.reset_index(inplace=True)
-        if 'date' in df.columns:
-            df.rename(columns={'date': 'Date'}, inplace=True)
-        else:
-            df.rename(columns={df.columns[0]: 'Date'}, inplace=True)
-        
-        # カラム名を標準化
-        column_mapping = {
-            'open': 'Open',
-            'high': 'High',
-            'low': 'Low',
-            'close': 'Close',
-            'volume': 'Volume'
-        }
-        df.rename(columns=column_mapping, inplace=True)
-        
-        # 必要なカラムのみ選択
-        required_columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
-        df = df[required_columns]
-        
-        # 銘柄コード列を追加
-        df['symbol'] = symbol
-        
-        # 日付を文字列に変換
-        df['Date'] = pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d')
-        
-        # 増分モード: 既存データと統合
-        if incremental and existing_dates:
-            # 新規データのみフィルタ
-            new_df = df[~df['Date'].isin(existing_dates)]
-            
-            if new_df.empty:
-                print(f"[INFO] {symbol} の新規データなし（既に最新）")
-                return True
-            
-            print(f"[INFO] {symbol} の新規データ: {len(new_df)} 日分")
-            
-            # 既存データを読み込み
-            existing_df = pd.read_csv(output_path, comment='#')
-            
-            # 新旧データを結合
-            df = pd.concat([existing_df, new_df], ignore_index=True)
-        
-        # 日付でソート（昇順）
-        df['Date'] = pd.to_datetime(df['Date'])
-        df.sort_values('Date', inplace=True)
-        df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
-        
         # 出力ディレクトリを作成
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        # CSV保存（スキーマバージョン付き）
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('# schema_version: 1.0\n')
-            df.to_csv(f, index=False)
+        with instrumentation.stage('fetch.write') as measurement:
+            # 保存（増分モードでは追記、またはさかのぼった行がある場合のみ統合）
+            saved = save_price_data(store, symbol, df, latest_date, chunk_rows)
+            if saved['status'] != UPDATED:
+                print(f"[INFO] {symbol} の新規データなし（既に最新）")
         
-        print(f"[SUCCESS] {len(df)} 行のデータを保存: {output_path}")
-        if incremental and existing_dates:
-            print(f"          新規追加: {len(df) - len(existing_dates)} 行")
+            # Webフロントエンド用CSVを同期（保存形式と同じ状態ならCSVにも同じ更新を適用）
+            if export is not None:
+                if export.last_date(symbol) == latest_date:
+                    save_price_data(export, symbol, df, latest_date, chunk_rows)
+                elif chunk_rows:
+                    export.write_chunks(symbol, store.read_chunks(symbol, chunk_rows), schema_version='1.0')
+                    print(f"[SUCCESS] CSVを再出力: {export.path(symbol)}")
+                else:
+                    export.write(symbol, store.read(symbol), schema_version='1.0')
+                    print(f"[SUCCESS] CSVを再出力: {export.path(symbol)}")
+            measurement.rows = saved.get('new_rows', 0) + saved.get('revised_rows', 0)
+        record(saved)
         return True
         
     except Exception as e:
+        record({'status': FAILED})
         print(f"[ERROR] {symbol} のデータ取得中にエラー: {str(e)}")
         import traceback
         traceback.print_exc()
         return False
 
 
+def fetch_all(symbols: list, start_date: str, end_date: str, output_dir: Path, incremental: bool = True,
+              workers: int = 1, **fetch_kwargs) -> dict:
+    """
+    複数銘柄の株価データを取得（workers > 1 の場合はスレッドプールで並列取得）
+    
+    Args:
+        symbols: 銘柄コードリスト
+        start_date: 開始日 (YYYY-MM-DD)
+        end_date: 終了日 (YYYY-MM-DD)
+        output_dir: 出力ディレクトリ
+        incremental: 増分モード（既存データに追加）
+        workers: 同時実行数
+        **fetch_kwargs: fetch_stock_data へ渡す追加引数
+        
+    Returns:
+        銘柄コード → 成功フラグ の辞書（入力順）
+    """
+    results = {}
+    if workers <= 1:
+        for symbol in symbols:
+            results[symbol] = fetch_stock_data(symbol, start_date, end_date, output_dir, incremental, **fetch_kwargs)
+            print()
+        return results
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(fetch_stock_data, symbol, start_date, end_date, output_dir, incremental, **fetch_kwargs): symbol
+            for symbol in symbols
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return {symbol: results[symbol] for symbol in symbols}
+
+
 def main():
     parser = argparse.ArgumentParser(description='MarketVision株価データ取得スクリプト')
     parser.add_argument(
         '--symbols',
         type=str,
-        default='9501.T,9502.T',
-        help='取得する銘柄コード（カンマ区切り）'
+        default=UNIVERSE_KEYWORD,
+        help='取得する銘柄コード（カンマ区切り、universe: ユニバースの全銘柄、'
+             'ワイルドカード（例: "95*.T"）は出力ディレクトリの保存済み銘柄に一致、デフォルト: universe）'
+    )
+    parser.add_argument(
+        '--universe',
+        type=str,
+        default=None,
+        help='銘柄ユニバースファイル（デフォルト: scripts/universe.csv）'
     )
     parser.add_argument(
         '--years',
@@ -191,8 +489,113 @@ def main():
         action='store_true',
         help='全データを再取得（既存データを上書き）'
     )
+    parser.add_argument(
+        '--overlap-days',
+        type=int,
+        default=5,
+        help='増分モードで最新保存日からさかのぼって再取得する日数（データ訂正の反映用）'
+    )
+    parser.add_argument(
+        '--format',
+        type=str,
+        choices=FORMATS,
+        default='csv',
+        help='保存形式（csv / parquet / npy、デフォルト: csv）'
+    )
+    parser.add_argument(
+        '--no-csv-export',
+        action='store_true',
+        help='CSV以外の形式で保存する場合にWebフロントエンド用CSVを出力しない'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='並列取得数（デフォルト: 1 = 逐次）'
+    )
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=3,
+        help='取得失敗時の再試行回数'
+    )
+    parser.add_argument(
+        '--backoff',
+        type=float,
+        default=1.0,
+        help='再試行の初回待機秒数（以降2倍ずつ増加）'
+    )
+    parser.add_argument(
+        '--rate-limit',
+        type=float,
+        default=0.5,
+        help='同一ホストへのリクエスト最小間隔（秒）'
+    )
+    parser.add_argument(
+        '--manifest',
+        type=str,
+        default=None,
+        help='変更銘柄マニフェストの出力パス（デフォルト: 出力ディレクトリの _changes.json）'
+    )
+    parser.add_argument(
+        '--run-report',
+        type=str,
+        default='data/run_report.json',
+        help='実行レポート（段階ごとの処理時間・処理行数・ピークメモリ）の出力パス'
+    )
+    parser.add_argument(
+        '--profile',
+        type=str,
+        default=None,
+        help='cProfileのプロファイル出力パス（例: data/fetch.prof、指定時はtracemallocも有効化）'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        type=str,
+        default='data/fetch_cache',
+        help='取得結果のキャッシュディレクトリ（再実行時はダウンロードせずに使用）'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='取得結果をキャッシュしない'
+    )
+    parser.add_argument(
+        '--cache-ttl',
+        type=float,
+        default=6.0,
+        help='キャッシュの有効期限（時間、デフォルト: 6）'
+    )
+    parser.add_argument(
+        '--cache-max-mb',
+        type=float,
+        default=512,
+        help='キャッシュの合計サイズの上限（MB、超えた場合は古い項目から削除）'
+    )
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='ダウンロードせずキャッシュのみから取得（有効期限は無視、ネットワークなしでの再現・検証用）'
+    )
+    parser.add_argument(
+        '--chunk-rows',
+        type=int,
+        default=None,
+        help='保存済みデータの統合（訂正・補完時の再構築）をこの行数ずつ行う（長期間・分足データのメモリ使用量の上限）'
+    )
+    parser.add_argument(
+        '--base-url',
+        type=str,
+        default=None,
+        help='Stooq接続先URL（ローカル検証サーバー用）'
+    )
     
     args = parser.parse_args()
+    if args.offline and args.no_cache:
+        parser.error("--offline と --no-cache は同時に指定できません")
+    if args.chunk_rows is not None and args.chunk_rows <= 0:
+        parser.error("--chunk-rows は正の整数で指定してください")
+    instrumentation.start_profiling(args.profile)
     
     # 増分モードの決定（--fullが指定されていない場合は増分モード）
     incremental = not args.full
@@ -201,8 +604,12 @@ def main():
     end_date = datetime.now()
     start_date = end_date - timedelta(days=args.years * 365)
     
-    symbols = args.symbols.split(',')
     output_dir = Path(args.output)
+    try:
+        universe = load_universe(args.universe)
+    except (OSError, ValueError) as e:
+        parser.error(f"銘柄ユニバースを読み込めません: {e}")
+    symbols = resolve_symbols(args.symbols, universe, get_storage(args.format, output_dir))
     
     print("=" * 60)
     print("MarketVision - Stock Price Data Fetcher")
@@ -210,29 +617,56 @@ def main():
     print(f"銘柄数: {len(symbols)}")
     print(f"期間: {start_date.strftime('%Y-%m-%d')} ～ {end_date.strftime('%Y-%m-%d')}")
     print(f"出力先: {output_dir}")
+    print(f"保存形式: {args.format}")
     print(f"モード: {'増分（新規データのみ追加）' if incremental else '全体（既存データ上書き）'}")
+    print(f"並列数: {args.workers}")
+    if args.offline:
+        print(f"オフライン: キャッシュ（{args.cache_dir}）のみから取得")
     print("=" * 60)
     print()
     
-    # 各銘柄のデータを取得
-    success_count = 0
-    for symbol in symbols:
-        symbol = symbol.strip()
-        if fetch_stock_data(
-            symbol,
-            start_date.strftime('%Y-%m-%d'),
-            end_date.strftime('%Y-%m-%d'),
-            output_dir,
-            incremental
-        ):
-            success_count += 1
-        print()
+    # 各銘柄のデータを取得（変更内容は変更銘柄マニフェストに記録）
+    cache = None if args.no_cache else ResponseCache(args.cache_dir, ttl_hours=args.cache_ttl,
+                                                     max_mb=args.cache_max_mb, offline=args.offline)
+    changes = {}
+    results = fetch_all(
+        symbols,
+        start_date.strftime('%Y-%m-%d'),
+        end_date.strftime('%Y-%m-%d'),
+        output_dir,
+        incremental,
+        workers=args.workers,
+        base_url=args.base_url,
+        retries=args.retries,
+        backoff=args.backoff,
+        rate_limiter=HostRateLimiter(args.rate_limit),
+        overlap_days=args.overlap_days,
+        fmt=args.format,
+        csv_export=not args.no_csv_export,
+        universe=universe,
+        changes=changes,
+        cache=cache,
+        chunk_rows=args.chunk_rows
+    )
+    manifest = Path(args.manifest) if args.manifest else manifest_path(output_dir)
+    save_manifest(manifest, {symbol: changes.get(symbol, {'status': FAILED}) for symbol in symbols})
+    success_count = sum(results.values())
+    failed = [symbol for symbol, ok in results.items() if not ok]
     
     # 結果サマリー
     print("=" * 60)
     print(f"完了: {success_count}/{len(symbols)} 銘柄のデータ取得に成功")
+    updated = [symbol for symbol in symbols if changes.get(symbol, {}).get('status') == UPDATED]
+    print(f"更新: {len(updated)} 銘柄（変更銘柄マニフェスト: {manifest}）")
+    if cache is not None:
+        print(f"キャッシュ: {cache.hits} 件使用 / {cache.misses} 件キャッシュなし")
+    if failed:
+        print(f"失敗: {', '.join(failed)}")
     print("=" * 60)
     
+    cache_stats = {'cache_hits': cache.hits, 'cache_misses': cache.misses} if cache is not None else {}
+    instrumentation.write_run_report(args.run_report, 'fetch_price_data', symbols=len(symbols),
+                                     succeeded=success_count, updated=len(updated), **cache_stats)
     sys.exit(0 if success_count == len(symbols) else 1)
 
 
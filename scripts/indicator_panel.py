@@ -0,0 +1,79 @@
+"""
+多銘柄一括テクニカル指標計算エンジン
+全銘柄の終値を日付×銘柄の2次元パネルに揃え、テクニカル指標を
+銘柄ループなしで一括計算してから銘柄ごとのDataFrameに分配する
+"""
+
+import numpy as np
+import pandas as pd
+
+from indicator_registry import IndicatorGraph, compute_indicator_columns
+
+
+def build_close_panel(frames):
+    """銘柄ごとの株価DataFrameから終値パネルを作成
+
+    Args:
+        frames: 銘柄コード → 日付昇順の株価DataFrame（date, closeカラム必須）
+
+    Returns:
+        日付×銘柄の終値DataFrame（上場前・取引のない日はNaN）
+    """
+    panel = pd.concat(
+        {symbol: df.set_index('date')['close'] for symbol, df in frames.items()},
+        axis=1,
+    ).sort_index()
+    return panel.astype(float)
+
+
+def find_gapped_columns(closes):
+    """初回データと最終データの間に欠損がある銘柄を検出
+
+    上場前・上場廃止後の欠損は銘柄単独計算と結果が一致するが、途中の欠損（売買停止など）は
+    ローリング窓の内容が変わるため一括計算の対象外とする
+    """
+    valid = closes.notna()
+    started = valid.cummax()
+    ended = valid[::-1].cummax()[::-1]
+    gapped = (started & ended & ~valid).any()
+    return gapped[gapped].index.tolist()
+
+
+def compute_panel_indicators(closes, indicators=None):
+    """終値パネルから全銘柄のテクニカル指標を一括計算
+
+    銘柄単独の計算と同じ指標レジストリの計算グラフをパネルに適用する
+    （上場前の行はRSIの上昇幅・下落幅の窓に含めない）
+
+    Args:
+        closes: 日付×銘柄の終値DataFrame
+        indicators: 指標設定（指標名 → パラメータのリスト、Noneの場合は既定値）
+
+    Returns:
+        指標カラム名 → 日付×銘柄のDataFrame
+    """
+    return compute_indicator_columns(IndicatorGraph(closes), indicators)
+
+
+def split_panel(closes, indicators):
+    """一括計算結果を銘柄ごとのDataFrameに分配
+
+    Args:
+        closes: 日付×銘柄の終値DataFrame
+        indicators: compute_panel_indicators の戻り値
+
+    Returns:
+        銘柄コード → date・close・指標カラムを含むDataFrame（取引のあった日のみ）
+    """
+    arrays = {col: values.to_numpy() for col, values in indicators.items()}
+    dates = closes.index.to_numpy()
+    close_values = closes.to_numpy()
+
+    frames = {}
+    for i, symbol in enumerate(closes.columns):
+        rows = ~np.isnan(close_values[:, i])
+        data = {'date': dates[rows], 'close': close_values[rows, i]}
+        for col, values in arrays.items():
+            data[col] = values[rows, i]
+        frames[symbol] = pd.DataFrame(data)
+    return frames
@@ -0,0 +1,348 @@
+"""
+テクニカル指標レジストリ
+指標ごとにパラメータ・出力カラム・計算方法を登録し、移動平均・標準偏差・EMA・差分などの
+中間結果を指標間で共有する計算グラフで計算する
+
+指標の選択は次の形式の文字列（--indicators）またはJSON設定ファイル（--indicator-config）で指定する
+    sma:5,25,50,75;rsi:14;macd:12/26/9;bb:20/2
+    （指標名:パラメータ、複数パラメータは '/' 区切り、同じ指標の複数設定は ',' 区切り）
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+import kernels
+
+
+class IndicatorGraph:
+    """中間結果を共有する計算グラフ
+
+    終値は Series（1銘柄）でも日付×銘柄の DataFrame（パネル）でもよい。
+    中間結果はキーごとに1回だけ計算して保持するため、同じウィンドウの移動平均や
+    同じスパンのEMAを複数の指標が使っても計算は1回で済む。
+    1銘柄の欠損のない系列のEMA・RSIは kernels の計算カーネルで（中間の Series を作らずに）計算し、
+    パネル・欠損を含む系列は pandas で計算する
+    """
+
+    def __init__(self, close, ema_seeds=None, start=0):
+        """
+        Args:
+            close: 終値（Series または DataFrame）
+            ema_seeds: EMAのキー → 前回の最終値（増分計算時のみ指定）
+            start: ema_seeds を初期値としてEMAを延長し始める行位置（それより前の行はNaN）
+        """
+        self.nodes = {'close': close}
+        self.ema_seeds = ema_seeds or {}
+        self.start = start
+
+    def node(self, key, compute):
+        """中間結果を取得（未計算の場合のみ compute() で計算）"""
+        if key not in self.nodes:
+            self.nodes[key] = compute()
+        return self.nodes[key]
+
+    def kernel_input(self, source, start=0):
+        """計算カーネルに渡す配列（1銘柄で start 行目以降に欠損のない場合のみ、それ以外はNone）"""
+        values = self.nodes[source]
+        if not isinstance(values, pd.Series):
+            return None
+        values = values.iloc[start:]
+        return None if values.isna().any() else values.to_numpy(dtype=float)
+
+    def diff(self):
+        """前日差"""
+        return self.node('diff', lambda: self.nodes['close'].diff())
+
+    def gain(self):
+        """上昇幅（下落日は0、終値のない行はNaN）"""
+        def compute():
+            delta = self.diff()
+            return delta.where(delta > 0, 0).where(self.nodes['close'].notna())
+        return self.node('gain', compute)
+
+    def loss(self):
+        """下落幅（上昇日は0、終値のない行はNaN）"""
+        def compute():
+            delta = self.diff()
+            return (-delta.where(delta < 0, 0)).where(self.nodes['close'].notna())
+        return self.node('loss', compute)
+
+    def mean(self, source, window):
+        """移動平均（source は計算済みの中間結果のキー）"""
+        return self.node(f'mean({source},{window})',
+                         lambda: self.nodes[source].rolling(window=window).mean())
+
+    def std(self, source, window):
+        """移動標準偏差（source は計算済みの中間結果のキー）"""
+        return self.node(f'std({source},{window})',
+                         lambda: self.nodes[source].rolling(window=window).std())
+
+    def _continue(self, key, source, alpha):
+        """前回の最終値を初期値として漸化式 y[t] = (1 - alpha) * y[t-1] + alpha * x[t] を延長"""
+        values = self.nodes[source]
+        x = self.kernel_input(source, self.start)
+        if x is not None:
+            result = pd.Series(np.nan, index=values.index)
+            result.iloc[self.start:] = kernels.ema(x, alpha=alpha, seed=self.ema_seeds[key])
+            return result
+        seeded = pd.concat([pd.Series([self.ema_seeds[key]], dtype=float),
+                            pd.Series(values.iloc[self.start:], dtype=float)], ignore_index=True)
+        result = pd.Series(np.nan, index=values.index)
+        result.iloc[self.start:] = seeded.ewm(alpha=alpha, adjust=False).mean().iloc[1:].to_numpy()
+        return result
+
+    def ema(self, source, span):
+        """指数移動平均（ewm(adjust=False)、source は計算済みの中間結果のキー）"""
+        key = f'ema({source},{span})'
+
+        def compute():
+            if key in self.ema_seeds:
+                return self._continue(key, source, 2 / (span + 1))
+            x = self.kernel_input(source)
+            if x is not None:
+                return pd.Series(kernels.ema(x, span=span), index=self.nodes[source].index)
+            return self.nodes[source].ewm(span=span, adjust=False).mean()
+
+        return self.node(key, compute)
+
+    def rsi(self, window):
+        """RSI（上昇幅・下落幅の単純移動平均の比）"""
+        def compute():
+            x = self.kernel_input('close')
+            if x is not None:
+                return pd.Series(kernels.rsi(x, window), index=self.nodes['close'].index)
+            self.gain()
+            self.loss()
+            rs = self.mean('gain', window) / self.mean('loss', window)
+            return 100 - (100 / (1 + rs))
+        return self.node(f'rsi({window})', compute)
+
+    def wilder(self, source, window):
+        """Wilder平滑化（window 本の単純平均を初期値に alpha = 1 / window で平滑化）"""
+        key = f'wilder({source},{window})'
+
+        def compute():
+            if key in self.ema_seeds:
+                return self._continue(key, source, 1 / window)
+            values = self.nodes[source]
+            if isinstance(values, pd.DataFrame):
+                return values.apply(lambda column: kernels.wilder_average(column.to_numpy(), window), raw=False)
+            return pd.Series(kernels.wilder_average(values.to_numpy(), window), index=values.index)
+
+        return self.node(key, compute)
+
+    def ema_values(self):
+        """EMA・Wilder平滑化の最終値（増分計算の状態として保存する）"""
+        return {key: float(values.iloc[-1]) for key, values in self.nodes.items()
+                if key.startswith(('ema(', 'wilder('))}
+
+
+class Indicator:
+    """レジストリに登録するテクニカル指標の定義
+
+    Attributes:
+        name: 指標名（出力ファイル名 {銘柄}_{name} にも使用）
+        label: 進捗表示用の名称
+        defaults: 既定のパラメータ（タプル）のリスト
+        columns: パラメータ → 出力カラム名リスト
+        compute: (IndicatorGraph, パラメータ) → 出力カラム名 → 値 の辞書
+        lookback: パラメータ → 計算に必要な直近の終値の本数
+        recursive: EMAの漸化式を含み、増分計算で前回値の引き継ぎが必要か
+    """
+
+    def __init__(self, name, label, defaults, columns, compute, lookback, recursive=False):
+        self.name = name
+        self.label = label
+        self.defaults = defaults
+        self.columns = columns
+        self.compute = compute
+        self.lookback = lookback
+        self.recursive = recursive
+
+
+INDICATORS = {}
+
+
+def register_indicator(name, label, defaults, columns, compute, lookback, recursive=False):
+    """テクニカル指標をレジストリに登録
+
+    columns / compute / lookback はパラメータをタプルの要素ごとの引数として受け取る
+    """
+    INDICATORS[name] = Indicator(name, label, defaults, columns, compute, lookback, recursive)
+
+
+def _sma(graph, window):
+    return {f'sma_{window}': graph.mean('close', window)}
+
+
+def _rsi_columns(window):
+    return ['rsi' if window == 14 else f'rsi_{window}']
+
+
+def _rsi(graph, window):
+    return {_rsi_columns(window)[0]: graph.rsi(window)}
+
+
+def _wilder_rsi(graph, window):
+    graph.gain()
+    graph.loss()
+    rs = graph.wilder('gain', window) / graph.wilder('loss', window)
+    return {f'wilder_rsi_{window}': 100 - (100 / (1 + rs))}
+
+
+def _macd_columns(fast, slow, signal):
+    prefix = 'macd' if (fast, slow, signal) == (12, 26, 9) else f'macd_{fast}_{slow}_{signal}'
+    return [prefix, f'{prefix}_signal', f'{prefix}_hist']
+
+
+def _macd(graph, fast, slow, signal):
+    line_key = f'macd({fast},{slow})'
+    line = graph.node(line_key, lambda: graph.ema('close', fast) - graph.ema('close', slow))
+    signal_line = graph.ema(line_key, signal)
+    macd_col, signal_col, hist_col = _macd_columns(fast, slow, signal)
+    return {macd_col: line, signal_col: signal_line, hist_col: line - signal_line}
+
+
+def _bb_columns(window, num_std):
+    prefix = 'bb' if (window, num_std) == (20, 2) else f'bb_{window}_{num_std:g}'
+    return [f'{prefix}_upper', f'{prefix}_middle', f'{prefix}_lower']
+
+
+def _bb(graph, window, num_std):
+    middle = graph.mean('close', window)
+    std = graph.std('close', window)
+    upper_col, middle_col, lower_col = _bb_columns(window, num_std)
+    return {upper_col: middle + (std * num_std), middle_col: middle, lower_col: middle - (std * num_std)}
+
+
+register_indicator('sma', 'SMA', [(5,), (25,), (50,), (75,)],
+                   columns=lambda window: [f'sma_{window}'], compute=_sma,
+                   lookback=lambda window: window)
+register_indicator('rsi', 'RSI', [(14,)],
+                   columns=_rsi_columns, compute=_rsi,
+                   lookback=lambda window: window + 1)
+register_indicator('wilder_rsi', 'RSI（Wilder平滑化）', [(14,)],
+                   columns=lambda window: [f'wilder_rsi_{window}'], compute=_wilder_rsi,
+                   lookback=lambda window: 2, recursive=True)
+register_indicator('macd', 'MACD', [(12, 26, 9)],
+                   columns=_macd_columns, compute=_macd,
+                   lookback=lambda fast, slow, signal: 1, recursive=True)
+register_indicator('bb', 'ボリンジャーバンド', [(20, 2)],
+                   columns=_bb_columns, compute=_bb,
+                   lookback=lambda window, num_std: window)
+
+# 既定の指標設定（指標名 → パラメータのリスト）
+DEFAULT_INDICATORS = {name: list(INDICATORS[name].defaults) for name in ('sma', 'rsi', 'macd', 'bb')}
+
+
+def _parse_number(text):
+    """パラメータ文字列を数値に変換（整数として解釈できる場合は int）"""
+    value = float(text)
+    return int(value) if value.is_integer() and '.' not in text else value
+
+
+def normalize_indicators(indicators):
+    """指標設定を検証して 指標名 → パラメータ（タプル）のリスト に揃える
+
+    Args:
+        indicators: 指標名 → パラメータのリスト（各パラメータは数値またはリスト・タプル）、Noneの場合は既定値
+
+    Returns:
+        正規化した指標設定
+    """
+    if indicators is None:
+        return DEFAULT_INDICATORS
+    normalized = {}
+    for name, params_list in indicators.items():
+        if name not in INDICATORS:
+            raise ValueError(f"未登録の指標です: {name}（登録済み: {', '.join(INDICATORS)}）")
+        indicator = INDICATORS[name]
+        arity = len(indicator.defaults[0])
+        params_list = params_list or indicator.defaults
+        normalized[name] = []
+        for params in params_list:
+            params = tuple(params) if isinstance(params, (list, tuple)) else (params,)
+            if len(params) != arity:
+                raise ValueError(f"{name} のパラメータ数が不正です: {params}（{arity}個必要）")
+            if any(p <= 0 for p in params) or not isinstance(params[0], int):
+                raise ValueError(f"{name} のパラメータが不正です: {params}（正の値、先頭のウィンドウは整数）")
+            if params not in normalized[name]:
+                normalized[name].append(params)
+    if not normalized:
+        raise ValueError("指標が1つも指定されていません")
+    return normalized
+
+
+def parse_indicator_spec(text):
+    """指標設定文字列（例: 'sma:5,25;rsi:14;macd:12/26/9;bb:20/2'）を解析
+
+    パラメータを省略した指標（例: 'sma;rsi'）は既定のパラメータを使用する
+    """
+    indicators = {}
+    for item in text.split(';'):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, params = item.partition(':')
+        indicators[name.strip()] = [
+            tuple(_parse_number(p) for p in variant.split('/'))
+            for variant in params.split(',') if variant.strip()
+        ]
+    return normalize_indicators(indicators)
+
+
+def load_indicator_config(path):
+    """JSON設定ファイル（例: {"sma": [5, 25], "macd": [[12, 26, 9]]}）から指標設定を読み込み"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return normalize_indicators(json.load(f))
+
+
+def format_indicator_spec(indicators):
+    """指標設定を正規形の文字列に変換（増分計算の状態に保存して設定変更を検出する）"""
+    return ';'.join(
+        f"{name}:" + ','.join('/'.join(f'{p:g}' for p in params) for params in params_list)
+        for name, params_list in normalize_indicators(indicators).items()
+    )
+
+
+def indicator_outputs(indicators=None):
+    """指標名 → 出力カラム（先頭は date）の辞書"""
+    return {
+        name: ['date'] + [col for params in params_list for col in INDICATORS[name].columns(*params)]
+        for name, params_list in normalize_indicators(indicators).items()
+    }
+
+
+def indicator_lookback(indicators=None):
+    """増分計算で保持する必要のある直近の終値の本数"""
+    return max(
+        INDICATORS[name].lookback(*params)
+        for name, params_list in normalize_indicators(indicators).items()
+        for params in params_list
+    )
+
+
+def compute_indicator_columns(graph, indicators=None, recursive_only=False, progress=None):
+    """計算グラフ上で選択した指標を計算
+
+    Args:
+        graph: IndicatorGraph
+        indicators: 指標設定（Noneの場合は既定値）
+        recursive_only: Trueの場合はEMAを含む指標のみ計算（増分計算の状態作成用）
+        progress: 指標ごとに呼び出す進捗表示関数（引数: 指標の表示名）
+
+    Returns:
+        出力カラム名 → 値（終値と同じ形の Series / DataFrame）の辞書
+    """
+    columns = {}
+    for name, params_list in normalize_indicators(indicators).items():
+        indicator = INDICATORS[name]
+        if recursive_only and not indicator.recursive:
+            continue
+        if progress is not None:
+            progress(indicator.label)
+        for params in params_list:
+            columns.update(indicator.compute(graph, *params))
+    return columns
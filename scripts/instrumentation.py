@@ -0,0 +1,182 @@
+"""
+計測（インストルメンテーション）
+処理段階ごとの処理時間・呼び出し回数・処理行数（行/秒）とピークメモリを記録し、
+各スクリプトの実行結果をJSONの実行レポート（run_report.json）に書き出す
+
+    with instrumentation.stage('build.compute', rows=len(df)):
+        ...
+    with instrumentation.stage('fetch.download') as measurement:
+        df = ...
+        measurement.rows = len(df)
+
+--profile 指定時は cProfile のプロファイル（.prof、snakeviz / pstats で閲覧）を保存し、
+tracemalloc でPythonヒープのピークも記録する
+"""
+
+import atexit
+import contextlib
+import cProfile
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RUN_REPORT_SCHEMA_VERSION = '1.0'
+RUN_REPORT_NAME = 'run_report.json'
+
+
+class Measurement:
+    """計測中の段階（with ブロック内で処理行数を設定できる）"""
+
+    def __init__(self, rows=0):
+        self.rows = rows
+
+
+class Instrumentation:
+    """段階ごとの累積処理時間・呼び出し回数・処理行数（スレッドセーフ）
+
+    Args:
+        stages: 未計測でも 0 として表示する段階名（表示順）
+    """
+
+    def __init__(self, stages=()):
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stages = {name: [0.0, 0, 0] for name in stages}
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=0):
+        """with ブロックの処理時間を段階 name に加算（rows は処理行数）"""
+        measurement = Measurement(rows)
+        start = time.perf_counter()
+        try:
+            yield measurement
+        finally:
+            self.add(name, time.perf_counter() - start, rows=measurement.rows)
+
+    def add(self, name, seconds, calls=1, rows=0):
+        """段階 name に処理時間・呼び出し回数・処理行数を加算"""
+        with self._lock:
+            totals = self.stages.setdefault(name, [0.0, 0, 0])
+            totals[0] += seconds
+            totals[1] += calls
+            totals[2] += rows or 0
+
+    @property
+    def timings(self):
+        """段階名 → 累積処理時間（秒）"""
+        return {name: totals[0] for name, totals in self.stages.items()}
+
+    def snapshot(self):
+        """プロセス間で受け渡せる計測値（段階名 → [秒, 回数, 行数]）"""
+        with self._lock:
+            return {name: list(totals) for name, totals in self.stages.items()}
+
+    def merge(self, snapshot):
+        """別プロセス（プロセスプールのワーカー）の計測値を加算"""
+        for name, (seconds, calls, rows) in (snapshot or {}).items():
+            self.add(name, seconds, calls=calls, rows=rows)
+
+    def report(self):
+        """実行レポートの1項目（経過時間・段階ごとの計測値・ピークメモリ）"""
+        stages = {}
+        for name, (seconds, calls, rows) in self.snapshot().items():
+            stages[name] = {'seconds': round(seconds, 6), 'calls': calls}
+            if rows:
+                stages[name]['rows'] = rows
+                stages[name]['rows_per_second'] = round(rows / seconds, 1) if seconds > 0 else None
+        return {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'elapsed_seconds': round(time.perf_counter() - self._start, 6),
+            'stages': stages,
+            'memory': memory_usage(),
+        }
+
+
+_current = Instrumentation()
+
+
+def current():
+    """このプロセスの計測"""
+    return _current
+
+
+def reset(stages=()):
+    """このプロセスの計測をやり直す（プロセスプールのワーカーでタスクごとに使用）"""
+    global _current
+    _current = Instrumentation(stages)
+    return _current
+
+
+def stage(name, rows=0):
+    """このプロセスの計測に段階 name の処理時間を加算する with ブロック"""
+    return _current.stage(name, rows)
+
+
+def peak_rss_mb():
+    """プロセスのピーク常駐メモリ（MB、resource モジュールのないWindowsではNone）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss はLinuxではKB、macOSではバイト
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def memory_usage():
+    """ピークメモリ（常駐メモリ、tracemalloc 有効時はPythonヒープのピークも）"""
+    usage = {'peak_rss_mb': peak_rss_mb()}
+    if tracemalloc.is_tracing():
+        usage['traced_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+    return usage
+
+
+def start_profiling(profile_path):
+    """cProfile と tracemalloc を開始し、プロセス終了時（sys.exit を含む）にプロファイルを保存
+
+    Args:
+        profile_path: プロファイルの出力パス（Noneの場合は何もしない）
+    """
+    if not profile_path:
+        return
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+
+    def dump():
+        profiler.disable()
+        Path(profile_path).parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(profile_path)
+        print(f"🧪 プロファイル: {profile_path}")
+
+    atexit.register(dump)
+    profiler.enable()
+
+
+def write_run_report(path, name, instrumentation=None, **extra):
+    """実行レポートにスクリプト name の計測結果を書き込み（他のスクリプトの結果は残す）
+
+    Args:
+        path: 実行レポートのパス
+        name: スクリプト名（例: 'fetch_price_data'）
+        instrumentation: 計測（Noneの場合はこのプロセスの計測）
+        **extra: 併せて記録する値（銘柄数・成功数など）
+    """
+    path = Path(path)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        if report.get('schema_version') != RUN_REPORT_SCHEMA_VERSION:
+            raise ValueError
+    except (OSError, ValueError):
+        report = {'schema_version': RUN_REPORT_SCHEMA_VERSION, 'runs': {}}
+    report['runs'][name] = {**(instrumentation or _current).report(), **extra}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
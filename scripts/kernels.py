@@ -0,0 +1,353 @@
+"""
+テクニカル指標計算カーネル
+EMA・移動平均・RSI（単純移動平均版 / Wilder平滑化版）・MACDを1次元配列に対して計算する
+
+Numba がインストールされている場合は中間配列を作らない1パスのループをJITコンパイルして使用し、
+ない場合はNumPyのベクトル演算（EMAはブロック単位の行列積）で計算する
+結果は build_indicators の pandas 実装と浮動小数点誤差の範囲で一致する
+（indicator_registry の1銘柄の計算でEMA・RSI・Wilder平滑化の計算に使用）
+"""
+
+import functools
+import importlib.util
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# numba の import とJITコンパイルには時間がかかるため、Numba版カーネルの初回使用時まで遅らせる
+HAS_NUMBA = importlib.util.find_spec('numba') is not None
+
+BACKENDS = ('numpy', 'numba')
+
+# NumPy版EMAのブロック長（ブロック内は行列積、ブロック間の引き継ぎのみPythonループ）
+EMA_BLOCK = 64
+
+
+def available_backends():
+    """利用可能な計算バックエンド"""
+    return [backend for backend in BACKENDS if backend == 'numpy' or HAS_NUMBA]
+
+
+def _resolve_backend(backend):
+    if backend is None:
+        return 'numba' if HAS_NUMBA else 'numpy'
+    if backend not in available_backends():
+        raise ValueError(f"利用できない計算バックエンドです: {backend}（利用可能: {', '.join(available_backends())}）")
+    return backend
+
+
+def _valid_range(values):
+    """先頭・末尾の欠損を除いた計算範囲 (start, stop) を返す（途中の欠損はエラー）"""
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return 0, 0
+    start = int(np.argmax(valid))
+    stop = len(values) - int(np.argmax(valid[::-1]))
+    if not valid[start:stop].all():
+        raise ValueError("途中に欠損値を含む系列には対応していません")
+    return start, stop
+
+
+def _as_array(values):
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+# ---------------------------------------------------------------------------
+# NumPy 実装
+# ---------------------------------------------------------------------------
+
+def _ema_numpy(x, alpha, prev, out):
+    """y[t] = (1 - alpha) * y[t-1] + alpha * x[t]（y[-1] = prev）をブロック単位で計算
+
+    ブロック内は下三角の重み行列との積、ブロック間はブロック末尾の値のみ逐次引き継ぐ
+    （重みはすべて1以下のため桁落ちしない）
+    """
+    n = len(x)
+    if n == 0:
+        return
+    decay = 1.0 - alpha
+    block = min(EMA_BLOCK, n)
+    n_blocks = -(-n // block)
+    padded = np.zeros(n_blocks * block)
+    padded[:n] = x
+
+    lag = np.arange(block)[:, None] - np.arange(block)[None, :]
+    weights = np.where(lag >= 0, alpha * decay ** np.maximum(lag, 0), 0.0)
+    partial = padded.reshape(n_blocks, block) @ weights.T
+
+    # 各ブロック直前の値
+    block_decay = decay ** block
+    carries = []
+    for end in partial[:, -1].tolist():
+        carries.append(prev)
+        prev = end + block_decay * prev
+    partial += np.asarray(carries)[:, None] * (decay ** np.arange(1, block + 1))[None, :]
+    out[:] = partial.ravel()[:n]
+
+
+def _rolling_mean_numpy(x, window, out):
+    if len(x) >= window:
+        out[window - 1:] = sliding_window_view(x, window).mean(axis=1)
+
+
+def _gain_loss_numpy(x):
+    """上昇幅・下落幅（先頭行は0、calculate_rsi と同じ）"""
+    delta = np.zeros(len(x))
+    np.subtract(x[1:], x[:-1], out=delta[1:])
+    return np.maximum(delta, 0.0), np.maximum(-delta, 0.0)
+
+
+def _wilder_numpy(x, window, out):
+    """Wilder平滑化（先頭行の次から window 本の平均を初期値に alpha = 1 / window のEMA）"""
+    if len(x) <= window:
+        return
+    seed = x[1:window + 1].mean()
+    out[window] = seed
+    _ema_numpy(x[window + 1:], 1.0 / window, seed, out[window + 1:])
+
+
+def _rs_to_rsi(avg_gain, avg_loss, out):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(avg_gain, avg_loss, out=out)
+    out += 1.0
+    np.divide(100.0, out, out=out)
+    np.subtract(100.0, out, out=out)
+
+
+def _rsi_numpy(x, window, wilder, out):
+    gain, loss = _gain_loss_numpy(x)
+    avg_gain = np.full(len(x), np.nan)
+    avg_loss = np.full(len(x), np.nan)
+    average = _wilder_numpy if wilder else _rolling_mean_numpy
+    average(gain, window, avg_gain)
+    average(loss, window, avg_loss)
+    _rs_to_rsi(avg_gain, avg_loss, out)
+
+
+def _macd_numpy(x, fast, slow, signal, line, signal_line, hist):
+    ema_fast = np.empty(len(x))
+    _ema_numpy(x, 2.0 / (fast + 1), x[0], ema_fast)
+    _ema_numpy(x, 2.0 / (slow + 1), x[0], line)
+    np.subtract(ema_fast, line, out=line)
+    _ema_numpy(line, 2.0 / (signal + 1), line[0], signal_line)
+    np.subtract(line, signal_line, out=hist)
+
+
+# ---------------------------------------------------------------------------
+# Numba 実装（中間配列を作らない1パスのループ）
+# ---------------------------------------------------------------------------
+
+def _ema_loop(x, alpha, prev, out):
+    decay = 1.0 - alpha
+    for i in range(x.shape[0]):
+        prev = decay * prev + alpha * x[i]
+        out[i] = prev
+
+
+def _rolling_mean_loop(x, window, out):
+    # 移動合計はKahan補正付きで加減算
+    total = 0.0
+    comp = 0.0
+    for i in range(x.shape[0]):
+        y = x[i] - comp
+        t = total + y
+        comp = (t - total) - y
+        total = t
+        if i >= window:
+            y = -x[i - window] - comp
+            t = total + y
+            comp = (t - total) - y
+            total = t
+        if i >= window - 1:
+            out[i] = total / window
+
+
+def _rsi_loop(x, window, wilder, out):
+    n = x.shape[0]
+    sum_gain = 0.0
+    sum_loss = 0.0
+    avg_gain = 0.0
+    avg_loss = 0.0
+    n_gain = 0
+    n_loss = 0
+    for i in range(n):
+        delta = x[i] - x[i - 1] if i > 0 else 0.0
+        gain = delta if delta > 0.0 else 0.0
+        loss = -delta if delta < 0.0 else 0.0
+        if wilder:
+            if i == 0:
+                continue
+            if i <= window:
+                sum_gain += gain
+                sum_loss += loss
+                if i < window:
+                    continue
+                avg_gain = sum_gain / window
+                avg_loss = sum_loss / window
+            else:
+                avg_gain = (1.0 - 1.0 / window) * avg_gain + gain / window
+                avg_loss = (1.0 - 1.0 / window) * avg_loss + loss / window
+        else:
+            # 窓内の上昇日・下落日の数も数え、0件になったら合計の丸め誤差を捨てる
+            sum_gain += gain
+            sum_loss += loss
+            n_gain += gain > 0.0
+            n_loss += loss > 0.0
+            if i >= window:
+                old = x[i - window] - x[i - window - 1] if i > window else 0.0
+                if old > 0.0:
+                    sum_gain -= old
+                    n_gain -= 1
+                elif old < 0.0:
+                    sum_loss += old
+                    n_loss -= 1
+            if n_gain == 0:
+                sum_gain = 0.0
+            if n_loss == 0:
+                sum_loss = 0.0
+            if i < window - 1:
+                continue
+            avg_gain = sum_gain / window
+            avg_loss = sum_loss / window
+        out[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+def _macd_loop(x, fast, slow, signal, line, signal_line, hist):
+    alpha_fast = 2.0 / (fast + 1)
+    alpha_slow = 2.0 / (slow + 1)
+    alpha_signal = 2.0 / (signal + 1)
+    ema_fast = x[0]
+    ema_slow = x[0]
+    sig = 0.0
+    for i in range(x.shape[0]):
+        if i > 0:
+            ema_fast = (1.0 - alpha_fast) * ema_fast + alpha_fast * x[i]
+            ema_slow = (1.0 - alpha_slow) * ema_slow + alpha_slow * x[i]
+        value = ema_fast - ema_slow
+        sig = value if i == 0 else (1.0 - alpha_signal) * sig + alpha_signal * value
+        line[i] = value
+        signal_line[i] = sig
+        hist[i] = value - sig
+
+
+def _wilder_loop(ema_loop, x, window, out):
+    if x.shape[0] <= window:
+        return
+    seed = x[1:window + 1].mean()
+    out[window] = seed
+    ema_loop(x[window + 1:], 1.0 / window, seed, out[window + 1:])
+
+
+@functools.lru_cache(maxsize=None)
+def _numba_kernels():
+    """Numba版カーネルをJITコンパイル（初回のみ、cache=True でコンパイル結果はディスクにも保存）"""
+    import numba
+    # error_model='numpy': 0除算は例外ではなく inf / nan（pandas と同じ）
+    jit = numba.njit(cache=True, nogil=True, error_model='numpy')
+    kernels = {
+        'ema': jit(_ema_loop),
+        'rolling_mean': jit(_rolling_mean_loop),
+        'rsi': jit(_rsi_loop),
+        'macd': jit(_macd_loop),
+    }
+    kernels['wilder'] = functools.partial(_wilder_loop, kernels['ema'])
+    return kernels
+
+
+# ---------------------------------------------------------------------------
+# 公開関数
+# ---------------------------------------------------------------------------
+
+def ema(values, span=None, alpha=None, seed=None, backend=None):
+    """指数移動平均（pandas の ewm(adjust=False).mean() と同じ漸化式）
+
+    Args:
+        values: 1次元配列（先頭・末尾の欠損は可、途中の欠損は不可）
+        span / alpha: 平滑化パラメータ（alpha = 2 / (span + 1)）
+        seed: 前回の最終値（指定時は values の直前の値として漸化式を延長）
+        backend: 'numpy' / 'numba'（Noneの場合はNumbaがあればNumba）
+
+    Returns:
+        values と同じ長さの配列（計算範囲外はNaN）
+    """
+    backend = _resolve_backend(backend)
+    if alpha is None:
+        alpha = 2.0 / (span + 1)
+    x = _as_array(values)
+    out = np.full(len(x), np.nan)
+    start, stop = _valid_range(x)
+    if stop > start:
+        kernel = _numba_kernels()['ema'] if backend == 'numba' else _ema_numpy
+        if seed is None:
+            # 先頭の値はそのまま初期値とする（(1 - alpha) * x + alpha * x の丸め誤差を入れない、pandas と同じ）
+            out[start] = x[start]
+            kernel(x[start + 1:stop], alpha, x[start], out[start + 1:stop])
+        else:
+            kernel(x[start:stop], alpha, float(seed), out[start:stop])
+    return out
+
+
+def rolling_mean(values, window, backend=None):
+    """単純移動平均（pandas の rolling(window).mean() と同じ）"""
+    backend = _resolve_backend(backend)
+    x = _as_array(values)
+    out = np.full(len(x), np.nan)
+    start, stop = _valid_range(x)
+    kernel = _numba_kernels()['rolling_mean'] if backend == 'numba' else _rolling_mean_numpy
+    kernel(x[start:stop], window, out[start:stop])
+    return out
+
+
+def wilder_average(values, window, backend=None):
+    """Wilder平滑化による平均（RSIの平均上昇幅・平均下落幅）
+
+    計算範囲の先頭の値は前日差のない行として除き、続く window 本の単純平均を初期値として
+    alpha = 1 / window で平滑化する
+    """
+    backend = _resolve_backend(backend)
+    x = _as_array(values)
+    out = np.full(len(x), np.nan)
+    start, stop = _valid_range(x)
+    kernel = _numba_kernels()['wilder'] if backend == 'numba' else _wilder_numpy
+    kernel(x[start:stop], window, out[start:stop])
+    return out
+
+
+def rsi(values, window=14, method='sma', backend=None):
+    """RSI（相対力指数）
+
+    Args:
+        values: 終値の1次元配列
+        window: ウィンドウサイズ
+        method: 'sma'（calculate_rsi と同じ単純移動平均）または 'wilder'（Wilder平滑化）
+        backend: 'numpy' / 'numba'
+
+    Returns:
+        values と同じ長さの配列
+    """
+    if method not in ('sma', 'wilder'):
+        raise ValueError(f"RSIの計算方法が不正です: {method}（sma / wilder）")
+    backend = _resolve_backend(backend)
+    x = _as_array(values)
+    out = np.full(len(x), np.nan)
+    start, stop = _valid_range(x)
+    if stop > start:
+        kernel = _numba_kernels()['rsi'] if backend == 'numba' else _rsi_numpy
+        kernel(x[start:stop], window, method == 'wilder', out[start:stop])
+    return out
+
+
+def macd(values, fast=12, slow=26, signal=9, backend=None):
+    """MACD（calculate_macd と同じ）
+
+    Returns:
+        (MACD, シグナル, ヒストグラム) の配列
+    """
+    backend = _resolve_backend(backend)
+    x = _as_array(values)
+    outputs = tuple(np.full(len(x), np.nan) for _ in range(3))
+    start, stop = _valid_range(x)
+    if stop > start:
+        kernel = _numba_kernels()['macd'] if backend == 'numba' else _macd_numpy
+        kernel(x[start:stop], fast, slow, signal, *(out[start:stop] for out in outputs))
+    return outputs
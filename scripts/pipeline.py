@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+MarketVision データパイプライン
+株価データの取得 → テクニカル指標計算 → 検証 を1プロセスで実行する
+
+各段階の結果はファイルを介さずDataFrameのまま次の段階へ渡し、成果物（株価データ・指標・
+増分計算の状態）は銘柄ごとに検証後1回だけ書き込む。新規行のみ取得した銘柄は、指標の状態から
+新規行のみ計算・検証して追記する（保存済みの株価データは重複期間と状態の保持期間のみ読み込む）。
+段階ごとの処理時間を表示し、検証レポートにも記録する
+"""
+
+import argparse
+import json
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+import instrumentation
+from build_indicators import (LAYOUTS, MULTIRES_MODES, build_indicator_state, compute_indicators, extend_indicators,
+                              is_up_to_date, load_incremental_state, matches_state, output_names, output_stores,
+                              prepare_price_frame, save_indicator_state, state_path, update_multires_outputs,
+                              update_snapshot, write_indicator_outputs, write_multires_outputs)
+from changes import UPDATED, outputs_up_to_date
+from fetch_cache import ResponseCache
+from fetch_price_data import (HostRateLimiter, download_price_data, fetch_start_date, merge_price_data,
+                              save_price_data)
+from indicator_registry import DEFAULT_INDICATORS, format_indicator_spec, load_indicator_config, parse_indicator_spec
+from storage import FORMATS, get_storage, read_price_frame
+from universe import UNIVERSE_KEYWORD, load_universe, resolve_symbols, stooq_symbol
+from validate_data import (INDICATOR_TYPES, append_result, check_indicator_frame, check_price_frame,
+                           load_previous_results, validation_result)
+
+# 処理段階（表示順）
+STAGES = ('read', 'fetch', 'build', 'validate', 'write')
+
+STAGE_LABELS = {
+    'read': '株価データ読み込み',
+    'fetch': '株価データ取得',
+    'build': '指標計算',
+    'validate': '検証',
+    'write': '書き込み',
+}
+
+
+def stage_timer():
+    """段階ごとの計測（並列実行時は各スレッドの処理時間の合計）"""
+    return instrumentation.Instrumentation(STAGES)
+
+
+def _run_symbol_incremental(symbol, fetched, latest_date, price_stores, indicator_stores, indicator_dir, validated,
+                            keys, previous, layout='split', indicators=None, multires=False, timer=None):
+    """取得データの新規行のみを指標の状態から計算・検証して追記（保存済みの行は状態の先頭日以降のみ読み込む）
+
+    新規行の検証結果は前回の検証結果に合算する（全体を検証し直した場合と同じ結果）
+
+    Returns:
+        検証結果のリスト、増分処理できない場合（状態・前回の検証結果なし、過去データの訂正など）None
+    """
+    price_store = price_stores[0]
+    state = load_incremental_state(symbol, indicator_dir, indicator_stores, layout, indicators)
+    if state is None or state['last_date'] != latest_date or 'rows' not in state \
+            or not previous or not all(key in previous for key in keys) \
+            or any(store.last_date(symbol) != latest_date for store in price_stores[1:]):
+        return None
+
+    with timer.stage('read') as measurement:
+        stored = read_price_frame(price_store, symbol, since=state['dates'][0])
+        measurement.rows = len(stored)
+    prices = prepare_price_frame(stored.copy(), symbol)
+    if prices is None or not matches_state(prices, state):
+        return None
+    df, record = merge_price_data(stored, fetched)
+    if record['status'] != UPDATED or record.get('revised_rows'):
+        return None
+
+    # 新規行（インデックスは出力ファイル内の行番号）
+    new_df = df[df['Date'] > latest_date]
+    new_df = new_df.set_axis(range(state['rows'], state['rows'] + len(new_df)))
+    closes = prices['close'].dropna()
+    previous_close = closes.iloc[-1] if len(closes) else None
+
+    with timer.stage('build', rows=len(new_df)):
+        new_prices = prepare_price_frame(new_df.copy(), symbol)
+        if new_prices is None:
+            return None
+        tail, new_state = extend_indicators(state, new_prices.reset_index(drop=True), indicators)
+        tail.index = new_df.index
+
+    with timer.stage('validate', rows=len(new_df)):
+        price_key = keys[0]
+        results = [append_result(previous[price_key], new_df, 'price',
+                                 *check_price_frame(new_df.copy(), previous_close, symbol=symbol))]
+        for (name, indicator_type), key in zip(validated.items(), keys[1:]):
+            frame = tail[output_names(symbol, layout, indicators)[name]].copy()
+            results.append(append_result(previous[key], frame, indicator_type,
+                                         *check_indicator_frame(frame, indicator_type)))
+
+    with timer.stage('write', rows=len(new_df)):
+        for store in price_stores:
+            save_price_data(store, symbol, fetched, latest_date)
+        write_indicator_outputs(tail, symbol, indicator_stores, append=True, layout=layout, indicators=indicators)
+        save_indicator_state(state_path(indicator_dir, symbol), new_state)
+
+    if multires:
+        # 間引き系列と週足・月足の最終足は新規行で変わるため、直近の期間のみ作り直す（追記できない）
+        with timer.stage('write'):
+            update_multires_outputs(symbol, price_store, indicator_stores, new_prices['date'].iloc[0], layout,
+                                    indicators, multires)
+    return results
+
+
+def run_symbol(symbol, price_dir, indicator_dir, start_date, end_date, fmt='csv', csv_export=True,
+               incremental=True, fetch=True, overlap_days=5, layout='split', indicators=None, universe=None,
+               timer=None, force=False, report=None, previous=None, multires=False, **read_kwargs):
+    """1銘柄の取得 → 指標計算 → 検証 → 書き込みを実行
+
+    増分取得で新規行のみ取得した場合は、指標の状態から新規行のみ計算・検証して追記する
+    （状態がない・過去データが訂正された場合などは全期間を計算して書き込む）
+
+    Args:
+        symbol: 銘柄コード
+        price_dir: 株価データディレクトリ
+        indicator_dir: 指標出力ディレクトリ
+        start_date: 取得開始日 (YYYY-MM-DD)
+        end_date: 取得終了日 (YYYY-MM-DD)
+        fmt: 保存形式（'csv', 'parquet', 'npy'）
+        csv_export: CSV以外の形式の場合にWebフロントエンド用CSVも出力するか
+        incremental: 保存済みの株価データに最新保存日以降（重複期間を含む）の取得データを統合するか
+        fetch: Falseの場合は取得せず保存済みの株価データから計算
+        overlap_days: 増分取得で最新保存日からさかのぼって再取得する日数
+        layout: 指標の出力レイアウト（'split', 'combined', 'both'）
+        indicators: 指標設定（Noneの場合は既定値）
+        universe: 銘柄ユニバース（Stooqの銘柄コードの対応に使用）
+        timer: 段階ごとの計測（stage_timer の戻り値、Noneの場合はこのプロセスの計測）
+        force: Trueの場合は株価データに変更がなくても指標計算・検証・書き込みを行う
+        report: 前回の検証レポートのパス（変更のない銘柄の省略判定用）
+        previous: 前回の検証レポートの結果（validate_data.load_previous_results の戻り値、新規行の検証結果の合算にも使用）
+        multires: 複数解像度の出力も書き込むか（build_indicators.process_symbol と同じ）
+        **read_kwargs: read_stooq へ渡す追加引数（base_url, retries, backoff, rate_limiter, cache）
+
+    Returns:
+        (成功フラグ, 検証結果のリスト)（取得に失敗した場合も保存済みのデータがあれば検証結果を返す）
+    """
+    timer = timer or instrumentation.current()
+    price_stores = output_stores(price_dir, fmt, csv_export)
+    indicator_stores = output_stores(indicator_dir, fmt, csv_export)
+    price_store = price_stores[0]
+
+    # 検証対象（検証レポートのファイルパスは書き込み先）
+    outputs = output_names(symbol, layout, indicators)
+    validated = {name: name[len(symbol) + 1:] for name in outputs
+                 if name[len(symbol) + 1:] in INDICATOR_TYPES + ['indicators']}
+    keys = [(str(price_store.path(symbol)), 'price')] + [
+        (str(indicator_stores[0].path(name)), indicator_type) for name, indicator_type in validated.items()]
+
+    # 取得しない場合は保存済みの株価データ全体、増分取得の場合は最新保存日のみ読み込む（CSVはファイル末尾のみ）
+    df = None
+    latest_date = None
+    with timer.stage('read') as measurement:
+        if price_store.exists(symbol):
+            if not fetch:
+                df = read_price_frame(price_store, symbol)
+                measurement.rows = len(df)
+            elif incremental:
+                latest_date = price_store.last_date(symbol)
+    fetched = None
+    changed = False
+    fetch_ok = True
+
+    if fetch:
+        # 最新保存日から重複期間分さかのぼって取得（データ訂正の反映用）
+        fetch_start = fetch_start_date(start_date, end_date, latest_date, overlap_days)
+        if fetch_start is None:
+            print(f"[INFO] {symbol} の新規データなし（既に最新）")
+        else:
+            stooq_code = universe.stooq_symbol(symbol) if universe is not None else stooq_symbol(symbol)
+            print(f"[INFO] {symbol} のデータを取得中...（{fetch_start} ～ {end_date}、Stooq: {stooq_code}）")
+            with timer.stage('fetch') as measurement:
+                try:
+                    fetched = download_price_data(symbol, stooq_code, fetch_start, end_date, **read_kwargs)
+                    measurement.rows = len(fetched)
+                except Exception as e:
+                    print(f"[ERROR] {symbol} のデータ取得中にエラー: {e}")
+                    fetched = None
+            if fetched is None or fetched.empty:
+                # 取得できなくても保存済みのデータがあれば指標計算・検証は行う（結果は失敗扱い）
+                print(f"[WARNING] {symbol} のデータが取得できませんでした")
+                fetched = None
+                fetch_ok = False
+
+    if fetched is not None:
+        if latest_date is None:
+            df, record = merge_price_data(None, fetched)
+        else:
+            # 重複期間の保存済みデータのみ読み込んで取得データと照合
+            with timer.stage('read') as measurement:
+                stored = read_price_frame(price_store, symbol, since=fetched['Date'].min())
+                measurement.rows = len(stored)
+            _, record = merge_price_data(stored, fetched)
+        changed = record['status'] == UPDATED
+        print(f"[INFO] {symbol} の新規データ: {record.get('new_rows', 0)} 日分、"
+              f"訂正・補完: {record.get('revised_rows', 0)} 日分")
+
+    appended = changed and latest_date is not None and not record.get('revised_rows')
+    if appended:
+        results = _run_symbol_incremental(symbol, fetched, latest_date, price_stores, indicator_stores, indicator_dir,
+                                          validated, keys, previous, layout, indicators, multires, timer)
+        if results is not None:
+            return fetch_ok, results
+        print(f"[INFO] {symbol} は増分計算できないため全期間を再計算します")
+
+    if df is None and not price_store.exists(symbol):
+        print(f"エラー: {price_store.path(symbol)} が存在しません")
+        return False, []
+
+    # 株価データに変更がなく、出力・前回の検証結果も最新の銘柄は省略（make と同様）
+    if not changed and not force and previous and all(key in previous for key in keys) \
+            and all(store.exists(symbol) for store in price_stores) \
+            and is_up_to_date(symbol, price_dir, indicator_dir, fmt, csv_export, layout, indicators, multires) \
+            and outputs_up_to_date([path for path, _ in keys], [report]):
+        print(f"[INFO] {symbol} は変更なし（指標計算・検証を省略）")
+        return fetch_ok, [previous[key] for key in keys]
+
+    if df is None:
+        # 全期間を計算する場合のみ保存済みの株価データ全体を読み込む
+        with timer.stage('read') as measurement:
+            df = read_price_frame(price_store, symbol)
+            measurement.rows = len(df)
+        if fetched is not None:
+            df, record = merge_price_data(df, fetched)
+
+    with timer.stage('build', rows=len(df)):
+        prices = prepare_price_frame(df.copy(), symbol)
+        if prices is None:
+            return False, []
+        computed = compute_indicators(prices, symbol, indicators)
+        state = build_indicator_state(computed, indicators)
+
+    # 書き込み前のデータを検証
+    with timer.stage('validate', rows=len(df)):
+        results = [validation_result(price_store.path(symbol), 'price', *check_price_frame(df.copy(), symbol=symbol))]
+        for name, indicator_type in validated.items():
+            results.append(validation_result(indicator_stores[0].path(name), indicator_type,
+                                             *check_indicator_frame(computed[outputs[name]], indicator_type)))
+
+    with timer.stage('write', rows=len(df)):
+        for store in price_stores:
+            if appended and store.last_date(symbol) == latest_date:
+                # 新規行のみの場合は保存済みの株価データに追記
+                save_price_data(store, symbol, fetched, latest_date)
+            elif changed or not store.exists(symbol):
+                store.write(symbol, df, schema_version='1.0')
+                print(f"[SUCCESS] {len(df)} 行のデータを保存: {store.path(symbol)}")
+        write_indicator_outputs(computed, symbol, indicator_stores, layout=layout, indicators=indicators)
+        if multires:
+            write_multires_outputs(computed, symbol, indicator_stores, indicators, multires)
+        save_indicator_state(state_path(indicator_dir, symbol), state)
+
+    return fetch_ok, results
+
+
+def run_pipeline(symbols, price_dir, indicator_dir, start_date, end_date, workers=1, timer=None, **kwargs):
+    """複数銘柄のパイプラインを実行（workers > 1 の場合は銘柄単位でスレッドプールで並列実行）
+
+    Args:
+        symbols: 銘柄コードリスト
+        price_dir / indicator_dir / start_date / end_date: run_symbol と同じ
+        workers: 同時実行数
+        timer: 段階ごとの計測（Noneの場合はこのプロセスの計測）
+        **kwargs: run_symbol へ渡す追加引数
+
+    Returns:
+        銘柄コード → (成功フラグ, 検証結果のリスト) の辞書（入力順）
+    """
+    def run(symbol):
+        try:
+            return run_symbol(symbol, price_dir, indicator_dir, start_date, end_date, timer=timer, **kwargs)
+        except Exception as e:
+            print(f"[ERROR] {symbol} の処理中に例外が発生しました: {e}")
+            traceback.print_exc(file=sys.stdout)
+            return False, []
+
+    results = {}
+    if workers <= 1:
+        for symbol in symbols:
+            print(f"--- {symbol} ---")
+            results[symbol] = run(symbol)
+            print()
+        return results
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run, symbol): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return {symbol: results[symbol] for symbol in symbols}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MarketVisionデータパイプライン（取得 → 指標計算 → 検証）')
+    parser.add_argument('--symbols', type=str, default=UNIVERSE_KEYWORD,
+                        help='銘柄コード（カンマ区切り、universe: ユニバースの全銘柄、'
+                             'ワイルドカード（例: "*"）は株価ディレクトリの保存済み銘柄に一致、デフォルト: universe）')
+    parser.add_argument('--universe', type=str, default=None,
+                        help='銘柄ユニバースファイル（デフォルト: scripts/universe.csv）')
+    parser.add_argument('--years', type=int, default=10,
+                        help='過去何年分のデータを取得するか')
+    parser.add_argument('--price-dir', type=str, default='data/price',
+                        help='株価データディレクトリ')
+    parser.add_argument('--indicator-dir', type=str, default='data/indicators',
+                        help='指標出力ディレクトリ')
+    parser.add_argument('--output', type=str, default='data/validation_report.json',
+                        help='検証レポート出力パス（JSON）')
+    parser.add_argument('--format', type=str, choices=FORMATS, default='csv',
+                        help='保存形式（csv / parquet / npy、デフォルト: csv）')
+    parser.add_argument('--no-csv-export', action='store_true',
+                        help='CSV以外の形式の場合にWebフロントエンド用CSVを出力しない')
+    parser.add_argument('--full', action='store_true',
+                        help='全データを再取得（既存の株価データを上書き）')
+    parser.add_argument('--no-fetch', action='store_true',
+                        help='株価データを取得せず保存済みのデータから指標計算・検証のみ行う')
+    parser.add_argument('--overlap-days', type=int, default=5,
+                        help='増分取得で最新保存日からさかのぼって再取得する日数（データ訂正の反映用）')
+    parser.add_argument('--layout', type=str, choices=LAYOUTS, default='split',
+                        help='指標の出力レイアウト（split / combined / both）')
+    parser.add_argument('--multires', nargs='?', choices=MULTIRES_MODES, const='downsample', default=None,
+                        help='長期間の表示用の間引き系列（{銘柄}_3y / _5y）も出力（all: 週足・月足 {銘柄}_weekly / _monthly も出力）')
+    indicator_group = parser.add_mutually_exclusive_group()
+    indicator_group.add_argument('--indicators', type=str, default=None,
+                                 help='計算する指標と期間（例: "sma:5,25,50,75;rsi:14;macd:12/26/9;bb:20/2"）')
+    indicator_group.add_argument('--indicator-config', type=str, default=None,
+                                 help='指標設定のJSONファイル')
+    parser.add_argument('--force', action='store_true',
+                        help='株価データに変更のない銘柄も指標計算・検証・書き込みを行う')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='並列処理数（銘柄単位、デフォルト: 1 = 逐次）')
+    parser.add_argument('--retries', type=int, default=3,
+                        help='取得失敗時の再試行回数')
+    parser.add_argument('--backoff', type=float, default=1.0,
+                        help='再試行の初回待機秒数（以降2倍ずつ増加）')
+    parser.add_argument('--rate-limit', type=float, default=0.5,
+                        help='同一ホストへのリクエスト最小間隔（秒）')
+    parser.add_argument('--cache-dir', type=str, default='data/fetch_cache',
+                        help='取得結果のキャッシュディレクトリ（再実行時はダウンロードせずに使用）')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='取得結果をキャッシュしない')
+    parser.add_argument('--cache-ttl', type=float, default=6.0,
+                        help='キャッシュの有効期限（時間、デフォルト: 6）')
+    parser.add_argument('--cache-max-mb', type=float, default=512,
+                        help='キャッシュの合計サイズの上限（MB、超えた場合は古い項目から削除）')
+    parser.add_argument('--offline', action='store_true',
+                        help='ダウンロードせずキャッシュのみから取得（有効期限は無視、ネットワークなしでの再現・検証用）')
+    parser.add_argument('--base-url', type=str, default=None,
+                        help='Stooq接続先URL（ローカル検証サーバー用）')
+    parser.add_argument('--run-report', type=str, default=None,
+                        help='実行レポート（段階ごとの処理時間・処理行数・ピークメモリ）の出力パス'
+                             '（デフォルト: 検証レポートと同じディレクトリの run_report.json）')
+    parser.add_argument('--profile', type=str, default=None,
+                        help='cProfileのプロファイル出力パス（例: data/pipeline.prof、指定時はtracemallocも有効化）')
+
+    args = parser.parse_args()
+    if args.offline and args.no_cache:
+        parser.error("--offline と --no-cache は同時に指定できません")
+    instrumentation.start_profiling(args.profile)
+    try:
+        universe = load_universe(args.universe)
+    except (OSError, ValueError) as e:
+        parser.error(f"銘柄ユニバースを読み込めません: {e}")
+    try:
+        if args.indicator_config:
+            indicators = load_indicator_config(args.indicator_config)
+        elif args.indicators:
+            indicators = parse_indicator_spec(args.indicators)
+        else:
+            indicators = DEFAULT_INDICATORS
+    except (OSError, ValueError) as e:
+        parser.error(f"指標設定が不正です: {e}")
+    symbols = resolve_symbols(args.symbols, universe, get_storage(args.format, args.price_dir))
+
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=args.years * 365)
+
+    print("=" * 60)
+    print("MarketVision - Data Pipeline")
+    print("=" * 60)
+    print(f"銘柄数: {len(symbols)}")
+    print(f"期間: {start_date.strftime('%Y-%m-%d')} ～ {end_date.strftime('%Y-%m-%d')}")
+    print(f"株価データ: {args.price_dir}")
+    print(f"指標: {args.indicator_dir}（{format_indicator_spec(indicators)}、レイアウト: {args.layout}）")
+    print(f"保存形式: {args.format}")
+    print(f"モード: {'取得なし' if args.no_fetch else '全体' if args.full else '増分'}")
+    print(f"並列数: {args.workers}")
+    if args.offline:
+        print(f"オフライン: キャッシュ（{args.cache_dir}）のみから取得")
+    print("=" * 60)
+    print()
+
+    cache = None if args.no_cache else ResponseCache(args.cache_dir, ttl_hours=args.cache_ttl,
+                                                     max_mb=args.cache_max_mb, offline=args.offline)
+    timer = stage_timer()
+    started = time.perf_counter()
+    results = run_pipeline(
+        symbols, args.price_dir, args.indicator_dir,
+        start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'),
+        workers=args.workers,
+        timer=timer,
+        fmt=args.format,
+        csv_export=not args.no_csv_export,
+        incremental=not args.full,
+        fetch=not args.no_fetch,
+        overlap_days=args.overlap_days,
+        layout=args.layout,
+        indicators=indicators,
+        universe=universe,
+        force=args.force,
+        multires=args.multires,
+        report=args.output,
+        previous=load_previous_results(args.output),
+        base_url=args.base_url,
+        retries=args.retries,
+        backoff=args.backoff,
+        rate_limiter=HostRateLimiter(args.rate_limit),
+        cache=cache,
+    )
+    update_snapshot(args.indicator_dir, [symbol for symbol, (ok, _) in results.items() if ok], args.format,
+                    not args.no_csv_export)
+    elapsed = time.perf_counter() - started
+
+    failed = [symbol for symbol, (ok, _) in results.items() if not ok]
+    validation = [result for _, entries in results.values() for result in entries]
+    total_errors = sum(len(result['errors']) for result in validation)
+    for result in validation:
+        for err in result['errors']:
+            print(f"❌ {result['file']}: {err}")
+
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'timestamp': pd.Timestamp.now().isoformat(),
+            'timings': {stage: round(seconds, 4) for stage, seconds in timer.timings.items()},
+            'results': validation,
+        }, f, ensure_ascii=False, indent=2)
+
+    print("=" * 60)
+    print("⏱️  処理時間")
+    for stage in STAGES:
+        print(f"  {STAGE_LABELS[stage]:<12} {timer.timings[stage]:>8.2f}秒")
+    print(f"  {'合計（実時間）':<12} {elapsed:>8.2f}秒")
+    if cache is not None and not args.no_fetch:
+        print(f"キャッシュ: {cache.hits} 件使用 / {cache.misses} 件キャッシュなし")
+    run_report = Path(args.run_report or output_path.with_name(instrumentation.RUN_REPORT_NAME))
+    cache_stats = {'cache_hits': cache.hits, 'cache_misses': cache.misses} if cache is not None else {}
+    instrumentation.write_run_report(run_report, 'pipeline', timer, symbols=len(symbols),
+                                     failed=len(failed), errors=total_errors, **cache_stats)
+    print(f"📄 検証レポート: {output_path}")
+    print(f"📄 実行レポート: {run_report}")
+    print(f"完了: {len(symbols) - len(failed)}/{len(symbols)} 銘柄（検証エラー: {total_errors}）")
+    if failed:
+        print(f"失敗: {', '.join(failed)}")
+    print("=" * 60)
+
+    sys.exit(0 if not failed and total_errors == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+静的配信用データの発行
+株価データ・指標データのCSVを内容のハッシュ付きのファイル名でコピーし、gzip / brotli で
+事前圧縮したファイルを並べて出力する。フロントエンドは manifest.json から銘柄ごとの現在の
+ファイル名を調べて読み込むため、内容が変わらないファイルは同じURLのままブラウザ・CDNに
+無期限にキャッシュできる
+
+    <出力ディレクトリ>/manifest.json
+    <出力ディレクトリ>/artifacts/price/9501.T.<ハッシュ>.csv(.gz / .br)
+    <出力ディレクトリ>/artifacts/indicators/9501.T_indicators.<ハッシュ>.csv(.gz / .br)
+
+マニフェスト:
+    {"schema_version": "1.0", "timestamp": "...", "compression": ["gzip", "br"],
+     "symbols": {"9501.T": {"price": "artifacts/price/9501.T.<ハッシュ>.csv",
+                            "indicators": "artifacts/indicators/9501.T_indicators.<ハッシュ>.csv", ...}}}
+
+.gz / .br は事前圧縮ファイルを配信できるサーバー（nginx の gzip_static / brotli_static など）で使用する。
+brotli は brotli パッケージがある場合のみ出力する
+"""
+
+import argparse
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+import instrumentation
+
+MANIFEST_SCHEMA_VERSION = '1.0'
+MANIFEST_NAME = 'manifest.json'
+ARTIFACTS_DIR = 'artifacts'
+
+HAS_BROTLI = importlib.util.find_spec('brotli') is not None
+
+# 圧縮形式 → 拡張子
+COMPRESSIONS = {'gzip': '.gz', 'br': '.br'}
+
+# ハッシュの桁数（sha256 の先頭）
+HASH_LENGTH = 12
+
+
+def content_hash(data):
+    """内容のハッシュ（sha256 の先頭 HASH_LENGTH 桁）"""
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def compress(data, method):
+    """圧縮（同じ内容からは常に同じバイト列を出力する）
+
+    Args:
+        data: 元の内容
+        method: 'gzip' / 'br'
+    """
+    if method == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if method == 'br':
+        import brotli
+        return brotli.compress(data, quality=11)
+    raise ValueError(f"未対応の圧縮形式: {method}")
+
+
+def available_compressions(requested):
+    """使用する圧縮形式（brotli パッケージがない場合は br を除く）"""
+    methods = []
+    for method in requested:
+        if method not in COMPRESSIONS:
+            raise ValueError(f"未対応の圧縮形式: {method}（{' / '.join(COMPRESSIONS)}）")
+        if method == 'br' and not HAS_BROTLI:
+            print("警告: brotli パッケージがないため .br は出力しません（実行: pip install -r scripts/requirements-publish.txt）")
+            continue
+        methods.append(method)
+    return methods
+
+
+def collect_files(price_dir, indicator_dir, symbols=None):
+    """銘柄ごとの発行対象のCSV
+
+    株価データディレクトリの {銘柄}.csv を銘柄とし、指標データディレクトリの
+    {銘柄}_{種類}.csv（指標ごと・全指標まとめ・週足・月足・間引き系列）を対応付ける
+
+    Args:
+        price_dir: 株価データディレクトリ
+        indicator_dir: 指標データディレクトリ
+        symbols: 対象の銘柄コード（Noneの場合は株価データのある全銘柄）
+
+    Returns:
+        銘柄コード → {種類（株価は 'price'）: ファイルパス}
+    """
+    price_dir, indicator_dir = Path(price_dir), Path(indicator_dir)
+    found = sorted(path.stem for path in price_dir.glob('*.csv') if not path.name.startswith('_'))
+    if symbols is not None:
+        found = [symbol for symbol in found if symbol in set(symbols)]
+    files = {symbol: {'price': price_dir / f"{symbol}.csv"} for symbol in found}
+    # 長い銘柄コードを先に照合する（'A.T' と 'A.T_X' のような前方一致を区別）
+    by_length = sorted(found, key=len, reverse=True)
+    for path in sorted(indicator_dir.glob('*.csv')):
+        for symbol in by_length:
+            if path.stem.startswith(f"{symbol}_"):
+                files[symbol][path.stem[len(symbol) + 1:]] = path
+                break
+    return files
+
+
+def _write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def publish_file(src, dest_dir, methods):
+    """1ファイルをハッシュ付きのファイル名で出力（同じ内容のファイルがある場合は書き込まない）
+
+    Args:
+        src: 元のファイル
+        dest_dir: 出力先ディレクトリ
+        methods: 圧縮形式
+
+    Returns:
+        (出力したファイル名, 新規に書き込んだか, 元のサイズ, 圧縮形式 → 圧縮後のサイズ)
+    """
+    src = Path(src)
+    data = src.read_bytes()
+    path = dest_dir / f"{src.stem}.{content_hash(data)}{src.suffix}"
+    written = not path.exists()
+    if written:
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        _write_atomic(path, data)
+    sizes = {}
+    for method in methods:
+        compressed_path = path.with_name(path.name + COMPRESSIONS[method])
+        if not compressed_path.exists():
+            _write_atomic(compressed_path, compress(data, method))
+            written = True
+        sizes[method] = compressed_path.stat().st_size
+    return path.name, written, len(data), sizes
+
+
+def prune(artifacts_dir, keep):
+    """マニフェストから参照されないファイル（古いハッシュのファイルと圧縮ファイル）を削除
+
+    Args:
+        artifacts_dir: 発行先の artifacts ディレクトリ
+        keep: 残すファイルのパス（圧縮ファイルは元のファイルに合わせて残す）
+
+    Returns:
+        削除したファイル数
+    """
+    keep = {Path(path) for path in keep}
+    removed = 0
+    for path in Path(artifacts_dir).rglob('*'):
+        if not path.is_file():
+            continue
+        original = path.with_suffix('') if path.suffix in COMPRESSIONS.values() else path
+        if original not in keep:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def save_manifest(path, symbols, methods):
+    """マニフェストを保存（書き込み中のマニフェストを読み込まないよう一時ファイルから置き換える）"""
+    manifest = {
+        'schema_version': MANIFEST_SCHEMA_VERSION,
+        'timestamp': pd.Timestamp.now().isoformat(),
+        'compression': list(methods),
+        'symbols': symbols,
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _write_atomic(path, json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8'))
+    return manifest
+
+
+def load_manifest(path):
+    """マニフェストを読み込み（存在しない・壊れている・バージョン不一致の場合None）"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get('schema_version') != MANIFEST_SCHEMA_VERSION:
+        return None
+    return manifest
+
+
+def publish(price_dir, indicator_dir, output_dir, symbols=None, compression=('gzip', 'br'), keep_stale=False):
+    """株価データ・指標データを発行してマニフェストを書き込む
+
+    Args:
+        price_dir: 株価データディレクトリ
+        indicator_dir: 指標データディレクトリ
+        output_dir: 出力先（manifest.json と artifacts/ を作成）
+        symbols: 対象の銘柄コード（Noneの場合は株価データのある全銘柄）
+        compression: 圧縮形式（'gzip' / 'br'）
+        keep_stale: マニフェストから参照されなくなったファイルを残すか
+
+    Returns:
+        (マニフェスト, 集計: written / reused / removed / bytes / 圧縮形式ごとのサイズ)
+    """
+    output_dir = Path(output_dir)
+    artifacts_dir = output_dir / ARTIFACTS_DIR
+    methods = available_compressions(compression)
+    stats = {'written': 0, 'reused': 0, 'removed': 0, 'bytes': 0, **{method: 0 for method in methods}}
+    entries, keep = {}, []
+    for symbol, files in collect_files(price_dir, indicator_dir, symbols).items():
+        entries[symbol] = {}
+        for kind, src in files.items():
+            subdir = 'price' if kind == 'price' else 'indicators'
+            with instrumentation.stage('publish.write'):
+                name, written, size, sizes = publish_file(src, artifacts_dir / subdir, methods)
+            relative = f"{ARTIFACTS_DIR}/{subdir}/{name}"
+            entries[symbol][kind] = relative
+            keep.append(output_dir / relative)
+            stats['written' if written else 'reused'] += 1
+            stats['bytes'] += size
+            for method, compressed in sizes.items():
+                stats[method] += compressed
+    manifest = save_manifest(output_dir / MANIFEST_NAME, entries, methods)
+    if not keep_stale:
+        stats['removed'] = prune(artifacts_dir, keep)
+    return manifest, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='静的配信用データの発行スクリプト（ハッシュ付きファイル名・事前圧縮）')
+    parser.add_argument('--symbols', type=str, default=None,
+                        help='対象の銘柄コード（カンマ区切り、省略時は株価データのある全銘柄）')
+    parser.add_argument('--price-dir', type=str, default='public/data/price',
+                        help='株価データディレクトリ（デフォルト: public/data/price）')
+    parser.add_argument('--indicator-dir', type=str, default='public/data/indicators',
+                        help='指標データディレクトリ（デフォルト: public/data/indicators）')
+    parser.add_argument('--output-dir', type=str, default='public/data',
+                        help='出力先（manifest.json と artifacts/、デフォルト: public/data）')
+    parser.add_argument('--compression', type=str, default='gzip,br',
+                        help='事前圧縮の形式（カンマ区切り、gzip / br、空文字で圧縮しない、デフォルト: gzip,br）')
+    parser.add_argument('--keep-stale', action='store_true',
+                        help='マニフェストから参照されなくなった古いファイルを削除しない')
+    parser.add_argument('--run-report', type=str, default='data/run_report.json',
+                        help='実行レポートの出力先（デフォルト: data/run_report.json）')
+    parser.add_argument('--profile', type=str, default=None,
+                        help='cProfile のプロファイルの出力先（.prof）')
+    args = parser.parse_args()
+    instrumentation.start_profiling(args.profile)
+
+    symbols = [s.strip() for s in args.symbols.split(',') if s.strip()] if args.symbols else None
+    compression = [c.strip() for c in args.compression.split(',') if c.strip()]
+
+    print("=" * 60)
+    print("静的配信用データ発行開始")
+    print(f"出力先: {args.output_dir}")
+    print("=" * 60)
+
+    try:
+        manifest, stats = publish(args.price_dir, args.indicator_dir, args.output_dir, symbols=symbols,
+                                  compression=compression, keep_stale=args.keep_stale)
+    except ValueError as e:
+        print(f"エラー: {e}")
+        sys.exit(1)
+
+    print(f"銘柄: {len(manifest['symbols'])} 件")
+    print(f"ファイル: {stats['written']} 件出力 / {stats['reused']} 件変更なし / {stats['removed']} 件削除")
+    for method in manifest['compression']:
+        ratio = stats[method] / stats['bytes'] if stats['bytes'] else 0
+        print(f"  {method}: {stats['bytes']:,} → {stats[method]:,} バイト（{ratio:.0%}）")
+    instrumentation.write_run_report(args.run_report, 'publish_artifacts', symbols=len(manifest['symbols']),
+                                     written=stats['written'], reused=stats['reused'], removed=stats['removed'])
+    if not manifest['symbols']:
+        print("警告: 発行する株価データがありません")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
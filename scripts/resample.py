@@ -0,0 +1,124 @@
+"""
+複数解像度の出力（長期間のチャート表示用）
+日足の株価から週足・月足を集計し、長期間の表示期間ごとに点数を抑えた間引き系列を選ぶ
+
+- 週足・月足: 期間内の始値（最初）・高値（最大）・安値（最小）・終値（最後）・出来高（合計）、
+  日付は期間内の最終取引日
+- 間引き系列: 表示期間（最終日からさかのぼって3年 / 5年）の日足から、LTTB
+  （Largest-Triangle-Three-Buckets）で終値の形状を保つ日を選ぶ（指標値は選んだ日の日足の値）
+"""
+
+import numpy as np
+import pandas as pd
+
+# 集計単位 → pandas の期間（週足は金曜日で区切る）
+RESAMPLE_PERIODS = {'weekly': 'W-FRI', 'monthly': 'M'}
+
+# 間引き系列の表示期間 → 年数（フロントエンドの期間フィルタ 3Y / 5Y に対応）
+DOWNSAMPLE_YEARS = {'3y': 3, '5y': 5}
+
+# 間引き系列の最大点数（1年分の日足と同程度にし、長期間の表示でも描画する点数を抑える）
+DEFAULT_POINTS = 250
+
+
+def resample_ohlcv(df, period):
+    """日足を週足・月足などに集計
+
+    Args:
+        df: 日付昇順の株価DataFrame（date, open, high, low, close, volume カラム）
+        period: pandas の期間（例: 'W-FRI', 'M'）
+
+    Returns:
+        date（期間内の最終取引日）, open, high, low, close, volume のDataFrame
+    """
+    grouped = df.groupby(df['date'].dt.to_period(period).to_numpy(), sort=True)
+    resampled = grouped.agg(date=('date', 'last'), open=('open', 'first'), high=('high', 'max'),
+                            low=('low', 'min'), close=('close', 'last'), volume=('volume', 'sum'))
+    return resampled.reset_index(drop=True)
+
+
+def merge_resampled(bars, chunk, period):
+    """集計済みの足に続きの日足（チャンク処理時、bars より後の日付）を加える
+
+    始値（最初）・高値（最大）・安値（最小）・終値（最後）・出来高（合計）はいずれも集計済みの足から
+    再集計できるため、チャンクの境界をまたぐ期間も全期間を一括で集計した場合と同じ足になる
+
+    Args:
+        bars: 集計済みの足（resample_ohlcv / merge_resampled の戻り値、Noneの場合は最初のチャンク）
+        chunk: 続きの日足（日付昇順）
+        period: pandas の期間
+
+    Returns:
+        集計後の足
+    """
+    resampled = resample_ohlcv(chunk, period)
+    if bars is None or bars.empty:
+        return resampled
+    return resample_ohlcv(pd.concat([bars, resampled], ignore_index=True), period)
+
+
+def lttb_indices(x, y, n_out):
+    """LTTB（Largest-Triangle-Three-Buckets）で残す点の位置を選ぶ
+
+    先頭・末尾の点は必ず残し、間の点を n_out - 2 個のバケットに分けて、前に選んだ点と次のバケットの
+    平均点とで作る三角形の面積が最大になる点を各バケットから1つずつ選ぶ
+
+    Args:
+        x: x座標（昇順）
+        y: y座標
+        n_out: 残す点数（3以上、元の点数以上の場合は全点）
+
+    Returns:
+        残す点の位置（昇順）
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        raise ValueError(f"LTTBの点数は3以上: {n_out}")
+
+    # バケット i は bounds[i] ～ bounds[i + 1]（先頭・末尾の点を除く）
+    bounds = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(np.int64) + 1
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = bounds[i], bounds[i + 1]
+        next_start, next_end = (bounds[i + 1], bounds[i + 2]) if i + 2 < len(bounds) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def trailing_window(df, years):
+    """最終日から years 年分の行
+
+    Args:
+        df: 日付昇順のDataFrame（date カラム）
+        years: 期間（年）
+    """
+    if df.empty:
+        return df
+    return df[df['date'] >= df['date'].iloc[-1] - pd.DateOffset(years=years)]
+
+
+def downsample(df, years, points=DEFAULT_POINTS):
+    """最終日から years 年分の日足を、終値の形状を保って points 点以内に間引く
+
+    Args:
+        df: 日付昇順のDataFrame（date, close カラム）
+        years: 表示期間（年）
+        points: 最大点数
+
+    Returns:
+        選んだ日の行（元のカラムのまま、日付昇順）
+    """
+    window = trailing_window(df, years)
+    window = window[window['close'].notna()]
+    dates = window['date'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    return window.iloc[lttb_indices(dates, window['close'].to_numpy(dtype=float), points)].reset_index(drop=True)
@@ -0,0 +1,171 @@
+"""
+銘柄スクリーニング
+build_indicators.py / pipeline.py が出力する最新スナップショット表（指標ディレクトリの _snapshot）を
+1回だけ読み込み、全銘柄に対するフィルタ式をベクトル化して評価する（銘柄ごとのファイルは読み込まない）
+
+フィルタ式は pandas の式（DataFrame.eval）で、各銘柄の最新行のカラム（close, volume, rsi, macd など）と、
+k 行前の値（prev_rsi は1行前、prev2_rsi は2行前）を使用できる
+
+    py scripts/screen.py --filter "rsi < 30"
+    py scripts/screen.py --preset macd_cross_up --preset rsi_oversold --any
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from build_indicators import SNAPSHOT_NAME, SNAPSHOT_ROWS
+from storage import FORMATS, get_storage
+
+# 名前で指定できるフィルタ式
+PRESETS = {
+    'rsi_oversold': 'rsi < 30',
+    'rsi_overbought': 'rsi > 70',
+    'macd_cross_up': 'macd > macd_signal and prev_macd <= prev_macd_signal',
+    'macd_cross_down': 'macd < macd_signal and prev_macd >= prev_macd_signal',
+    'golden_cross': 'sma_5 > sma_25 and prev_sma_5 <= prev_sma_25',
+    'dead_cross': 'sma_5 < sma_25 and prev_sma_5 >= prev_sma_25',
+    'bb_breakout_up': 'close > bb_upper',
+    'bb_breakout_down': 'close < bb_lower',
+}
+
+
+def lag_prefix(lag):
+    """k 行前の値のカラム名の接頭辞（1: 'prev_'、2以上: 'prev2_' など）"""
+    return 'prev_' if lag == 1 else f'prev{lag}_'
+
+
+def load_snapshot(indicator_dir, fmt='csv'):
+    """最新スナップショット表を読み込み（ない場合は FileNotFoundError）"""
+    store = get_storage(fmt, indicator_dir)
+    if not store.exists(SNAPSHOT_NAME):
+        raise FileNotFoundError(f"{store.path(SNAPSHOT_NAME)} がありません（build_indicators.py を実行してください）")
+    return store.read(SNAPSHOT_NAME)
+
+
+def latest_frame(snapshot, lags=SNAPSHOT_ROWS - 1):
+    """銘柄ごとに最新行と k 行前（k = 1..lags）の値を横に並べた表
+
+    Args:
+        snapshot: 最新スナップショット表（symbol, date と値のカラム）
+        lags: 横に並べる過去の行数
+
+    Returns:
+        銘柄コードをインデックスとし、最新行のカラムと prev_* / prev2_* ... のカラムを持つDataFrame
+    """
+    snapshot = snapshot.sort_values(['symbol', 'date'], kind='stable')
+    position = snapshot.groupby('symbol', sort=False).cumcount(ascending=False).to_numpy()
+    value_columns = [col for col in snapshot.columns if col != 'symbol']
+    frame = snapshot[position == 0].set_index('symbol')
+    for lag in range(1, lags + 1):
+        previous = snapshot[position == lag].set_index('symbol')[value_columns]
+        frame = frame.join(previous.add_prefix(lag_prefix(lag)))
+    return frame
+
+
+def referenced_columns(expressions, columns):
+    """フィルタ式が参照するカラム（表示用、表のカラム順）"""
+    names = {name for expression in expressions for name in re.findall(r'[A-Za-z_]\w*', expression)}
+    return [col for col in columns if col in names]
+
+
+def screen(frame, expressions, match_any=False):
+    """フィルタ式に一致する銘柄を抽出
+
+    Args:
+        frame: latest_frame の戻り値
+        expressions: フィルタ式のリスト
+        match_any: Trueの場合はいずれかの式、Falseの場合はすべての式に一致する銘柄
+
+    Returns:
+        一致した銘柄の行
+    """
+    if not expressions:
+        return frame
+    masks = []
+    for expression in expressions:
+        try:
+            mask = frame.eval(expression)
+        except Exception as e:
+            raise ValueError(f"フィルタ式を評価できません: {expression}（{e}）") from e
+        if not pd.api.types.is_bool_dtype(mask):
+            raise ValueError(f"フィルタ式が真偽値ではありません: {expression}")
+        masks.append(mask)
+    combined = pd.concat(masks, axis=1)
+    matched = combined.any(axis=1) if match_any else combined.all(axis=1)
+    return frame[matched.to_numpy()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='銘柄スクリーニング（最新スナップショット表に対するフィルタ）')
+    parser.add_argument('--indicator-dir', type=str, default='data/indicators',
+                        help='指標ディレクトリ（_snapshot の場所、デフォルト: data/indicators）')
+    parser.add_argument('--format', type=str, choices=FORMATS, default='csv',
+                        help='最新スナップショット表の保存形式（デフォルト: csv）')
+    parser.add_argument('--filter', type=str, action='append', default=[],
+                        help='フィルタ式（例: "rsi < 30"、"macd > macd_signal and prev_macd <= prev_macd_signal"、複数指定可）')
+    parser.add_argument('--preset', type=str, action='append', default=[], choices=sorted(PRESETS),
+                        help='名前で指定するフィルタ式（複数指定可）')
+    parser.add_argument('--any', action='store_true',
+                        help='いずれかのフィルタに一致する銘柄を抽出（デフォルト: すべてに一致）')
+    parser.add_argument('--date', type=str, default=None,
+                        help='最新行がこの日付の銘柄のみ対象（latest: 表の最新日、デフォルト: 全銘柄）')
+    parser.add_argument('--columns', type=str, default=None,
+                        help='表示するカラム（カンマ区切り、デフォルト: date, close とフィルタ式が参照するカラム）')
+    parser.add_argument('--sort', type=str, default=None,
+                        help='並べ替えるカラム（先頭に "-" で降順、例: -volume）')
+    parser.add_argument('--limit', type=int, default=None,
+                        help='表示する最大銘柄数')
+    parser.add_argument('--output', type=str, default=None,
+                        help='結果の出力先（.csv / .json）')
+    args = parser.parse_args()
+
+    expressions = [PRESETS[name] for name in args.preset] + args.filter
+    try:
+        started = time.perf_counter()
+        frame = latest_frame(load_snapshot(args.indicator_dir, args.format))
+        if args.date:
+            date = frame['date'].max() if args.date == 'latest' else pd.Timestamp(args.date)
+            frame = frame[frame['date'] == date]
+        matched = screen(frame, expressions, match_any=args.any)
+        elapsed = time.perf_counter() - started
+    except (OSError, ValueError) as e:
+        print(f"エラー: {e}")
+        sys.exit(1)
+
+    if args.columns:
+        columns = [col.strip() for col in args.columns.split(',') if col.strip()]
+    else:
+        columns = list(dict.fromkeys(['date', 'close'] + referenced_columns(expressions, frame.columns)))
+    unknown = [col for col in columns + ([args.sort.lstrip('-')] if args.sort else []) if col not in frame.columns]
+    if unknown:
+        print(f"エラー: カラムが存在しません: {unknown}")
+        sys.exit(1)
+    if args.sort:
+        matched = matched.sort_values(args.sort.lstrip('-'), ascending=not args.sort.startswith('-'))
+    if args.limit is not None:
+        matched = matched.head(args.limit)
+    result = matched[columns].assign(date=matched['date'].dt.strftime('%Y-%m-%d')) if 'date' in columns \
+        else matched[columns]
+
+    print(f"フィルタ: {' / '.join(expressions) if expressions else '（なし）'}{'（いずれか）' if args.any else ''}")
+    print(f"一致: {len(matched)} / {len(frame)} 銘柄（{elapsed * 1000:.1f}ms）")
+    if not result.empty:
+        print(result.to_string())
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        if output_path.suffix == '.json':
+            result.reset_index().to_json(output_path, orient='records', force_ascii=False, indent=2)
+        else:
+            result.to_csv(output_path)
+        print(f"📄 出力: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,541 @@
+"""
+データ保存層
+株価データ・テクニカル指標データを CSV / Parquet / NumPy(npz) 形式で読み書きする
+
+CSVはWebフロントエンド向けの公開形式、Parquet/npzはPythonパイプライン内部向けの
+型付きバイナリ形式。いずれの形式でも read() は日付カラムを datetime64 で返す。
+"""
+
+import io
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FORMATS = ('csv', 'parquet', 'npy')
+
+# 株価データの価格カラム（read_price_frame で型を指定する）
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close')
+
+# read_price_frame の銘柄コードカラムの扱い
+SYMBOL_MODES = ('category', 'drop', 'object')
+
+
+def _date_column(columns):
+    """日付カラム名（'Date' または 'date'）を返す"""
+    for col in columns:
+        if str(col).lower() == 'date':
+            return col
+    return None
+
+
+def _to_datetime(df):
+    """日付カラムを datetime64 に変換したDataFrameを返す"""
+    date_col = _date_column(df.columns)
+    if date_col is not None and not pd.api.types.is_datetime64_any_dtype(df[date_col]):
+        df[date_col] = pd.to_datetime(df[date_col], format='ISO8601')
+    return df
+
+
+def _select_columns(available, columns):
+    """読み込むカラム（保存順）
+
+    Args:
+        available: 保存されているカラム
+        columns: 読み込むカラムのリスト、またはカラム名を受け取って真偽値を返す関数（Noneの場合は全カラム）
+    """
+    available = [str(col) for col in available]
+    if columns is None:
+        return available
+    if callable(columns):
+        return [col for col in available if columns(col)]
+    missing = [col for col in columns if col not in available]
+    if missing:
+        raise ValueError(f"カラムが存在しません: {missing}")
+    return [col for col in available if col in set(columns)]
+
+
+def _astype(df, dtype):
+    """dtype（カラム名 → 型）のうち存在するカラムのみ型を変換"""
+    if not dtype:
+        return df
+    return df.astype({col: value for col, value in dtype.items() if col in df.columns})
+
+
+def _date_str(value) -> str:
+    """日付値を YYYY-MM-DD 形式の文字列に変換"""
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+def _atomic_replace(output_path: Path, write_fn) -> None:
+    """一時ファイルに書き出してからリネームし、ファイルを原子的に置き換える"""
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=output_path.parent, prefix=f".{output_path.name}.", suffix='.tmp')
+    os.close(fd)
+    try:
+        write_fn(tmp_path)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_csv_header(csv_path: Path) -> list:
+    """
+    CSVファイルのヘッダー行（カラム名リスト）を取得
+
+    Args:
+        csv_path: CSVファイルのパス
+
+    Returns:
+        カラム名のリスト
+    """
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip() and not line.startswith('#'):
+                return [col.strip() for col in line.strip().split(',')]
+    return []
+
+
+def get_last_stored_date(csv_path: Path, block_size: int = 4096):
+    """
+    CSVファイルの最終行から最新保存日を取得
+    ファイルは日付昇順で保存されている前提で、末尾ブロックのみ読み込む
+
+    Args:
+        csv_path: CSVファイルのパス
+        block_size: 末尾から読み込むバイト数の単位
+
+    Returns:
+        最新保存日（YYYY-MM-DD形式の文字列）、データがない場合None
+    """
+    if not csv_path.exists():
+        return None
+
+    try:
+        with open(csv_path, 'rb') as f:
+            f.seek(0, 2)
+            offset = f.tell()
+            tail = b''
+            # 完全な最終行が得られるまで末尾からブロック単位で読み込む
+            while offset > 0 and tail.rstrip().count(b'\n') < 1:
+                step = min(block_size, offset)
+                offset -= step
+                f.seek(offset)
+                tail = f.read(step) + tail
+        lines = [line for line in tail.decode('utf-8', errors='ignore').splitlines() if line.strip()]
+        if not lines or lines[-1].startswith('#'):
+            return None
+        last_field = lines[-1].split(',')[0].strip()
+        if last_field.lower() == 'date':
+            return None
+        return _date_str(last_field)
+    except (ValueError, OSError) as e:
+        print(f"[WARNING] 既存ファイル読み込みエラー: {str(e)}")
+        return None
+
+
+def read_stored_rows_since(csv_path: Path, since_date, block_size: int = 65536, columns=None, dtype=None):
+    """
+    CSVファイルから指定日以降の行のみを末尾側から読み込む
+    ファイルは日付昇順で保存されている前提
+
+    Args:
+        csv_path: CSVファイルのパス
+        since_date: 読み込み開始日
+        block_size: 末尾から読み込むバイト数の単位
+        columns: 読み込むカラム（リストまたは関数、Noneの場合は全カラム）
+        dtype: カラム名 → 型（存在しないカラムは無視）
+
+    Returns:
+        since_date以降の保存済み行のDataFrame（日付は datetime64）
+    """
+    since_date = _date_str(since_date)
+    header = read_csv_header(csv_path)
+    with open(csv_path, 'rb') as f:
+        f.seek(0, 2)
+        offset = f.tell()
+        tail = b''
+        # 先頭の完全な行が since_date より前になるまでさかのぼる
+        while offset > 0:
+            step = min(block_size, offset)
+            offset -= step
+            f.seek(offset)
+            tail = f.read(step) + tail
+            lines = tail.split(b'\n')
+            complete = lines[1:] if offset > 0 else lines
+            first = next((l for l in complete if l.strip() and not l.startswith(b'#')), None)
+            if first is not None and first.split(b',')[0].decode('utf-8') < since_date:
+                break
+    lines = tail.split(b'\n')
+    if offset > 0:
+        lines = lines[1:]
+    body = [l.decode('utf-8').rstrip('\r') for l in lines
+            if l.strip() and not l.startswith(b'#') and l.split(b',')[0].decode('utf-8') >= since_date
+            and not l.lower().startswith(b'date,')]
+    if not body:
+        return _to_datetime(_astype(pd.DataFrame(columns=_select_columns(header, columns)), dtype))
+    return _to_datetime(pd.read_csv(io.StringIO('\n'.join(body)), names=header, usecols=columns, dtype=dtype))
+
+
+def write_csv_atomic(df, output_path: Path, schema_version: str = '1.0', columns=None) -> None:
+    """
+    DataFrameを一時ファイルに書き出してからリネームし、CSVを原子的に置き換える
+
+    Args:
+        df: 保存するDataFrame
+        output_path: 出力CSVパス
+        schema_version: ヘッダーコメントに記録するスキーマバージョン
+        columns: 出力するカラム（Noneの場合は全カラム、部分DataFrameのコピーを作らずに出力）
+    """
+    def write(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(f'# schema_version: {schema_version}\n')
+            df.to_csv(f, index=False, columns=columns, lineterminator='\n', date_format='%Y-%m-%d')
+
+    _atomic_replace(output_path, write)
+
+
+def append_csv_rows(df, output_path: Path, columns=None) -> None:
+    """
+    既存CSVの末尾に行を追記（書き込み失敗時は元のサイズに切り詰めて復元）
+
+    Args:
+        df: 追記する行
+        output_path: 追記先CSVパス
+        columns: 出力するカラム（既存ヘッダーと同じ順序、Noneの場合はdfのカラム順）
+    """
+    text = df.to_csv(index=False, header=False, columns=columns, lineterminator='\n', date_format='%Y-%m-%d')
+    with open(output_path, 'r+b') as f:
+        f.seek(0, 2)
+        original_size = f.tell()
+        if original_size > 0:
+            f.seek(original_size - 1)
+            if f.read(1) != b'\n':
+                text = '\n' + text
+        try:
+            f.write(text.encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.truncate(original_size)
+            raise
+
+
+class CsvStorage:
+    """CSV形式のデータストア（先頭行に # schema_version コメントを持つ）
+
+    Args:
+        directory: 保存先ディレクトリ
+    """
+
+    format = 'csv'
+    suffix = '.csv'
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def path(self, name: str) -> Path:
+        """データ名（例: '9501.T', '9501.T_sma'）に対応するファイルパス"""
+        return self.directory / f"{name}{self.suffix}"
+
+    def exists(self, name: str) -> bool:
+        return self.path(name).exists()
+
+    def names(self) -> list:
+        """保存済みのデータ名（拡張子を除いたファイル名、書き込み途中の一時ファイルは除く）の一覧"""
+        if not self.directory.is_dir():
+            return []
+        return sorted(p.name[:-len(self.suffix)] for p in self.directory.glob(f"*{self.suffix}")
+                      if not p.name.startswith('.'))
+
+    def read(self, name: str, columns=None, dtype=None):
+        """データを読み込み（日付カラムは datetime64）
+
+        Args:
+            name: データ名
+            columns: 読み込むカラム（リストまたはカラム名を受け取る関数、Noneの場合は全カラム）
+            dtype: カラム名 → 型（存在しないカラムは無視）
+        """
+        return _to_datetime(pd.read_csv(self.path(name), comment='#', usecols=columns, dtype=dtype))
+
+    def write(self, name: str, df, schema_version: str = '1.0', columns=None) -> None:
+        """データを書き込み（columns指定時はそのカラムのみ出力）"""
+        write_csv_atomic(df, self.path(name), schema_version=schema_version, columns=columns)
+
+    def columns(self, name: str) -> list:
+        return read_csv_header(self.path(name))
+
+    def last_date(self, name: str):
+        """最新保存日（YYYY-MM-DD）、データがない場合None"""
+        return get_last_stored_date(self.path(name))
+
+    def read_since(self, name: str, since_date, columns=None, dtype=None):
+        """since_date以降の保存済み行（columns / dtype は read と同じ）"""
+        return read_stored_rows_since(self.path(name), since_date, columns=columns, dtype=dtype)
+
+    def append(self, name: str, df, schema_version: str = '1.0') -> None:
+        """保存済みデータの末尾に行を追記（dfは既存データのカラムをすべて含むこと）"""
+        append_csv_rows(df, self.path(name), columns=self.columns(name))
+
+    def read_chunks(self, name: str, chunk_rows: int, columns=None, dtype=None):
+        """データを chunk_rows 行ずつ読み込むイテレータ（インデックスはファイル内の行番号、columns / dtype は read と同じ）"""
+        with pd.read_csv(self.path(name), comment='#', usecols=columns, dtype=dtype, chunksize=chunk_rows) as reader:
+            for chunk in reader:
+                yield _to_datetime(chunk)
+
+    def write_chunks(self, name: str, chunks, schema_version: str = '1.0') -> None:
+        """チャンクのイテレータを順に書き込み（全体をメモリに保持せず、完了後に原子的に置き換える）"""
+        def write(tmp_path):
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(f'# schema_version: {schema_version}\n')
+                header = True
+                for chunk in chunks:
+                    chunk.to_csv(f, index=False, header=header, lineterminator='\n', date_format='%Y-%m-%d')
+                    header = False
+
+        _atomic_replace(self.path(name), write)
+
+
+class _BinaryStorage(CsvStorage):
+    """バイナリ形式ストアの共通処理（追記・部分読み込みは全体読み込みで代替）"""
+
+    def columns(self, name: str) -> list:
+        return list(self.read(name).columns)
+
+    def last_date(self, name: str):
+        if not self.exists(name):
+            return None
+        dates = self._read_dates(name)
+        return _date_str(dates.max()) if len(dates) else None
+
+    def read_since(self, name: str, since_date, columns=None, dtype=None):
+        df = self.read(name, columns=columns, dtype=dtype)
+        date_col = _date_column(df.columns)
+        return df[df[date_col] >= pd.Timestamp(since_date)].reset_index(drop=True)
+
+    def append(self, name: str, df, schema_version: str = '1.0') -> None:
+        existing = self.read(name)
+        combined = pd.concat([existing, _to_datetime(df.copy())[existing.columns]], ignore_index=True)
+        self.write(name, combined, schema_version=schema_version)
+
+    def read_chunks(self, name: str, chunk_rows: int, columns=None, dtype=None):
+        # 形式ごとの部分読み込みがない場合は全体を読み込んで分割する
+        df = self.read(name, columns=columns, dtype=dtype)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+
+    def write_chunks(self, name: str, chunks, schema_version: str = '1.0') -> None:
+        self.write(name, pd.concat(list(chunks), ignore_index=True), schema_version=schema_version)
+
+    def _read_dates(self, name: str):
+        df = self.read(name)
+        return df[_date_column(df.columns)]
+
+
+class ParquetStorage(_BinaryStorage):
+    """Parquet形式のデータストア（pyarrowが必要）"""
+
+    format = 'parquet'
+    suffix = '.parquet'
+
+    def __init__(self, directory):
+        super().__init__(directory)
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("parquet形式には pyarrow が必要です（実行: pip install pyarrow）")
+
+    def read(self, name: str, columns=None, dtype=None):
+        import pyarrow.parquet as pq
+
+        if columns is not None:
+            columns = _select_columns(pq.read_schema(self.path(name)).names, columns)
+        return _to_datetime(_astype(pd.read_parquet(self.path(name), columns=columns), dtype))
+
+    def write(self, name: str, df, schema_version: str = '1.0', columns=None) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        df = df[columns] if columns is not None else df.copy()
+        table = pa.Table.from_pandas(_to_datetime(df), preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[b'schema_version'] = schema_version.encode('utf-8')
+        table = table.replace_schema_metadata(metadata)
+        _atomic_replace(self.path(name), lambda tmp_path: pq.write_table(table, tmp_path))
+
+    def read_chunks(self, name: str, chunk_rows: int, columns=None, dtype=None):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(self.path(name))
+        if columns is not None:
+            columns = _select_columns(parquet_file.schema_arrow.names, columns)
+        start = 0
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+            chunk = batch.to_pandas()
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            yield _to_datetime(_astype(chunk, dtype))
+
+    def _read_dates(self, name: str):
+        import pyarrow.parquet as pq
+
+        date_col = _date_column(pq.read_schema(self.path(name)).names)
+        return pd.read_parquet(self.path(name), columns=[date_col])[date_col]
+
+
+class NpyStorage(_BinaryStorage):
+    """NumPy形式のデータストア（カラムごとの配列を非圧縮 .npz にまとめて保存）"""
+
+    format = 'npy'
+    suffix = '.npz'
+
+    def read(self, name: str, columns=None, dtype=None):
+        # npz はカラムごとに個別の配列のため、読み込まないカラムは展開しない
+        with np.load(self.path(name)) as data:
+            columns = _select_columns(data['__columns__'], columns)
+            return _astype(pd.DataFrame({col: data[col] for col in columns}), dtype)
+
+    def write(self, name: str, df, schema_version: str = '1.0', columns=None) -> None:
+        df = _to_datetime(df[columns] if columns is not None else df.copy())
+        arrays = {}
+        for col in df.columns:
+            values = df[col].to_numpy()
+            if values.dtype == object:
+                values = values.astype(str)
+            arrays[col] = values
+        arrays['__columns__'] = np.array(list(df.columns), dtype=str)
+        arrays['__schema_version__'] = np.array(schema_version)
+
+        def write(tmp_path):
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **arrays)
+
+        _atomic_replace(self.path(name), write)
+
+    def _read_dates(self, name: str):
+        with np.load(self.path(name)) as data:
+            date_col = _date_column(str(col) for col in data['__columns__'])
+            return pd.Series(data[date_col])
+
+
+_STORAGES = {
+    'csv': CsvStorage,
+    'parquet': ParquetStorage,
+    'npy': NpyStorage,
+}
+
+
+def get_storage(fmt: str, directory):
+    """
+    保存形式に対応するデータストアを生成
+
+    Args:
+        fmt: 'csv', 'parquet', 'npy' のいずれか
+        directory: 保存先ディレクトリ
+
+    Returns:
+        データストア
+    """
+    if fmt not in _STORAGES:
+        raise ValueError(f"未対応の保存形式: {fmt}（{', '.join(FORMATS)} のいずれか）")
+    return _STORAGES[fmt](directory)
+
+
+def storage_for_path(file_path):
+    """
+    拡張子から保存形式を判定し、ファイルのデータストアとデータ名を返す
+
+    Args:
+        file_path: データファイルのパス（.csv / .parquet / .npz）
+
+    Returns:
+        (データストア, データ名)
+    """
+    file_path = Path(file_path)
+    for storage_cls in _STORAGES.values():
+        if file_path.suffix == storage_cls.suffix:
+            return storage_cls(file_path.parent), file_path.name[:-len(storage_cls.suffix)]
+    raise ValueError(f"未対応のファイル形式: {file_path}")
+
+
+def read_frame(file_path):
+    """
+    拡張子から保存形式を判定してデータを読み込む
+
+    Args:
+        file_path: データファイルのパス（.csv / .parquet / .npz）
+
+    Returns:
+        日付カラムを datetime64 に変換したDataFrame
+    """
+    store, name = storage_for_path(file_path)
+    return store.read(name)
+
+
+def _price_read_options(columns, price_dtype, symbol):
+    """株価データの読み込むカラム（関数）と型（read_price_frame / iter_price_frames 共通）"""
+    if symbol not in SYMBOL_MODES:
+        raise ValueError(f"未対応の銘柄コードカラムの扱い: {symbol}（{', '.join(SYMBOL_MODES)} のいずれか）")
+    wanted = None if columns is None else {str(col).lower() for col in columns} | {'date'}
+
+    def usecols(col):
+        key = col.lower()
+        return not (key == 'symbol' and symbol == 'drop') and (wanted is None or key in wanted)
+
+    dtype = {case(col): price_dtype or 'float64' for col in PRICE_COLUMNS for case in (str, str.lower)}
+    if symbol == 'category':
+        dtype['symbol'] = 'category'
+    return usecols, dtype
+
+
+def read_price_frame(store, name, since=None, columns=None, price_dtype=None, symbol='category',
+                     date_index=False):
+    """
+    株価データを型を指定して読み込む（株価データの共通ローダー）
+
+    日付は読み込み時に1回だけ datetime64 に変換し、価格は price_dtype（'float32' でメモリ半減）、
+    全行で同じ値の銘柄コードカラムはカテゴリ型（文字列を1つだけ保持）にするか読み込まない
+
+    Args:
+        store: 株価データストア
+        name: データ名（銘柄コード）
+        since: 指定時はこの日付以降の行のみ読み込み
+        columns: 読み込むカラム（大文字小文字は区別しない、日付カラムは常に読み込む、Noneの場合は全カラム）
+        price_dtype: 価格カラム（Open, High, Low, Close）の型（Noneの場合は float64）
+        symbol: 銘柄コードカラムの扱い（'category': カテゴリ型、'drop': 読み込まない、'object': 文字列）
+        date_index: Trueの場合は日付カラムをインデックスにする
+
+    Returns:
+        株価DataFrame
+    """
+    usecols, dtype = _price_read_options(columns, price_dtype, symbol)
+    if since is None:
+        df = store.read(name, columns=usecols, dtype=dtype)
+    else:
+        df = store.read_since(name, since, columns=usecols, dtype=dtype)
+    if date_index:
+        df = df.set_index(_date_column(df.columns))
+    return df
+
+
+def iter_price_frames(store, name, chunk_rows, columns=None, price_dtype=None, symbol='category'):
+    """
+    株価データを chunk_rows 行ずつ読み込むイテレータ（read_price_frame のチャンク版）
+
+    CSV / Parquet は chunk_rows 行分のみメモリに保持する（npz は全体を読み込んで分割）
+
+    Args:
+        store: 株価データストア
+        name: データ名（銘柄コード）
+        chunk_rows: 1チャンクの行数
+        columns / price_dtype / symbol: read_price_frame と同じ
+
+    Yields:
+        株価DataFrame（インデックスはファイル内の行番号）
+    """
+    usecols, dtype = _price_read_options(columns, price_dtype, symbol)
+    yield from store.read_chunks(name, chunk_rows, columns=usecols, dtype=dtype)
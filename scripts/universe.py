@@ -0,0 +1,125 @@
+"""
+銘柄ユニバース
+対象銘柄の一覧（universe.csv）を読み込み、取得・指標計算・検証の3スクリプトで共有する
+
+ユニバースファイルは symbol,name,stooq_symbol のCSV。stooq_symbol を省略した銘柄は
+取引所サフィックスの対応表（STOOQ_SUFFIXES、例: 9501.T → 9501.JP）でStooqの銘柄コードに変換する
+"""
+
+import csv
+import fnmatch
+import functools
+import hashlib
+from pathlib import Path
+
+DEFAULT_UNIVERSE = Path(__file__).resolve().parent / 'universe.csv'
+
+# 取引所サフィックス → Stooqのサフィックス
+STOOQ_SUFFIXES = {
+    '.T': '.JP',
+}
+
+# --symbols で指定するユニバース全銘柄のキーワード
+UNIVERSE_KEYWORD = 'universe'
+
+
+def stooq_symbol(symbol: str) -> str:
+    """銘柄コードを取引所サフィックスの対応表でStooqの銘柄コードに変換（例: 9501.T → 9501.JP）"""
+    for suffix, stooq_suffix in STOOQ_SUFFIXES.items():
+        if symbol.endswith(suffix):
+            return symbol[:-len(suffix)] + stooq_suffix
+    return symbol
+
+
+class Universe:
+    """銘柄ユニバース（ファイル内の順序を保った銘柄リストと、所属判定用の集合）
+
+    Attributes:
+        symbols: 銘柄コードのタプル（ファイル内の順序）
+        index: 銘柄コードの集合
+        names: 銘柄コード → 銘柄名
+        stooq: 銘柄コード → Stooqの銘柄コード
+    """
+
+    def __init__(self, rows):
+        """
+        Args:
+            rows: (銘柄コード, 銘柄名, Stooqの銘柄コードまたは空文字) のリスト
+        """
+        self.symbols = tuple(dict.fromkeys(symbol for symbol, _, _ in rows))
+        self.index = frozenset(self.symbols)
+        self.names = {symbol: name for symbol, name, _ in rows}
+        self.stooq = {symbol: code or stooq_symbol(symbol) for symbol, _, code in rows}
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+    def __iter__(self):
+        return iter(self.symbols)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def stooq_symbol(self, symbol: str) -> str:
+        """Stooqの銘柄コード（ユニバース外の銘柄はサフィックスの対応表で変換）"""
+        return self.stooq.get(symbol) or stooq_symbol(symbol)
+
+    def digest(self) -> str:
+        """銘柄集合のハッシュ（検証キャッシュの無効化判定用）"""
+        return hashlib.sha256('\n'.join(sorted(self.index)).encode('utf-8')).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def load_universe(path=None) -> Universe:
+    """ユニバースファイルを読み込み（同じパスは1プロセスにつき1回だけ読み込む）
+
+    Args:
+        path: ユニバースファイルのパス（Noneの場合は scripts/universe.csv）
+
+    Returns:
+        Universe
+    """
+    with open(path or DEFAULT_UNIVERSE, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(line for line in f if not line.startswith('#'))
+        if 'symbol' not in (reader.fieldnames or []):
+            raise ValueError(f"ユニバースファイルに symbol カラムがありません: {path or DEFAULT_UNIVERSE}")
+        rows = [
+            (row['symbol'].strip(), (row.get('name') or '').strip(), (row.get('stooq_symbol') or '').strip())
+            for row in reader if (row['symbol'] or '').strip()
+        ]
+    if not rows:
+        raise ValueError(f"ユニバースファイルに銘柄がありません: {path or DEFAULT_UNIVERSE}")
+    return Universe(rows)
+
+
+def resolve_symbols(spec, universe, store=None):
+    """--symbols の指定を銘柄コードのリストに展開
+
+    カンマ区切りの各要素は次のいずれか（重複は最初の出現のみ残す）
+    - 'universe': ユニバースの全銘柄
+    - ワイルドカード（* ? [ ] を含む、例: '95*.T', '*'）: store に保存済みのファイルのうち一致する銘柄
+    - それ以外: 銘柄コード
+
+    Args:
+        spec: --symbols の値（None・空文字の場合は 'universe'）
+        universe: Universe
+        store: ワイルドカードの展開対象のデータストア（株価データの保存先）
+
+    Returns:
+        銘柄コードのリスト
+    """
+    symbols = []
+    stored = None
+    for item in (spec or UNIVERSE_KEYWORD).split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if item == UNIVERSE_KEYWORD:
+            symbols.extend(universe.symbols)
+        elif any(ch in item for ch in '*?['):
+            if stored is None:
+                stored = store.names() if store is not None else []
+            symbols.extend(fnmatch.filter(stored, item))
+        else:
+            symbols.append(item)
+    return list(dict.fromkeys(symbols))
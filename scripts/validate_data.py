@@ -6,226 +6,783 @@
 import pandas as pd
 import numpy as np
 import argparse
+import functools
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import sys
 import json
 
-def validate_price_data(file_path):
-    """株価データ（CSV）を検証
+import instrumentation
+from build_indicators import load_indicator_state, state_path
+from changes import is_unchanged, load_manifest, manifest_path, outputs_up_to_date
+from indicator_registry import (DEFAULT_INDICATORS, IndicatorGraph, compute_indicator_columns, format_indicator_spec,
+                                parse_indicator_spec)
+from storage import FORMATS, get_storage, iter_price_frames, read_frame, read_price_frame, storage_for_path
+from universe import UNIVERSE_KEYWORD, load_universe, resolve_symbols
+
+# レポートに行番号・日付を載せる違反行の最大数（違反件数は全行を数える）
+MAX_REPORTED_ROWS = 10
+
+
+def evaluate_rules(df, rules):
+    """全ルールを1つの真偽値マスク行列（行 × ルール）で評価
+    
+    行ごとのPythonループは行わず、違反件数はマスクの列和、違反行は先頭 MAX_REPORTED_ROWS 行のみ取り出す
+    
+    Args:
+        df: 検証対象のDataFrame（インデックスはファイル内の行番号）
+        rules: (ルール名, メッセージ, 違反行マスクを返す関数, 詳細) のリスト
+               詳細は違反行に併記する (カラム名, 書式) または None
+    
+    Returns:
+        違反のあったルールごとの辞書（rule, message, count, rows, dates, values）のリスト
+    """
+    if not rules:
+        return []
+    mask = np.column_stack([np.asarray(check(df), dtype=bool) for _, _, check, _ in rules])
+    counts = mask.sum(axis=0)
+    
+    violations = []
+    for j in np.flatnonzero(counts):
+        name, message, _, detail = rules[j]
+        positions = np.flatnonzero(mask[:, j])[:MAX_REPORTED_ROWS]
+        dates = pd.to_datetime(df['date'].iloc[positions])
+        # 日中足（分足など）の場合は時刻も表示
+        date_format = '%Y-%m-%d' if (dates == dates.dt.normalize()).all() else '%Y-%m-%d %H:%M:%S'
+        violation = {
+            'rule': name,
+            'message': message,
+            'count': int(counts[j]),
+            'rows': df.index[positions].tolist(),
+            'dates': dates.dt.strftime(date_format).tolist(),
+        }
+        if detail is not None:
+            column, fmt = detail
+            violation['values'] = [fmt.format(value) for value in df[column].iloc[positions]]
+        violations.append(violation)
+    return violations
+
+
+def format_violation(violation):
+    """違反を1行のエラーメッセージに整形（例: 'high < open の行が存在します: 3行（2020-01-06, ...）'）"""
+    examples = violation['dates']
+    if 'values' in violation:
+        examples = [f"{date} {value}" for date, value in zip(examples, violation['values'])]
+    more = ' ほか' if violation['count'] > len(examples) else ''
+    return f"{violation['message']}: {violation['count']}行（{', '.join(examples)}{more}）"
+
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+PRICE_RULES = [
+    # 価格整合性（欠損値を含む行も違反）
+    ('high_lt_open', 'high < open の行が存在します', lambda df: ~(df['high'] >= df['open']), None),
+    ('high_lt_low', 'high < low の行が存在します', lambda df: ~(df['high'] >= df['low']), None),
+    ('high_lt_close', 'high < close の行が存在します', lambda df: ~(df['high'] >= df['close']), None),
+    ('low_gt_open', 'low > open の行が存在します', lambda df: ~(df['low'] <= df['open']), None),
+    ('low_gt_close', 'low > close の行が存在します', lambda df: ~(df['low'] <= df['close']), None),
+    # 非負制約
+    *[(f'negative_{col}', f'{col} に負の値が存在します', lambda df, col=col: df[col] < 0, None)
+      for col in PRICE_COLUMNS],
+    # 前日比制約（異常値検出）
+    ('pct_change', '異常な変動率（|前日比| > 50%）', lambda df: df['pct_change'].abs() > 0.5,
+     ('pct_change', '変動率={:+.1%}')),
+]
+
+# 銘柄コードの照合先のユニバースファイル（Noneの場合は scripts/universe.csv）
+_universe_path = None
+
+
+def use_universe(path):
+    """銘柄コードの照合に使うユニバースファイルを設定（プロセスプールのワーカーの初期化にも使用）"""
+    global _universe_path
+    _universe_path = path
+
+
+def active_universe():
+    """銘柄コードの照合に使うユニバース（プロセスごとに1回だけ読み込む）"""
+    return load_universe(_universe_path)
+
+
+def symbol_rule(symbol=None):
+    """銘柄コード確認ルール（symbolカラムがある場合のみ、ユニバースの銘柄集合と照合）
+
+    Args:
+        symbol: 検証対象の株価データの銘柄コード（ファイル名）。ワイルドカードで指定した保存済みの銘柄は
+                ユニバース外でも有効とするため、この銘柄コードの行は違反としない
+    """
+    return ('invalid_symbol', 'ユニバース外の銘柄コード',
+            lambda df: ~(df['symbol'].isin(active_universe().index) | (df['symbol'] == symbol)), ('symbol', '{}'))
+
+
+SYMBOL_RULE = symbol_rule()
+
+
+def check_price_frame(df, previous_close=None, symbol=None):
+    """株価DataFrameを検証
     
     検証項目:
     - 必須カラム存在確認
     - 価格整合性（high >= open, high >= low, high >= close, low <= open, low <= close）
     - 非負制約（すべての価格・出来高 >= 0）
     - 前日比制約（|変動率| <= 50%）
-    - 銘柄コード確認（9501.T または 9502.T）
+    - 銘柄コード確認（銘柄ユニバースに含まれること）
+    
+    Args:
+        df: 株価DataFrame
+        previous_close: チャンク処理時の前のチャンクの最終終値（先頭行の前日比に使用）
+        symbol: 株価データの銘柄コード（ファイル名、指定時はユニバース外でもこの銘柄コードを有効とする）
     
     Returns:
-        (is_valid, errors): 検証成功フラグとエラーリスト
+        (errors, violations): エラーメッセージのリストと違反ルールごとの辞書リスト
     """
-    errors = []
-    
-    try:
-        df = pd.read_csv(file_path, comment='#')
-    except Exception as e:
-        return False, [f"CSV読み込みエラー: {e}"]
-    
     # 必須カラム確認
-    required = ['date', 'open', 'high', 'low', 'close', 'volume']
+    required = ['date'] + PRICE_COLUMNS
     missing_cols = [col for col in required if col.lower() not in [c.lower() for c in df.columns]]
     if missing_cols:
-        errors.append(f"必須カラム不足: {missing_cols}")
-        return False, errors
+        return [f"必須カラム不足: {missing_cols}"], []
     
     # カラム名を小文字に統一
     df.columns = df.columns.str.lower()
     
-    # 価格整合性
-    if not (df['high'] >= df['open']).all():
-        errors.append("high < open の行が存在します")
-    if not (df['high'] >= df['low']).all():
-        errors.append("high < low の行が存在します")
-    if not (df['high'] >= df['close']).all():
-        errors.append("high < close の行が存在します")
-    if not (df['low'] <= df['open']).all():
-        errors.append("low > open の行が存在します")
-    if not (df['low'] <= df['close']).all():
-        errors.append("low > close の行が存在します")
+    # 前日比は日付順で計算（インデックスはファイル内の行番号のまま、欠損の終値は直前の終値で補完）
+    if not df['date'].is_monotonic_increasing:
+        df = df.sort_values('date', kind='stable')
+    # （pct_change の欠損補完の既定値は pandas 2.1 で非推奨のため、補完してから前日比を計算する）
+    if previous_close is None:
+        close = df['close'].astype(float).ffill()
+        df['pct_change'] = close / close.shift() - 1
+    else:
+        close = pd.concat([pd.Series([previous_close], dtype=float), df['close'].astype(float)], ignore_index=True)
+        close = close.ffill()
+        df['pct_change'] = (close / close.shift() - 1).iloc[1:].to_numpy()
     
-    # 非負制約
-    for col in ['open', 'high', 'low', 'close', 'volume']:
-        if (df[col] < 0).any():
-            errors.append(f"{col} に負の値が存在します")
+    rules = PRICE_RULES + ([symbol_rule(symbol)] if 'symbol' in df.columns else [])
+    violations = evaluate_rules(df, rules)
+    return [format_violation(v) for v in violations], violations
+
+
+def validate_price_data(file_path):
+    """株価データ（CSV / Parquet / npz）を検証（検証項目は check_price_frame を参照）
     
-    # 前日比制約（異常値検出）
-    df = df.sort_values('date').reset_index(drop=True)
-    df['pct_change'] = df['close'].pct_change()
+    Returns:
+        (is_valid, errors): 検証成功フラグとエラーリスト
+    """
+    result = validate_file(file_path, 'price')
+    return result['valid'], result['errors']
+
+
+# 指標ごとの出力タイプ
+INDICATOR_TYPES = ['sma', 'rsi', 'macd', 'bb']
+
+# 指標タイプ → 必須カラム
+INDICATOR_REQUIRED = {
+    'sma': ['date', 'sma_5', 'sma_25', 'sma_75'],
+    'rsi': ['date', 'rsi'],
+    'macd': ['date', 'macd', 'macd_signal', 'macd_hist'],
+    'bb': ['date', 'bb_upper', 'bb_middle', 'bb_lower'],
+}
+
+
+def indicator_rules(df, indicator_type):
+    """指標タイプ別の行単位ルール（存在するカラムのみ対象）"""
+    columns = set(df.columns)
+    if indicator_type == 'sma':
+        # SMAは非負
+        return [(f'negative_{col}', f'{col} に負の値が存在します', lambda df, col=col: df[col] < 0, None)
+                for col in df.columns if col.startswith('sma_')]
+    if indicator_type == 'rsi' and 'rsi' in columns:
+        # RSIは0～100
+        return [('rsi_range', 'RSIが範囲外（0～100）', lambda df: (df['rsi'] < 0) | (df['rsi'] > 100),
+                 ('rsi', 'RSI={:.2f}'))]
+    if indicator_type == 'macd' and {'macd', 'macd_signal', 'macd_hist'} <= columns:
+        # MACDヒストグラム = MACD - シグナル
+        return [('macd_hist', 'MACDヒストグラムの計算が不正確です',
+                 lambda df: (df['macd_hist'] - (df['macd'] - df['macd_signal'])).abs() > 0.01, None)]
+    if indicator_type == 'bb' and {'bb_upper', 'bb_middle', 'bb_lower'} <= columns:
+        # ボリンジャーバンド: bb_upper >= bb_middle >= bb_lower
+        return [('bb_upper_lt_middle', 'bb_upper < bb_middle の行が存在します',
+                 lambda df: df['bb_upper'] < df['bb_middle'], None),
+                ('bb_middle_lt_lower', 'bb_middle < bb_lower の行が存在します',
+                 lambda df: df['bb_middle'] < df['bb_lower'], None)]
+    return []
+
+
+def check_indicator_frame(df, indicator_type):
+    """テクニカル指標DataFrameを検証（全ルールを1つのマスク行列で評価）
+    
+    Args:
+        df: 指標DataFrame
+        indicator_type: 'sma', 'rsi', 'macd', 'bb', 'indicators'（全指標をまとめた出力）のいずれか
     
-    anomalies = df[df['pct_change'].abs() > 0.5]
-    if len(anomalies) > 0:
-        for idx, row in anomalies.iterrows():
-            errors.append(f"異常な変動率: {row['date']} 変動率={row['pct_change']*100:.1f}%")
+    Returns:
+        (errors, violations): エラーメッセージのリストと違反ルールごとの辞書リスト
+    """
+    # カラム名を小文字に統一
+    df.columns = df.columns.str.lower()
     
-    # 銘柄コード確認
-    if 'symbol' in df.columns:
-        invalid_symbols = df[~df['symbol'].isin(['9501.T', '9502.T'])]
-        if len(invalid_symbols) > 0:
-            errors.append(f"無効な銘柄コード: {invalid_symbols['symbol'].unique().tolist()}")
+    indicator_types = INDICATOR_TYPES if indicator_type == 'indicators' else [indicator_type]
+    required = list(dict.fromkeys(col for sub_type in indicator_types for col in INDICATOR_REQUIRED[sub_type]))
+    errors = [f"必須カラム不足: {col}" for col in required if col not in df.columns]
+    if 'date' not in df.columns:
+        return errors, []
     
-    return len(errors) == 0, errors
+    rules = [rule for sub_type in indicator_types for rule in indicator_rules(df, sub_type)]
+    violations = evaluate_rules(df, rules)
+    return errors + [format_violation(v) for v in violations], violations
+
+
+def validate_indicator_frame(df, indicator_type):
+    """テクニカル指標DataFrameを指標タイプ別に検証
+    
+    Args:
+        df: 指標DataFrame
+        indicator_type: 'sma', 'rsi', 'macd', 'bb', 'indicators' のいずれか
+    
+    Returns:
+        エラーリスト
+    """
+    errors, _ = check_indicator_frame(df, indicator_type)
+    return errors
 
 
 def validate_indicator_data(file_path, indicator_type):
-    """テクニカル指標データ（CSV）を検証
+    """テクニカル指標データ（CSV / Parquet / npz）を検証
     
     Args:
-        file_path: CSVファイルパス
-        indicator_type: 'sma', 'rsi', 'macd', 'bb' のいずれか
+        file_path: データファイルパス
+        indicator_type: 'sma', 'rsi', 'macd', 'bb', 'indicators'（全指標をまとめた出力）のいずれか
     
     Returns:
         (is_valid, errors): 検証成功フラグとエラーリスト
     """
+    result = validate_file(file_path, indicator_type)
+    return result['valid'], result['errors']
+
+
+# 再計算値との一致判定の許容誤差（増分計算・保存形式による丸め誤差を許容）
+RECOMPUTE_RTOL = 1e-6
+RECOMPUTE_ATOL = 1e-8
+
+
+@functools.lru_cache(maxsize=4)
+def recompute_indicators(price_path, signature, spec):
+    """株価データから指標を再計算（build_indicators と同じ指標レジストリを使用）
+    
+    同じ株価ファイルに対する複数の指標ファイルの検証で再計算を共有する
+    
+    Args:
+        price_path: 株価データファイルパス
+        signature: 株価データの (更新日時, サイズ)（ファイル更新時にキャッシュを無効化するためのキー）
+        spec: 指標設定文字列（build_indicators の状態ファイルに記録された設定）
+    
+    Returns:
+        date と指標カラムを含むDataFrame（日付昇順）
+    """
+    df = read_price_frame(*storage_for_path(price_path), columns=['close'], symbol='drop')
+    df.columns = df.columns.str.lower()
+    df = df.sort_values('date').reset_index(drop=True)
+    columns = compute_indicator_columns(IndicatorGraph(df['close'].astype(float)), parse_indicator_spec(spec))
+    return pd.DataFrame({'date': df['date'], **columns})
+
+
+def indicator_spec_for(indicator_file):
+    """指標ファイルの計算に使われた指標設定（状態ファイルがない場合は既定値）"""
+    indicator_file = Path(indicator_file)
+    symbol = indicator_file.stem.rsplit('_', 1)[0]
+    state = load_indicator_state(state_path(indicator_file.parent, symbol))
+    return state['indicators'] if state else format_indicator_spec(DEFAULT_INDICATORS)
+
+
+def check_recompute_frame(df, expected):
+    """指標DataFrameを株価データからの再計算結果と照合
+    
+    日付で突き合わせ、株価データにあって指標にない日付（更新漏れ）・指標にのみある日付・
+    再計算値と一致しない値を1つのマスク行列で検出する
+    
+    Args:
+        df: 指標DataFrame
+        expected: recompute_indicators の戻り値
+    
+    Returns:
+        (errors, violations): エラーメッセージのリストと違反ルールごとの辞書リスト
+    """
+    df.columns = df.columns.str.lower()
+    if 'date' not in df.columns:
+        return ["必須カラム不足: date"], []
+    
     errors = []
+    if len(df) != len(expected):
+        errors.append(f"行数不一致: 指標 {len(df)}行 / 株価データ {len(expected)}行")
+    
+    value_columns = [col for col in df.columns if col != 'date']
+    unknown = [col for col in value_columns if col not in expected.columns]
+    if unknown:
+        errors.append(f"再計算できないカラム: {unknown}")
+    compared = [col for col in value_columns if col in expected.columns]
+    
+    # 違反行の行番号は指標ファイル内の行番号（指標にない日付は -1）
+    merged = expected[['date'] + compared].merge(
+        df[['date'] + compared].reset_index(names='_row'),
+        on='date', how='outer', suffixes=('_recomputed', ''), indicator=True, sort=True,
+    )
+    merged.index = merged['_row'].fillna(-1).astype(int)
+    both = (merged['_merge'] == 'both').to_numpy()
+    
+    rules = [
+        ('missing_rows', '株価データの日付が指標にありません（再計算が必要）',
+         lambda m: m['_merge'] == 'left_only', None),
+        ('extra_rows', '株価データにない日付が指標にあります', lambda m: m['_merge'] == 'right_only', None),
+    ]
+    for col in compared:
+        actual = merged[col].to_numpy(dtype=float)
+        recomputed = merged[f'{col}_recomputed'].to_numpy(dtype=float)
+        merged[f'{col}_diff'] = actual - recomputed
+        drift = both & ~np.isclose(actual, recomputed, rtol=RECOMPUTE_RTOL, atol=RECOMPUTE_ATOL, equal_nan=True)
+        rules.append((f'drift_{col}', f'{col} が株価データからの再計算値と一致しません',
+                      lambda m, drift=drift: drift, (f'{col}_diff', '差={:+.4g}')))
     
+    violations = evaluate_rules(merged, rules)
+    return errors + [format_violation(v) for v in violations], violations
+
+
+def merge_violations(parts, rule_names):
+    """チャンクごとの違反（evaluate_rules の戻り値）をルールごとに合算（違反行は先頭 MAX_REPORTED_ROWS 行まで）
+    
+    Args:
+        parts: チャンクごとの違反のリスト
+        rule_names: ルール名（全体を一括で検証した場合と同じルール定義順に並べる）
+    """
+    merged = {}
+    for violations in parts:
+        for violation in violations:
+            lists = [key for key in ('rows', 'dates', 'values') if key in violation]
+            total = merged.setdefault(violation['rule'], {**violation, 'count': 0, **dict.fromkeys(lists, [])})
+            total['count'] += violation['count']
+            for key in lists:
+                total[key] = (total[key] + violation[key])[:MAX_REPORTED_ROWS]
+    rank = {name: i for i, name in enumerate(rule_names)}
+    return sorted(merged.values(), key=lambda violation: rank.get(violation['rule'], len(rank)))
+
+
+def rule_names(df, data_type):
+    """ルール名（全体を一括で検証した場合のルール定義順、チャンク・追記行の違反の合算用）
+    
+    Args:
+        df: 検証したDataFrame（指標タイプの場合は存在するカラムのルールのみ）
+        data_type: 'price' または指標タイプ（'sma', 'rsi', 'macd', 'bb', 'indicators'）
+    """
+    if data_type == 'price':
+        return [rule[0] for rule in PRICE_RULES + [SYMBOL_RULE]]
+    indicator_types = INDICATOR_TYPES if data_type == 'indicators' else [data_type]
+    return [rule[0] for sub_type in indicator_types for rule in indicator_rules(df, sub_type)]
+
+
+def append_result(previous, df, data_type, errors, violations):
+    """保存済みの行の検証結果に追記する行の検証結果を合算（全体を検証し直した場合と同じ検証レポートの1項目）
+    
+    Args:
+        previous: 保存済みの行の検証結果（前回の検証レポートの1項目）
+        df: 検証した追記行（インデックスはファイル内の行番号）
+        data_type: 'price' または指標タイプ（'sma', 'rsi', 'macd', 'bb', 'indicators'）
+        errors: 追記行のエラーメッセージ（check_price_frame / check_indicator_frame の戻り値）
+        violations: 追記行の違反（同上）
+    
+    Returns:
+        file, type, valid, errors, violations を含む辞書
+    """
+    fixed = [*previous['errors'][:len(previous['errors']) - len(previous['violations'])],
+             *errors[:len(errors) - len(violations)]]
+    merged = merge_violations([previous['violations'], violations], rule_names(df, data_type))
+    return validation_result(previous['file'], data_type,
+                             list(dict.fromkeys(fixed)) + [format_violation(v) for v in merged], merged)
+
+
+def check_file_chunks(file_path, data_type, chunk_rows):
+    """データファイルを chunk_rows 行ずつ読み込んで検証（前日比は前のチャンクの最終終値から続けて計算）
+    
+    Args:
+        file_path: データファイルパス
+        data_type: 'price' または指標タイプ（'sma', 'rsi', 'macd', 'bb', 'indicators'）
+        chunk_rows: 1チャンクの行数
+    
+    Returns:
+        (errors, violations)、株価データが日付順に保存されていない場合None（全体を読み込んで検証する）
+    """
+    store, name = storage_for_path(file_path)
+    chunks = iter_price_frames(store, name, chunk_rows) if data_type == 'price' else store.read_chunks(name, chunk_rows)
+    
+    errors, parts, names = None, [], []
+    previous_close, last_date = None, None
+    for chunk in chunks:
+        with instrumentation.stage('validate.read', rows=len(chunk)):
+            chunk.columns = chunk.columns.str.lower()
+        with instrumentation.stage('validate.check', rows=len(chunk)):
+            if data_type == 'price':
+                if 'date' in chunk.columns:
+                    dates = chunk['date']
+                    if not dates.is_monotonic_increasing or (last_date is not None and dates.iloc[0] < last_date):
+                        return None
+                    last_date = dates.iloc[-1]
+                chunk_errors, violations = check_price_frame(chunk, previous_close, symbol=name)
+                if 'close' in chunk.columns:
+                    # 前日比は欠損値を直前の終値で補完して計算するため、最後の有効な終値を引き継ぐ
+                    closes = chunk['close'].dropna()
+                    previous_close = closes.iloc[-1] if len(closes) else previous_close
+            else:
+                chunk_errors, violations = check_indicator_frame(chunk, data_type)
+        if errors is None:
+            # 必須カラム不足などチャンクによらないエラーとルールの順序は最初のチャンクから取得
+            errors = chunk_errors[:len(chunk_errors) - len(violations)]
+            names = rule_names(chunk, data_type)
+        parts.append(violations)
+    
+    violations = merge_violations(parts, names)
+    return (errors or []) + [format_violation(v) for v in violations], violations
+
+
+def validate_file(file_path, data_type, reference_path=None, chunk_rows=None):
+    """1ファイルを読み込んで検証し、検証レポートの1項目を返す
+    
+    Args:
+        file_path: データファイルパス
+        data_type: 'price'、指標タイプ（'sma', 'rsi', 'macd', 'bb', 'indicators'）、
+                   または 'recompute'（指標ファイルを株価データからの再計算結果と照合）
+        reference_path: 'recompute' の場合の株価データファイルパス
+        chunk_rows: 指定時は 'recompute' 以外のファイルをこの行数ずつ読み込んで検証（メモリ使用量の上限）
+    
+    Returns:
+        file, type, valid, errors, violations（違反ルールごとの件数・先頭の違反行）を含む辞書
+    """
+    if chunk_rows and data_type != 'recompute':
+        try:
+            checked = check_file_chunks(file_path, data_type, chunk_rows)
+        except Exception as e:
+            checked = [f"ファイル読み込みエラー: {e}"], []
+        if checked is not None:
+            return validation_result(file_path, data_type, *checked)
     try:
-        df = pd.read_csv(file_path, comment='#')
+        with instrumentation.stage('validate.read') as measurement:
+            # 株価データは価格カラムを float64、銘柄コードをカテゴリ型として読み込む
+            df = read_price_frame(*storage_for_path(file_path)) if data_type == 'price' else read_frame(file_path)
+            measurement.rows = len(df)
+        if data_type == 'recompute':
+            with instrumentation.stage('validate.recompute'):
+                signature = file_signature(reference_path)
+                expected = recompute_indicators(str(reference_path), (signature['mtime_ns'], signature['size']),
+                                                indicator_spec_for(file_path))
     except Exception as e:
-        return False, [f"CSV読み込みエラー: {e}"]
+        errors, violations = [f"ファイル読み込みエラー: {e}"], []
+    else:
+        with instrumentation.stage('validate.check', rows=len(df)):
+            if data_type == 'price':
+                errors, violations = check_price_frame(df, symbol=storage_for_path(file_path)[1])
+            elif data_type == 'recompute':
+                errors, violations = check_recompute_frame(df, expected)
+            else:
+                errors, violations = check_indicator_frame(df, data_type)
     
-    # カラム名を小文字に統一
-    df.columns = df.columns.str.lower()
+    return validation_result(file_path, data_type, errors, violations)
+
+
+def validation_result(file_path, data_type, errors, violations):
+    """検証レポートの1項目（file, type, valid, errors, violations）"""
+    return {
+        'file': str(file_path),
+        'type': data_type,
+        'valid': len(errors) == 0,
+        'errors': errors,
+        'violations': violations,
+    }
+
+
+# 検証ルールを変更した場合に上げる（キャッシュ済みの検証結果を無効化する）
+VALIDATOR_VERSION = '2.3.0'
+
+
+def file_signature(file_path):
+    """更新日時（ナノ秒）とサイズ"""
+    stat = os.stat(file_path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def content_hash(file_path, chunk_size=1 << 20):
+    """ファイル内容のSHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprint(file_path):
+    """キャッシュ判定用のシグネチャと内容のハッシュ"""
+    return {**file_signature(file_path), 'sha256': content_hash(file_path)}
+
+
+def cache_key(file_path, data_type):
+    """検証キャッシュのキー（同じファイルでも検証の種類ごとに別の項目）"""
+    return f"{data_type}:{file_path}"
+
+
+def load_validation_cache(cache_path):
+    """検証キャッシュ（キー → シグネチャ・検証結果）を読み込み
     
-    # 指標タイプ別の検証
-    if indicator_type == 'sma':
-        required = ['date', 'sma_5', 'sma_25', 'sma_75']
-        for col in required:
-            if col not in df.columns:
-                errors.append(f"必須カラム不足: {col}")
-        # SMAは非負
-        for col in ['sma_5', 'sma_25', 'sma_75']:
-            if col in df.columns and (df[col].dropna() < 0).any():
-                errors.append(f"{col} に負の値が存在します")
-    
-    elif indicator_type == 'rsi':
-        required = ['date', 'rsi']
-        for col in required:
-            if col not in df.columns:
-                errors.append(f"必須カラム不足: {col}")
-        # RSIは0～100
-        if 'rsi' in df.columns:
-            rsi_out_of_range = df[(df['rsi'] < 0) | (df['rsi'] > 100)].dropna(subset=['rsi'])
-            if len(rsi_out_of_range) > 0:
-                errors.append(f"RSIが範囲外（0～100）: {len(rsi_out_of_range)}行")
-    
-    elif indicator_type == 'macd':
-        required = ['date', 'macd', 'macd_signal', 'macd_hist']
-        for col in required:
-            if col not in df.columns:
-                errors.append(f"必須カラム不足: {col}")
-        # MACDヒストグラム = MACD - シグナル
-        if all(col in df.columns for col in ['macd', 'macd_signal', 'macd_hist']):
-            df_clean = df.dropna(subset=['macd', 'macd_signal', 'macd_hist'])
-            calculated_hist = df_clean['macd'] - df_clean['macd_signal']
-            diff = (df_clean['macd_hist'] - calculated_hist).abs()
-            if (diff > 0.01).any():
-                errors.append("MACDヒストグラムの計算が不正確です")
-    
-    elif indicator_type == 'bb':
-        required = ['date', 'bb_upper', 'bb_middle', 'bb_lower']
-        for col in required:
-            if col not in df.columns:
-                errors.append(f"必須カラム不足: {col}")
-        # ボリンジャーバンド: bb_upper >= bb_middle >= bb_lower
-        if all(col in df.columns for col in required):
-            df_clean = df.dropna(subset=['bb_upper', 'bb_middle', 'bb_lower'])
-            if not (df_clean['bb_upper'] >= df_clean['bb_middle']).all():
-                errors.append("bb_upper < bb_middle の行が存在します")
-            if not (df_clean['bb_middle'] >= df_clean['bb_lower']).all():
-                errors.append("bb_middle < bb_lower の行が存在します")
+    存在しない・壊れている・検証ルールのバージョンまたは銘柄ユニバースが異なる場合は空のキャッシュを返す
+    """
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('validator_version') != VALIDATOR_VERSION \
+            or manifest.get('universe') != active_universe().digest():
+        return {}
+    return manifest.get('files', {})
+
+
+def save_validation_cache(cache_path, cache):
+    """検証キャッシュを保存（存在しなくなったファイルの項目は削除）"""
+    cache_path = Path(cache_path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    files = {key: entry for key, entry in cache.items() if Path(entry['result']['file']).exists()}
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump({'validator_version': VALIDATOR_VERSION, 'universe': active_universe().digest(), 'files': files},
+                  f, ensure_ascii=False)
+
+
+def _fingerprint_matches(fingerprint, file_path):
+    """更新日時とサイズが一致、または内容のハッシュが一致すればTrue（後者の場合はシグネチャを更新）"""
+    signature = file_signature(file_path)
+    if all(fingerprint[key] == value for key, value in signature.items()):
+        return True
+    if fingerprint['sha256'] == content_hash(file_path):
+        fingerprint.update(signature)
+        return True
+    return False
+
+
+def lookup_cached_result(cache, file_path, data_type, reference_path=None):
+    """キャッシュ済みの検証結果を取得（ファイルまたは参照先の株価データが変更されている場合None）
     
-    return len(errors) == 0, errors
+    更新日時とサイズが一致すればファイルを読まずに採用し、
+    異なる場合も内容のハッシュが一致すれば採用してシグネチャを更新する
+    """
+    entry = cache.get(cache_key(file_path, data_type))
+    if entry is None or not _fingerprint_matches(entry, file_path):
+        return None
+    if reference_path is not None:
+        reference = entry.get('reference')
+        if reference is None or reference['path'] != str(reference_path) \
+                or not _fingerprint_matches(reference, reference_path):
+            return None
+    return entry['result']
+
+
+def validate_file_for_cache(file_path, data_type, reference_path=None, chunk_rows=None):
+    """1ファイルを検証してキャッシュ項目と共に返す（プロセスプールのワーカーとしても使用）
+    
+    シグネチャ・ハッシュは検証前に取得し、検証中にファイルが更新されても次回は再検証されるようにする
+    """
+    entry = {'type': data_type, **file_fingerprint(file_path)}
+    if reference_path is not None:
+        entry['reference'] = {'path': str(reference_path), **file_fingerprint(reference_path)}
+    entry['result'] = validate_file(file_path, data_type, reference_path, chunk_rows)
+    return entry
+
+
+def _validate_in_worker(file_path, data_type, reference_path=None, chunk_rows=None):
+    """プロセスプールのワーカー: 検証結果のキャッシュ項目と、呼び出し元で合算する計測値を返す"""
+    instrumentation.reset()
+    entry = validate_file_for_cache(file_path, data_type, reference_path, chunk_rows)
+    return entry, instrumentation.current().snapshot()
+
+
+def validate_files(tasks, cache=None, jobs=1, chunk_rows=None):
+    """複数ファイルを検証（未変更のファイルはキャッシュを使用、変更されたファイルは並列に検証）
+    
+    Args:
+        tasks: (ファイルパス, データタイプ) または (ファイルパス, 'recompute', 株価データファイルパス) のリスト
+        cache: load_validation_cache の戻り値（検証した項目で更新される）、Noneの場合はキャッシュしない
+        jobs: 並列プロセス数
+        chunk_rows: 指定時はファイルをこの行数ずつ読み込んで検証（validate_file を参照）
+    
+    Returns:
+        (検証結果, キャッシュ使用フラグ) のリスト（tasks と同じ順）
+    """
+    tasks = [tuple(task) + (None,) * (3 - len(task)) for task in tasks]
+    outcomes = [None] * len(tasks)
+    pending = []
+    for i, task in enumerate(tasks):
+        result = lookup_cached_result(cache, *task) if cache is not None else None
+        if result is not None:
+            outcomes[i] = (result, True)
+        else:
+            pending.append(i)
+    
+    if jobs > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=use_universe, initargs=(_universe_path,)) as executor:
+            entries = []
+            worker = functools.partial(_validate_in_worker, chunk_rows=chunk_rows)
+            for entry, metrics in executor.map(worker, *zip(*(tasks[i] for i in pending))):
+                instrumentation.current().merge(metrics)
+                entries.append(entry)
+    else:
+        entries = [validate_file_for_cache(*tasks[i], chunk_rows=chunk_rows) for i in pending]
+    
+    for i, entry in zip(pending, entries):
+        outcomes[i] = (entry['result'], False)
+        if cache is not None:
+            cache[cache_key(*tasks[i][:2])] = entry
+    return outcomes
+
+
+def load_previous_results(report_path):
+    """前回の検証レポートの結果（(ファイルパス, データタイプ) → 検証結果）、読み込めない場合は空"""
+    try:
+        with open(report_path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {(result['file'], result['type']): result for result in report.get('results', [])}
 
 
 def main():
     parser = argparse.ArgumentParser(description='データ検証スクリプト')
-    parser.add_argument('--symbols', type=str, default='9501.T,9502.T',
-                        help='銘柄コード（カンマ区切り）')
+    parser.add_argument('--symbols', type=str, default=UNIVERSE_KEYWORD,
+                        help='銘柄コード（カンマ区切り、universe: ユニバースの全銘柄、'
+                             'ワイルドカード（例: "*"）は株価ディレクトリの保存済み銘柄に一致、デフォルト: universe）')
+    parser.add_argument('--universe', type=str, default=None,
+                        help='銘柄ユニバースファイル（デフォルト: scripts/universe.csv）')
     parser.add_argument('--price-dir', type=str, default='data/price',
                         help='株価CSVディレクトリ')
     parser.add_argument('--indicator-dir', type=str, default='data/indicators',
                         help='指標CSVディレクトリ')
     parser.add_argument('--output', type=str, default='data/validation_report.json',
                         help='検証レポート出力パス（JSON）')
+    parser.add_argument('--format', type=str, choices=FORMATS, default='csv',
+                        help='検証するデータの保存形式（csv / parquet / npy、デフォルト: csv）')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='並列プロセス数（変更されたファイルの検証、デフォルト: 1 = 逐次）')
+    parser.add_argument('--chunk-rows', type=int, default=None,
+                        help='ファイルをこの行数ずつ読み込んで検証（長期間・分足データのメモリ使用量の上限、'
+                             'デフォルト: 全体を読み込み）')
+    parser.add_argument('--cache', type=str, default=None,
+                        help='検証キャッシュのパス（デフォルト: 検証レポートと同じディレクトリの validation_cache.json）')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='検証キャッシュを使用せず全ファイルを検証')
+    parser.add_argument('--verify-recompute', action='store_true',
+                        help='株価データから指標を再計算し、指標ファイルの日付・行数・値と照合（更新漏れ・不整合の検出）')
+    parser.add_argument('--manifest', type=str, default=None,
+                        help='変更銘柄マニフェスト（fetch_price_data.py の出力、デフォルト: 株価ディレクトリの _changes.json）')
+    parser.add_argument('--force', action='store_true',
+                        help='変更銘柄マニフェストにかかわらず全銘柄を検証')
+    parser.add_argument('--run-report', type=str, default=None,
+                        help='実行レポート（段階ごとの処理時間・処理行数・ピークメモリ）の出力パス'
+                             '（デフォルト: 検証レポートと同じディレクトリの run_report.json）')
+    parser.add_argument('--profile', type=str, default=None,
+                        help='cProfileのプロファイル出力パス（例: data/validate.prof、指定時はtracemallocも有効化）')
     
     args = parser.parse_args()
-    symbols = [s.strip() for s in args.symbols.split(',')]
+    if args.chunk_rows is not None and args.chunk_rows <= 0:
+        parser.error("--chunk-rows は正の整数で指定してください")
+    instrumentation.start_profiling(args.profile)
+    use_universe(args.universe)
+    try:
+        universe = active_universe()
+    except (OSError, ValueError) as e:
+        parser.error(f"銘柄ユニバースを読み込めません: {e}")
+    price_store = get_storage(args.format, args.price_dir)
+    symbols = resolve_symbols(args.symbols, universe, price_store)
     
     print(f"🔍 データ検証開始")
     print(f"対象銘柄: {symbols}\n")
     
+    indicator_store = get_storage(args.format, args.indicator_dir)
+    
+    # 株価データが変更されておらず、前回の検証レポートが全ファイルより新しい銘柄は前回の結果を使用
+    changes = None if args.force else load_manifest(args.manifest or manifest_path(args.price_dir))
+    previous = load_previous_results(args.output) if changes is not None else {}
+    carried = {}
+    
+    # 検証対象ファイル（全指標をまとめた出力は --layout combined / both の場合のみ存在）
+    tasks = []
+    for symbol in symbols:
+        price_file = price_store.path(symbol)
+        candidates = [(price_file, 'price')]
+        for indicator_type in INDICATOR_TYPES + ['indicators']:
+            indicator_file = indicator_store.path(f"{symbol}_{indicator_type}")
+            candidates.append((indicator_file, indicator_type))
+            if args.verify_recompute and price_file.exists():
+                candidates.append((indicator_file, 'recompute', price_file))
+        candidates = [task for task in candidates if task[0].exists()]
+        keys = [(str(task[0]), task[1]) for task in candidates]
+        if is_unchanged(changes, symbol) and price_file.exists() and all(key in previous for key in keys) \
+                and outputs_up_to_date([task[0] for task in candidates], [args.output]):
+            carried[symbol] = [previous[key] for key in keys]
+            continue
+        tasks.extend(candidates)
+    
+    cache_path = None if args.no_cache else Path(args.cache or Path(args.output).with_name('validation_cache.json'))
+    cache = load_validation_cache(cache_path) if cache_path else None
+    outcomes = dict(zip(tasks, validate_files(tasks, cache, jobs=args.jobs, chunk_rows=args.chunk_rows)))
+    if cache_path:
+        save_validation_cache(cache_path, cache)
+    
     report = {
         'timestamp': pd.Timestamp.now().isoformat(),
         'results': []
     }
     
     total_errors = 0
+    cached_count = 0
+    
+    def add_result(label, outcome):
+        nonlocal total_errors, cached_count
+        result, cached = outcome
+        cached_count += cached
+        status = "✅ 正常" if result['valid'] else "❌ エラー"
+        print(f"{label}: {status}{'（キャッシュ）' if cached else ''}")
+        for err in result['errors']:
+            print(f"  - {err}")
+        total_errors += len(result['errors'])
+        report['results'].append(result)
     
     for symbol in symbols:
         print(f"--- {symbol} ---")
         
+        if symbol in carried:
+            errors = sum(len(result['errors']) for result in carried[symbol])
+            print(f"変更なし: {'✅ 正常' if errors == 0 else f'❌ エラー {errors}件'}（前回の検証結果）\n")
+            total_errors += errors
+            report['results'].extend(carried[symbol])
+            continue
+        
         # 株価データ検証
-        price_file = Path(args.price_dir) / f"{symbol}.csv"
-        if price_file.exists():
-            is_valid, errors = validate_price_data(price_file)
-            status = "✅ 正常" if is_valid else "❌ エラー"
-            print(f"株価データ: {status}")
-            if errors:
-                for err in errors:
-                    print(f"  - {err}")
-                total_errors += len(errors)
-            
-            report['results'].append({
-                'file': str(price_file),
-                'type': 'price',
-                'valid': is_valid,
-                'errors': errors
-            })
+        price_file = price_store.path(symbol)
+        if (price_file, 'price') in outcomes:
+            add_result("株価データ", outcomes[(price_file, 'price')])
         else:
             print(f"株価データ: ⚠️  ファイル不存在 {price_file}")
             report['results'].append({
                 'file': str(price_file),
                 'type': 'price',
                 'valid': False,
-                'errors': ['ファイルが存在しません']
+                'errors': ['ファイルが存在しません'],
+                'violations': [],
             })
             total_errors += 1
         
         # テクニカル指標検証
-        indicators = {
-            'sma': f"{symbol}_sma.csv",
-            'rsi': f"{symbol}_rsi.csv",
-            'macd': f"{symbol}_macd.csv",
-            'bb': f"{symbol}_bb.csv"
-        }
-        
-        for indicator_type, filename in indicators.items():
-            indicator_file = Path(args.indicator_dir) / filename
-            if indicator_file.exists():
-                is_valid, errors = validate_indicator_data(indicator_file, indicator_type)
-                status = "✅ 正常" if is_valid else "❌ エラー"
-                print(f"{indicator_type.upper()}データ: {status}")
-                if errors:
-                    for err in errors:
-                        print(f"  - {err}")
-                    total_errors += len(errors)
-                
-                report['results'].append({
-                    'file': str(indicator_file),
-                    'type': indicator_type,
-                    'valid': is_valid,
-                    'errors': errors
-                })
-            else:
+        for indicator_type in INDICATOR_TYPES + ['indicators']:
+            indicator_file = indicator_store.path(f"{symbol}_{indicator_type}")
+            if (indicator_file, indicator_type) in outcomes:
+                add_result(f"{indicator_type.upper()}データ", outcomes[(indicator_file, indicator_type)])
+                if (indicator_file, 'recompute', price_file) in outcomes:
+                    add_result("  再計算との照合", outcomes[(indicator_file, 'recompute', price_file)])
+            elif indicator_type != 'indicators':
                 print(f"{indicator_type.upper()}データ: ⚠️  ファイル不存在")
         
         print()
@@ -237,8 +794,13 @@ def main():
         json.dump(report, f, ensure_ascii=False, indent=2)
     
     print(f"📄 検証レポート: {output_path}")
+    print(f"検証ファイル数: {len(tasks)}（キャッシュ使用: {cached_count}、変更なしで省略: {len(carried)} 銘柄）")
     print(f"総エラー数: {total_errors}")
     
+    run_report = Path(args.run_report or output_path.with_name(instrumentation.RUN_REPORT_NAME))
+    instrumentation.write_run_report(run_report, 'validate_data', files=len(tasks), cached=cached_count,
+                                     skipped=len(carried), errors=total_errors)
+    
     if total_errors > 0:
         print("❌ データ検証失敗")
         sys.exit(1)
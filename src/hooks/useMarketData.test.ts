@@ -1,5 +1,5 @@
 import { describe, it, expect } from 'vitest';
-import { getFilterDate } from './useMarketData';
+import { getFilterDate, getResolution, resolveDataPath, splitIndicatorRows, splitMultiresRows } from './useMarketData';
 
 describe('getFilterDate', () => {
   it('1Mは1ヶ月前の日付を返す', () => {
@@ -22,3 +22,64 @@ describe('getFilterDate', () => {
     expect(result).toBeNull();
   });
 });
+
+describe('splitIndicatorRows', () => {
+  it('全指標CSVの行を指標ごとの配列に分割する', () => {
+    const result = splitIndicatorRows([
+      {
+        date: '2025-01-15',
+        sma_5: 1, sma_25: 2, sma_50: 3, sma_75: 4,
+        rsi: 55,
+        macd: 0.5, macd_signal: 0.3, macd_hist: 0.2,
+        bb_upper: 110, bb_middle: 100, bb_lower: 90,
+      },
+    ]);
+    expect(result.sma).toEqual([{ date: '2025-01-15', sma_5: 1, sma_25: 2, sma_50: 3, sma_75: 4 }]);
+    expect(result.rsi).toEqual([{ date: '2025-01-15', rsi: 55 }]);
+    expect(result.macd).toEqual([{ date: '2025-01-15', macd: 0.5, signal: 0.3, histogram: 0.2 }]);
+    expect(result.bb).toEqual([{ date: '2025-01-15', bb_upper: 110, bb_middle: 100, bb_lower: 90 }]);
+  });
+});
+
+describe('getResolution', () => {
+  it('3Y / 5Y は間引き系列、それ以外は日足を返す', () => {
+    expect(getResolution('3Y')).toBe('3y');
+    expect(getResolution('5Y')).toBe('5y');
+    expect(getResolution('1Y')).toBe('daily');
+    expect(getResolution('Custom')).toBe('daily');
+  });
+});
+
+describe('splitMultiresRows', () => {
+  it('株価と全指標の行を株価と指標ごとの配列に分割する', () => {
+    const result = splitMultiresRows([
+      {
+        date: '2025-01-17',
+        open: 100, high: 110, low: 95, close: 105, volume: 1000,
+        sma_5: 1, sma_25: 2, sma_50: 3, sma_75: 4,
+        rsi: 55,
+        macd: 0.5, macd_signal: 0.3, macd_hist: 0.2,
+        bb_upper: 110, bb_middle: 100, bb_lower: 90,
+      },
+    ]);
+    expect(result.price).toEqual([{ date: '2025-01-17', open: 100, high: 110, low: 95, close: 105, volume: 1000 }]);
+    expect(result.rsi).toEqual([{ date: '2025-01-17', rsi: 55 }]);
+    expect(result.macd).toEqual([{ date: '2025-01-17', macd: 0.5, signal: 0.3, histogram: 0.2 }]);
+  });
+});
+
+describe('resolveDataPath', () => {
+  const manifest = {
+    schema_version: '1.0',
+    symbols: { '9501.T': { price: 'artifacts/price/9501.T.0123456789ab.csv' } },
+  };
+
+  it('マニフェストにあるファイルはハッシュ付きのパスを返す', () => {
+    expect(resolveDataPath(manifest, '9501.T', 'price')).toBe('artifacts/price/9501.T.0123456789ab.csv');
+  });
+
+  it('マニフェストにない場合は固定のファイル名を返す', () => {
+    expect(resolveDataPath(manifest, '9501.T', 'indicators')).toBe('indicators/9501.T_indicators.csv');
+    expect(resolveDataPath(null, '9502.T', 'price')).toBe('price/9502.T.csv');
+  });
+});
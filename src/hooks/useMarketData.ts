@@ -17,9 +17,27 @@ interface UseMarketDataReturn {
   filteredData: MarketData | null;
 }
 
+/**
+ * 間引き系列を読み込む期間フィルタ → ファイル名の接尾辞
+ * （build_indicators.py --multires が出力する {symbol}_3y.csv / {symbol}_5y.csv）
+ */
+const DOWNSAMPLED_PERIODS: Partial<Record<PeriodFilter, string>> = {
+  '3Y': '3y',
+  '5Y': '5y',
+};
+
+/**
+ * 期間フィルタに対応する読み込み対象（'daily': 日足の全期間、それ以外: 間引き系列の接尾辞）
+ */
+export function getResolution(periodFilter: PeriodFilter): string {
+  return DOWNSAMPLED_PERIODS[periodFilter] ?? 'daily';
+}
+
 /**
  * 株価データとテクニカル指標データを読み込むカスタムフック
  * 
+ * 3Y / 5Y は点数を抑えた間引き系列を読み込み、ない場合は日足の全期間を読み込む
+ * 
  * @param symbol - 銘柄コード（'9501.T' または '9502.T'）
  * @param periodFilter - 期間フィルタ（'1M' | '3M' | '6M' | '1Y' | '3Y' | '5Y' | 'Custom'）
  * @returns MarketData、ローディング状態、エラー
@@ -28,6 +46,7 @@ export function useMarketData(symbol: Symbol, periodFilter: PeriodFilter = '1Y')
   const [data, setData] = useState<MarketData | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const resolution = getResolution(periodFilter);
 
   useEffect(() => {
     let isMounted = true;
@@ -40,31 +59,6 @@ export function useMarketData(symbol: Symbol, periodFilter: PeriodFilter = '1Y')
         // Viteのベースパス対応: import.meta.env.BASE_URL を使用
         const basePath = import.meta.env.BASE_URL || '/';
         
-        // 並列で全CSVを読み込み
-        const [priceRes, smaRes, rsiRes, macdRes, bbRes] = await Promise.all([
-          fetch(`${basePath}data/price/${symbol}.csv`),
-          fetch(`${basePath}data/indicators/${symbol}_sma.csv`),
-          fetch(`${basePath}data/indicators/${symbol}_rsi.csv`),
-          fetch(`${basePath}data/indicators/${symbol}_macd.csv`),
-          fetch(`${basePath}data/indicators/${symbol}_bb.csv`),
-        ]);
-
-        // エラーチェック
-        if (!priceRes.ok) throw new Error(`株価データの取得に失敗しました: ${priceRes.statusText}`);
-        if (!smaRes.ok) throw new Error(`SMAデータの取得に失敗しました: ${smaRes.statusText}`);
-        if (!rsiRes.ok) throw new Error(`RSIデータの取得に失敗しました: ${rsiRes.statusText}`);
-        if (!macdRes.ok) throw new Error(`MACDデータの取得に失敗しました: ${macdRes.statusText}`);
-        if (!bbRes.ok) throw new Error(`ボリンジャーバンドデータの取得に失敗しました: ${bbRes.statusText}`);
-
-        // CSV → テキスト
-        const [priceText, smaText, rsiText, macdText, bbText] = await Promise.all([
-          priceRes.text(),
-          smaRes.text(),
-          rsiRes.text(),
-          macdRes.text(),
-          bbRes.text(),
-        ]);
-
         // PapaParse でパース
         // 注意: CSVヘッダーが大文字始まり(Open, High...)の場合があるため、小文字に変換する処理が必要
         // ここではtransformHeaderオプションを使用して小文字に統一します
@@ -75,27 +69,42 @@ export function useMarketData(symbol: Symbol, periodFilter: PeriodFilter = '1Y')
           transformHeader: (header: string) => header.toLowerCase(),
         };
 
-        const priceData = parseCSV<PriceData>(priceText, parseOptions);
-        const smaData = parseCSV<SMAData>(smaText, parseOptions);
-        const rsiData = parseCSV<RSIData>(rsiText, parseOptions);
-        const rawMacdData = parseCSV<any>(macdText, parseOptions);
-        const bbData = parseCSV<BollingerBandData>(bbText, parseOptions);
+        // マニフェストがある場合はハッシュ付きのファイル名（長期キャッシュ可能）で読み込む
+        const manifest = await loadManifest(basePath);
+        const dataUrl = (kind: string) => `${basePath}data/${resolveDataPath(manifest, symbol, kind)}`;
+
+        // 長期間の表示は間引き系列（株価と全指標を1ファイルにまとめたCSV）を読み込む
+        if (resolution !== 'daily') {
+          const downsampledRes = await fetch(dataUrl(resolution));
+          if (isCsvResponse(downsampledRes)) {
+            const rows = parseCSV<MultiresRow>(await downsampledRes.text(), parseOptions);
+            if (isMounted) {
+              setData(splitMultiresRows(rows));
+            }
+            return;
+          }
+        }
 
-        // MACDデータのカラム名をマッピング
-        const macdData: MACDData[] = rawMacdData.map(item => ({
-          date: item.date,
-          macd: item.macd,
-          signal: item.macd_signal,
-          histogram: item.macd_hist,
-        }));
+        // 株価CSVと全指標をまとめたCSV（{symbol}_indicators.csv）を並列で読み込み
+        const [priceRes, combinedRes] = await Promise.all([
+          fetch(dataUrl('price')),
+          fetch(dataUrl('indicators')),
+        ]);
+
+        // エラーチェック
+        if (!priceRes.ok) throw new Error(`株価データの取得に失敗しました: ${priceRes.statusText}`);
+
+        const priceData = parseCSV<PriceData>(await priceRes.text(), parseOptions);
+
+        // まとめたCSVがない場合は指標ごとの4ファイルを読み込む（互換モード）
+        const indicators = isCsvResponse(combinedRes)
+          ? splitIndicatorRows(parseCSV<CombinedIndicatorRow>(await combinedRes.text(), parseOptions))
+          : await loadSplitIndicators(dataUrl, parseOptions);
 
         if (isMounted) {
           setData({
             price: priceData,
-            sma: smaData,
-            rsi: rsiData,
-            macd: macdData,
-            bb: bbData,
+            ...indicators,
           });
         }
       } catch (err) {
@@ -114,7 +123,7 @@ export function useMarketData(symbol: Symbol, periodFilter: PeriodFilter = '1Y')
     return () => {
       isMounted = false;
     };
-  }, [symbol]);
+  }, [symbol, resolution]);
 
   // 期間フィルタリング
   const filteredData = useMemo(() => {
@@ -135,6 +144,168 @@ export function useMarketData(symbol: Symbol, periodFilter: PeriodFilter = '1Y')
   return { data, loading, error, filteredData };
 }
 
+/**
+ * 全指標をまとめたCSVの1行
+ */
+export interface CombinedIndicatorRow {
+  date: string;
+  sma_5?: number;
+  sma_25?: number;
+  sma_50?: number;
+  sma_75?: number;
+  rsi?: number;
+  macd?: number;
+  macd_signal?: number;
+  macd_hist?: number;
+  bb_upper?: number;
+  bb_middle?: number;
+  bb_lower?: number;
+}
+
+/**
+ * 複数解像度の出力（週足・月足・間引き系列）の1行（株価と全指標）
+ */
+export interface MultiresRow extends PriceData, CombinedIndicatorRow {}
+
+type IndicatorSeries = Omit<MarketData, 'price'>;
+
+/**
+ * 静的配信用データのマニフェスト（scripts/publish_artifacts.py が出力する data/manifest.json）
+ * 銘柄コード → 種類（'price' / 'indicators' / 'sma' / '3y' など）→ data/ からの相対パス
+ */
+export interface DataManifest {
+  schema_version: string;
+  symbols: Record<string, Record<string, string>>;
+}
+
+let manifestPromise: Promise<DataManifest | null> | null = null;
+
+/**
+ * マニフェストを読み込む（ページ内で1回のみ、ない場合は null）
+ * マニフェスト自体はファイル名が固定のため、ブラウザのキャッシュを使わず毎回サーバーに確認する
+ */
+function loadManifest(basePath: string): Promise<DataManifest | null> {
+  if (!manifestPromise) {
+    manifestPromise = fetch(`${basePath}data/manifest.json`, { cache: 'no-cache' })
+      .then(res => (res.ok ? res.json() : null))
+      .then(manifest => (manifest?.symbols ? (manifest as DataManifest) : null))
+      .catch(() => null);
+  }
+  return manifestPromise;
+}
+
+/**
+ * データファイルの data/ からの相対パス
+ * マニフェストにある場合はハッシュ付きのファイル名、ない場合は固定のファイル名
+ * （'price' は price/{symbol}.csv、それ以外は indicators/{symbol}_{kind}.csv）
+ */
+export function resolveDataPath(manifest: DataManifest | null, symbol: string, kind: string): string {
+  const published = manifest?.symbols[symbol]?.[kind];
+  if (published) return published;
+  return kind === 'price' ? `price/${symbol}.csv` : `indicators/${symbol}_${kind}.csv`;
+}
+
+/**
+ * レスポンスがCSVとして読み込めるか判定
+ * （開発サーバーは存在しないファイルに対して index.html を200で返すため Content-Type も確認）
+ */
+function isCsvResponse(res: Response): boolean {
+  return res.ok && !(res.headers.get('content-type') ?? '').includes('text/html');
+}
+
+/**
+ * 全指標をまとめたCSVの行を指標ごとの配列に分割
+ * 指標ごとの4ファイルを読み込んだ場合と同じ形式で返す
+ */
+export function splitIndicatorRows(rows: CombinedIndicatorRow[]): IndicatorSeries {
+  return {
+    sma: rows.map(row => ({
+      date: row.date,
+      sma_5: row.sma_5,
+      sma_25: row.sma_25,
+      sma_50: row.sma_50,
+      sma_75: row.sma_75,
+    })),
+    rsi: rows.map(row => ({ date: row.date, rsi: row.rsi })),
+    macd: rows.map(row => ({
+      date: row.date,
+      macd: row.macd,
+      signal: row.macd_signal,
+      histogram: row.macd_hist,
+    })),
+    // 4ファイル読み込み時と同様に bb_upper / bb_middle / bb_lower のカラム名のまま保持
+    bb: rows.map(row => ({
+      date: row.date,
+      bb_upper: row.bb_upper,
+      bb_middle: row.bb_middle,
+      bb_lower: row.bb_lower,
+    } as BollingerBandData)),
+  };
+}
+
+/**
+ * 複数解像度の出力の行を株価と指標ごとの配列に分割
+ */
+export function splitMultiresRows(rows: MultiresRow[]): MarketData {
+  return {
+    price: rows.map(row => ({
+      date: row.date,
+      open: row.open,
+      high: row.high,
+      low: row.low,
+      close: row.close,
+      volume: row.volume,
+    })),
+    ...splitIndicatorRows(rows),
+  };
+}
+
+/**
+ * 指標ごとの4ファイル（SMA / RSI / MACD / ボリンジャーバンド）を読み込む
+ */
+async function loadSplitIndicators(
+  dataUrl: (kind: string) => string,
+  parseOptions: Papa.ParseConfig
+): Promise<IndicatorSeries> {
+  const [smaRes, rsiRes, macdRes, bbRes] = await Promise.all([
+    fetch(dataUrl('sma')),
+    fetch(dataUrl('rsi')),
+    fetch(dataUrl('macd')),
+    fetch(dataUrl('bb')),
+  ]);
+
+  // エラーチェック
+  if (!smaRes.ok) throw new Error(`SMAデータの取得に失敗しました: ${smaRes.statusText}`);
+  if (!rsiRes.ok) throw new Error(`RSIデータの取得に失敗しました: ${rsiRes.statusText}`);
+  if (!macdRes.ok) throw new Error(`MACDデータの取得に失敗しました: ${macdRes.statusText}`);
+  if (!bbRes.ok) throw new Error(`ボリンジャーバンドデータの取得に失敗しました: ${bbRes.statusText}`);
+
+  // CSV → テキスト
+  const [smaText, rsiText, macdText, bbText] = await Promise.all([
+    smaRes.text(),
+    rsiRes.text(),
+    macdRes.text(),
+    bbRes.text(),
+  ]);
+
+  const rawMacdData = parseCSV<any>(macdText, parseOptions);
+
+  // MACDデータのカラム名をマッピング
+  const macdData: MACDData[] = rawMacdData.map(item => ({
+    date: item.date,
+    macd: item.macd,
+    signal: item.macd_signal,
+    histogram: item.macd_hist,
+  }));
+
+  return {
+    sma: parseCSV<SMAData>(smaText, parseOptions),
+    rsi: parseCSV<RSIData>(rsiText, parseOptions),
+    macd: macdData,
+    bb: parseCSV<BollingerBandData>(bbText, parseOptions),
+  };
+}
+
 /**
  * CSVテキストをパースして型付き配列に変換
  */
@@ -0,0 +1,99 @@
+"""
+Pythonデータパイプライン（scripts/）のユニットテスト共通設定
+"""
+
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[2] / 'scripts'
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+
+def make_ohlcv(n_rows=300, start='2020-01-06', seed=0):
+    """合成OHLCVデータ（営業日ベース）を生成"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=n_rows)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, n_rows)))
+    open_ = close * (1 + rng.normal(0, 0.003, n_rows))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, n_rows))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, n_rows))
+    volume = rng.integers(1_000_000, 5_000_000, n_rows)
+    return pd.DataFrame({
+        'Date': dates.strftime('%Y-%m-%d'),
+        'Open': open_.round(1),
+        'High': high.round(1),
+        'Low': low.round(1),
+        'Close': close.round(1),
+        'Volume': volume,
+    })
+
+
+class StooqStandIn:
+    """Stooq形式のCSVを返すローカルHTTPサーバー
+
+    Attributes:
+        frames: Stooq銘柄コード → OHLCV DataFrame
+        failures: Stooq銘柄コード → 残り失敗回数（HTTP 503を返す）
+        requests: 受信したクエリパラメータの記録
+    """
+
+    def __init__(self):
+        self.frames = {}
+        self.failures = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                symbol = params.get('s', '').upper()
+                with stand_in._lock:
+                    stand_in.requests.append(params)
+                    remaining = stand_in.failures.get(symbol, 0)
+                    if remaining:
+                        stand_in.failures[symbol] = remaining - 1
+                if remaining:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                df = stand_in.frames.get(symbol)
+                if df is None:
+                    body = b'No data'
+                else:
+                    dates = pd.to_datetime(df['Date'])
+                    mask = ((dates >= pd.to_datetime(params['d1'], format='%Y%m%d'))
+                            & (dates <= pd.to_datetime(params['d2'], format='%Y%m%d')))
+                    body = df[mask].to_csv(index=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/csv')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_port}/q/d/l/"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stooq_server():
+    with StooqStandIn() as server:
+        yield server
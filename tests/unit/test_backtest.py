@@ -0,0 +1,115 @@
+"""
+backtest.py のユニットテスト
+"""
+
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import (evaluate_positions, expand_grid, hold_positions, parse_sweep_spec, parse_values,
+                      sweep_strategy)
+from build_indicators import compute_indicators
+from conftest import SCRIPTS_DIR, make_ohlcv
+from indicator_registry import IndicatorGraph
+from storage import CsvStorage
+
+
+def _loop_backtest(close, positions, fee_bps):
+    """1日ずつ損益を計算する参照実装（累積リターン, 最大ドローダウン, 買いの回数）"""
+    equity, peak, worst, trades, previous = 1.0, 1.0, 0.0, 0, 0.0
+    for t in range(len(close)):
+        daily = previous * (close[t] / close[t - 1] - 1) if t > 0 else 0.0
+        daily -= abs(positions[t] - previous) * fee_bps / 10000
+        trades += positions[t] > previous
+        equity *= 1 + daily
+        peak = max(peak, equity)
+        worst = min(worst, equity / peak - 1)
+        previous = positions[t]
+    return equity - 1, worst, trades
+
+
+def _prices(n_rows=400, seed=0):
+    df = make_ohlcv(n_rows, seed=seed)
+    df.columns = df.columns.str.lower()
+    return df.assign(date=pd.to_datetime(df['date']))
+
+
+def test_sma_cross_sweep_matches_loop_reference():
+    df = _prices()
+    close = df['close'].to_numpy()
+    result = sweep_strategy(IndicatorGraph(df['close']), 'sma_cross', {'fast': [3, 5, 10], 'slow': [5, 25]},
+                            fee_bps=10)
+
+    assert result['params'].tolist() == ['fast=3,slow=5', 'fast=3,slow=25', 'fast=5,slow=25', 'fast=10,slow=25']
+    indicators = compute_indicators(df.copy(), indicators={'sma': [(5,), (25,)]})
+    positions = (indicators['sma_5'] > indicators['sma_25']).to_numpy(dtype=float)
+    row = result[result['params'] == 'fast=5,slow=25'].iloc[0]
+    total_return, max_drawdown, trades = _loop_backtest(close, positions, 10)
+    assert row['total_return'] == pytest.approx(total_return)
+    assert row['max_drawdown'] == pytest.approx(max_drawdown)
+    assert row['trades'] == trades and row['exposure'] == pytest.approx(positions[:-1].sum() / len(close))
+
+
+def test_hold_positions_keeps_state_between_signals():
+    entry = np.array([[0, 1], [1, 0], [0, 0], [0, 1], [1, 0], [0, 0]], dtype=bool)
+    exit = np.array([[0, 0], [0, 0], [1, 0], [0, 1], [1, 0], [0, 0]], dtype=bool)
+
+    assert hold_positions(entry, exit).astype(int).T.tolist() == [[0, 1, 0, 0, 0, 0], [1, 1, 1, 0, 0, 0]]
+
+    close = np.array([100.0, 110.0, 121.0, 121.0])
+    metrics = evaluate_positions(close, np.array([[1], [1], [0], [0]], dtype=bool), fee_bps=0)
+    assert metrics['total_return'][0] == pytest.approx(0.21)
+    assert metrics['trades'][0] == 1 and metrics['max_drawdown'][0] == 0
+
+
+def test_rsi_reversion_uses_registry_rsi():
+    df = _prices(600, seed=3)
+    result = sweep_strategy(IndicatorGraph(df['close']), 'rsi_reversion',
+                            {'window': [14], 'lower': [30], 'upper': [70]}, fee_bps=0)
+    rsi = compute_indicators(df.copy(), indicators={'rsi': [(14,)]})['rsi'].to_numpy()
+
+    positions, held = np.zeros(len(rsi)), 0.0
+    for t, value in enumerate(rsi):
+        held = 0.0 if value > 70 else 1.0 if value < 30 else held
+        positions[t] = held
+    total_return, max_drawdown, trades = _loop_backtest(df['close'].to_numpy(), positions, 0)
+    assert trades > 0 and result['trades'].iloc[0] == trades
+    assert result['total_return'].iloc[0] == pytest.approx(total_return)
+    assert result['max_drawdown'].iloc[0] == pytest.approx(max_drawdown)
+
+
+def test_sweep_spec_and_grid():
+    sweep = parse_sweep_spec('sma_cross:fast=5:15:5,slow=10/20;bb_breakout:num_std=1.5:2.5:0.5;buy_and_hold')
+
+    assert sweep['sma_cross'] == {'fast': [5, 10, 15], 'slow': [10, 20]}
+    assert sweep['bb_breakout']['num_std'] == [1.5, 2.0, 2.5] and len(sweep['bb_breakout']['window']) > 1
+    assert len(expand_grid('sma_cross', sweep['sma_cross'])['fast']) == 4
+    assert expand_grid('buy_and_hold', sweep['buy_and_hold']) == {}
+    assert parse_values('0.1:0.3:0.1') == [0.1, 0.2, 0.3]
+    for spec in ['unknown', 'sma_cross:period=5', 'sma_cross:fast=10:5:1', 'rsi_reversion:lower=0']:
+        with pytest.raises(ValueError):
+            parse_sweep_spec(spec)
+
+
+def test_backtest_cli_runs_symbols_in_parallel(tmp_path):
+    histories = {'9501.T': make_ohlcv(300), '9502.T': make_ohlcv(300, seed=1)}
+    for symbol, df in histories.items():
+        CsvStorage(tmp_path / 'price').write(symbol, df.assign(symbol=symbol))
+
+    subprocess.run([sys.executable, str(SCRIPTS_DIR / 'backtest.py'), '--symbols', '9501.T,9502.T',
+                    '--input', str(tmp_path / 'price'), '--jobs', '2', '--output', str(tmp_path / 'backtest.csv'),
+                    '--sweep', 'sma_cross:fast=5/10,slow=25/50;macd_cross:fast=12,slow=26,signal=9;buy_and_hold',
+                    '--run-report', str(tmp_path / 'run_report.json')],
+                   check=True, capture_output=True)
+
+    table = pd.read_csv(tmp_path / 'backtest.csv')
+    assert table.groupby('symbol')['strategy'].value_counts().to_dict() == {
+        (symbol, strategy): count for symbol in ['9501.T', '9502.T']
+        for strategy, count in [('sma_cross', 4), ('macd_cross', 1), ('buy_and_hold', 1)]}
+    hold = table[table['strategy'] == 'buy_and_hold'].set_index('symbol')
+    for symbol, df in histories.items():
+        close = df['Close']
+        assert hold.loc[symbol, 'total_return'] == pytest.approx((close.iloc[-1] / close.iloc[0]) * (1 - 0.001) - 1)
@@ -0,0 +1,42 @@
+"""
+bench_pipeline.py のユニットテスト
+"""
+
+import pandas as pd
+
+from bench_pipeline import compare_with_baseline, make_ohlcv, parse_sizes, pipeline_cases
+from storage import CsvStorage
+
+
+def test_intraday_frames_cover_trading_sessions():
+    df = make_ohlcv(3, interval='5min')
+    times = pd.to_datetime(df['Date'])
+    assert len(df) == 3 * 66
+    assert times.dt.strftime('%H:%M').iloc[[0, 29, 30, -1]].tolist() == ['09:00', '11:25', '12:30', '15:25']
+    assert (df['High'] >= df[['Open', 'Close']].max(axis=1)).all()
+    assert (df['Low'] <= df[['Open', 'Close']].min(axis=1)).all()
+
+
+def test_fetch_cases_merge_stubbed_downloads(tmp_path):
+    cases = {case.name: case for case in pipeline_cases(tmp_path, 2, 0.2)}
+    assert list(cases) == ['load', 'load_compact', 'build', 'validate', 'fetch_append', 'fetch_merge']
+
+    for name in ('fetch_append', 'fetch_merge'):
+        cases[name].setup()
+        cases[name].run()
+        stored = CsvStorage(tmp_path / 'price').read('1000.T')
+        source = CsvStorage(tmp_path / 'source').read('1000.T')
+        assert len(stored) == len(source) + 5
+        revised = stored['Volume'].iloc[len(source) - 1] - source['Volume'].iloc[-1]
+        assert revised == (100 if name == 'fetch_merge' else 0)
+
+
+def test_compare_with_baseline_flags_slowdowns_and_memory_growth():
+    baseline = {'build/10x5y/daily': {'rows_per_second': 1000.0, 'peak_mb': 10.0}}
+    assert parse_sizes('10x5, 100x0.5') == [(10, 5.0), (100, 0.5)]
+    assert compare_with_baseline({'build/10x5y/daily': {'rows_per_second': 800.0, 'peak_mb': 12.0}},
+                                 baseline, 0.25) == []
+    assert compare_with_baseline({'build/10x5y/daily': {'rows_per_second': 700.0, 'peak_mb': 13.0},
+                                  'build/1x1y/daily': {'rows_per_second': 1.0, 'peak_mb': 1.0}},
+                                 baseline, 0.25) == [('build/10x5y/daily', 'rows_per_second', 1000.0, 700.0),
+                                                     ('build/10x5y/daily', 'peak_mb', 10.0, 13.0)]
@@ -0,0 +1,170 @@
+"""
+build_indicators.py のユニットテスト
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from build_indicators import (COMBINED_COLUMNS, INDICATOR_OUTPUTS, is_up_to_date, load_indicator_state,
+                              multires_names, process_symbol, process_symbols, process_symbols_panel, state_path)
+from conftest import SCRIPTS_DIR, make_ohlcv
+from storage import CsvStorage
+
+
+def _write_prices(directory, df):
+    CsvStorage(directory).write('9501.T', df.assign(symbol='9501.T'))
+
+
+def _read_outputs(directory):
+    store = CsvStorage(directory)
+    return {indicator: store.read(f"9501.T_{indicator}") for indicator in INDICATOR_OUTPUTS}
+
+
+def test_chunked_build_matches_full_recompute(tmp_path):
+    _write_prices(tmp_path / 'price', make_ohlcv(1500))
+    assert process_symbol('9501.T', tmp_path / 'price', tmp_path / 'full', multires='all')
+    assert process_symbol('9501.T', tmp_path / 'price', tmp_path / 'chunk', multires='all', chunk_rows=200)
+
+    chunked, full = _read_outputs(tmp_path / 'chunk'), _read_outputs(tmp_path / 'full')
+    for indicator, cols in INDICATOR_OUTPUTS.items():
+        assert chunked[indicator]['date'].equals(full[indicator]['date'])
+        for col in cols[1:]:
+            np.testing.assert_allclose(chunked[indicator][col], full[indicator][col], rtol=1e-10, equal_nan=True)
+    for name in multires_names('9501.T', 'all'):
+        pd.testing.assert_frame_equal(CsvStorage(tmp_path / 'chunk').read(name), CsvStorage(tmp_path / 'full').read(name),
+                                      rtol=1e-10)
+    chunk_state = load_indicator_state(state_path(tmp_path / 'chunk', '9501.T'))
+    full_state = load_indicator_state(state_path(tmp_path / 'full', '9501.T'))
+    chunk_snapshot, full_snapshot = pd.DataFrame(chunk_state.pop('snapshot')), pd.DataFrame(full_state.pop('snapshot'))
+    assert chunk_state == full_state
+    pd.testing.assert_frame_equal(chunk_snapshot, full_snapshot, rtol=1e-10)
+
+
+def test_incremental_build_matches_full_recompute(tmp_path):
+    history = make_ohlcv(300)
+    _write_prices(tmp_path / 'price', history.iloc[:290])
+    assert process_symbol('9501.T', tmp_path / 'price', tmp_path / 'inc')
+    for end in (293, 300):
+        _write_prices(tmp_path / 'price', history.iloc[:end])
+        assert process_symbol('9501.T', tmp_path / 'price', tmp_path / 'inc', incremental=True)
+    assert process_symbol('9501.T', tmp_path / 'price', tmp_path / 'full')
+
+    incremental, full = _read_outputs(tmp_path / 'inc'), _read_outputs(tmp_path / 'full')
+    for indicator, cols in INDICATOR_OUTPUTS.items():
+        assert incremental[indicator]['date'].equals(full[indicator]['date'])
+        for col in cols[1:]:
+            np.testing.assert_allclose(incremental[indicator][col], full[indicator][col], rtol=1e-10, equal_nan=True)
+
+
+def test_incremental_build_recomputes_when_history_is_revised(tmp_path):
+    history = make_ohlcv(120)
+    _write_prices(tmp_path / 'price', history.iloc[:110])
+    process_symbol('9501.T', tmp_path / 'price', tmp_path / 'inc')
+
+    revised = history.copy()
+    revised.loc[105, 'Close'] += 10
+    _write_prices(tmp_path / 'price', revised)
+    process_symbol('9501.T', tmp_path / 'price', tmp_path / 'inc', incremental=True)
+    process_symbol('9501.T', tmp_path / 'price', tmp_path / 'full')
+
+    incremental, full = _read_outputs(tmp_path / 'inc'), _read_outputs(tmp_path / 'full')
+    pd.testing.assert_frame_equal(incremental['sma'], full['sma'])
+    assert state_path(tmp_path / 'inc', '9501.T').exists()
+
+
+def test_combined_layout_matches_split_outputs(tmp_path):
+    history = make_ohlcv(120)
+    _write_prices(tmp_path / 'price', history.iloc[:110])
+    process_symbol('9501.T', tmp_path / 'price', tmp_path / 'out', layout='both')
+    _write_prices(tmp_path / 'price', history)
+    process_symbol('9501.T', tmp_path / 'price', tmp_path / 'out', incremental=True, layout='both')
+
+    combined = CsvStorage(tmp_path / 'out').read('9501.T_indicators')
+    assert list(combined.columns) == COMBINED_COLUMNS
+    for indicator, frame in _read_outputs(tmp_path / 'out').items():
+        pd.testing.assert_frame_equal(combined[INDICATOR_OUTPUTS[indicator]], frame)
+
+
+def test_panel_engine_matches_per_symbol_loop(tmp_path):
+    price = CsvStorage(tmp_path / 'price')
+    symbols = ['9501.T', '9502.T', '9503.T', '9504.T']
+    price.write('9501.T', make_ohlcv(200, seed=1))
+    price.write('9502.T', make_ohlcv(150, start='2020-03-02', seed=2))
+    price.write('9503.T', make_ohlcv(200, seed=3).drop(index=[100, 101]))
+    price.write('9504.T', make_ohlcv(180, seed=4))
+
+    results = process_symbols_panel(symbols, tmp_path / 'price', tmp_path / 'panel')
+    for symbol in symbols:
+        process_symbol(symbol, tmp_path / 'price', tmp_path / 'loop')
+
+    assert all(results.values())
+    panel, loop = CsvStorage(tmp_path / 'panel'), CsvStorage(tmp_path / 'loop')
+    for symbol in symbols:
+        for indicator, cols in INDICATOR_OUTPUTS.items():
+            expected = loop.read(f"{symbol}_{indicator}")
+            actual = panel.read(f"{symbol}_{indicator}")
+            assert actual['date'].equals(expected['date'])
+            for col in cols[1:]:
+                np.testing.assert_allclose(actual[col], expected[col], rtol=1e-10, equal_nan=True)
+
+
+def test_panel_engine_multires_outputs_match_per_symbol_loop(tmp_path):
+    price = CsvStorage(tmp_path / 'price')
+    symbols = ['9501.T', '9502.T', '9503.T']
+    price.write('9501.T', make_ohlcv(400, seed=1))
+    price.write('9502.T', make_ohlcv(300, start='2020-03-02', seed=2))
+    price.write('9503.T', make_ohlcv(400, seed=3).drop(index=[100, 101]))
+
+    results = process_symbols_panel(symbols, tmp_path / 'price', tmp_path / 'panel', multires='all')
+    for symbol in symbols:
+        process_symbol(symbol, tmp_path / 'price', tmp_path / 'loop', multires='all')
+
+    assert all(results.values())
+    panel, loop = CsvStorage(tmp_path / 'panel'), CsvStorage(tmp_path / 'loop')
+    for symbol in symbols:
+        for name in multires_names(symbol, 'all'):
+            pd.testing.assert_frame_equal(panel.read(name), loop.read(name), check_exact=False, rtol=1e-10)
+
+
+def test_panel_engine_rejects_incremental_mode(tmp_path):
+    _write_prices(tmp_path / 'price', make_ohlcv(60))
+    result = subprocess.run([sys.executable, str(SCRIPTS_DIR / 'build_indicators.py'), '--symbols', '9501.T',
+                             '--input', str(tmp_path / 'price'), '--output', str(tmp_path / 'ind'),
+                             '--run-report', str(tmp_path / 'run_report.json'), '--engine', 'panel', '--incremental'],
+                            capture_output=True, text=True)
+
+    assert result.returncode == 2 and '--incremental' in result.stderr
+    assert not (tmp_path / 'ind').exists()
+
+
+def test_process_symbols_isolates_failures_across_jobs(tmp_path):
+    price = CsvStorage(tmp_path / 'price')
+    price.write('9501.T', make_ohlcv(100, seed=1))
+    price.write('9502.T', make_ohlcv(100, seed=2))
+    (tmp_path / 'price' / '9503.T.csv').write_text('# schema_version: 1.0\nDate,Close\nnot-a-date,1\n')
+
+    results = process_symbols(['9501.T', '9502.T', '9503.T', '9504.T'], tmp_path / 'price', tmp_path / 'out', jobs=2)
+
+    assert results == {'9501.T': True, '9502.T': True, '9503.T': False, '9504.T': False}
+    assert CsvStorage(tmp_path / 'out').exists('9502.T_macd')
+
+
+def test_is_up_to_date_requires_newer_outputs_and_same_indicators(tmp_path):
+    history = make_ohlcv(60)
+    _write_prices(tmp_path / 'price', history)
+    assert not is_up_to_date('9501.T', tmp_path / 'price', tmp_path / 'ind')
+
+    process_symbol('9501.T', tmp_path / 'price', tmp_path / 'ind')
+    assert is_up_to_date('9501.T', tmp_path / 'price', tmp_path / 'ind')
+    assert not is_up_to_date('9501.T', tmp_path / 'price', tmp_path / 'ind', layout='both')
+    assert not is_up_to_date('9501.T', tmp_path / 'price', tmp_path / 'ind', indicators={'sma': [(5,)]})
+
+    # 株価データが出力より新しい場合は再計算が必要
+    price_path = CsvStorage(tmp_path / 'price').path('9501.T')
+    stat = price_path.stat()
+    os.utime(price_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert not is_up_to_date('9501.T', tmp_path / 'price', tmp_path / 'ind')
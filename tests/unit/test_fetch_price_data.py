@@ -0,0 +1,236 @@
+"""
+fetch_price_data.py のユニットテスト（ローカルStooq代替サーバーを使用）
+"""
+
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from conftest import make_ohlcv
+from fetch_cache import ResponseCache
+from fetch_price_data import HostRateLimiter, fetch_all
+from storage import read_stored_rows_since, write_csv_atomic
+
+
+def test_fetch_all_parallel_writes_every_symbol(stooq_server, tmp_path):
+    symbols = [f"{9500 + i}.T" for i in range(8)]
+    for i, symbol in enumerate(symbols):
+        stooq_server.frames[symbol.replace('.T', '.JP')] = make_ohlcv(60, seed=i)
+
+    results = fetch_all(symbols, '2020-01-01', '2020-12-31', tmp_path, incremental=False,
+                        workers=4, base_url=stooq_server.url)
+
+    assert list(results) == symbols
+    assert all(results.values())
+    for symbol in symbols:
+        df = pd.read_csv(tmp_path / f"{symbol}.csv", comment='#')
+        assert len(df) == 60
+        assert (df['symbol'] == symbol).all()
+
+
+def test_fetch_all_retries_transient_errors_and_reports_failures(stooq_server, tmp_path):
+    stooq_server.frames['9501.JP'] = make_ohlcv(20)
+    stooq_server.failures['9501.JP'] = 2
+    stooq_server.failures['9502.JP'] = 100
+
+    results = fetch_all(['9501.T', '9502.T'], '2020-01-01', '2020-12-31', tmp_path, incremental=False,
+                        workers=2, base_url=stooq_server.url, retries=2, backoff=0.01)
+
+    assert results == {'9501.T': True, '9502.T': False}
+    assert (tmp_path / '9501.T.csv').exists()
+    assert not (tmp_path / '9502.T.csv').exists()
+    assert sum(1 for r in stooq_server.requests if r['s'] == '9502.JP') == 3
+
+
+def test_host_rate_limiter_spaces_requests_per_host(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr('fetch_price_data.time.sleep', sleeps.append)
+    limiter = HostRateLimiter(min_interval=1.0)
+
+    for _ in range(3):
+        limiter.wait('https://stooq.com/q/d/l/')
+    limiter.wait('http://127.0.0.1:8000/q/d/l/')
+
+    assert len(sleeps) == 2
+    assert sleeps[0] > 0.9 and sleeps[1] > 1.9
+
+
+def test_incremental_fetch_requests_only_missing_window(stooq_server, tmp_path):
+    history = make_ohlcv(40)
+    stooq_server.frames['9501.JP'] = history.iloc[:30]
+    fetch_all(['9501.T'], '2019-01-01', '2020-12-31', tmp_path, incremental=False, base_url=stooq_server.url)
+
+    revised = history.copy()
+    revised.loc[29, 'Close'] = revised.loc[29, 'Close'] + 1
+    stooq_server.frames['9501.JP'] = revised
+    stooq_server.requests.clear()
+    results = fetch_all(['9501.T'], '2019-01-01', '2020-12-31', tmp_path, incremental=True,
+                        base_url=stooq_server.url, overlap_days=3)
+
+    assert results == {'9501.T': True}
+    last_stored = pd.Timestamp(history.loc[29, 'Date'])
+    assert stooq_server.requests[0]['d1'] == (last_stored - pd.Timedelta(days=3)).strftime('%Y%m%d')
+    df = pd.read_csv(tmp_path / '9501.T.csv', comment='#')
+    assert df['Date'].tolist() == history['Date'].tolist()
+    assert df.loc[29, 'Close'] == revised.loc[29, 'Close']
+
+
+def test_incremental_fetch_skips_request_when_up_to_date(stooq_server, tmp_path):
+    history = make_ohlcv(10)
+    stooq_server.frames['9501.JP'] = history
+    fetch_all(['9501.T'], '2019-01-01', '2020-12-31', tmp_path, incremental=False, base_url=stooq_server.url)
+    stooq_server.requests.clear()
+
+    results = fetch_all(['9501.T'], '2019-01-01', history['Date'].iloc[-1], tmp_path,
+                        incremental=True, base_url=stooq_server.url)
+
+    assert results == {'9501.T': True}
+    assert stooq_server.requests == []
+
+
+def test_incremental_fetch_appends_without_rewriting_history(stooq_server, tmp_path):
+    history = make_ohlcv(40)
+    stooq_server.frames['9501.JP'] = history.iloc[:30]
+    fetch_all(['9501.T'], '2019-01-01', '2020-12-31', tmp_path, incremental=False, base_url=stooq_server.url)
+    before = (tmp_path / '9501.T.csv').read_bytes()
+
+    stooq_server.frames['9501.JP'] = history
+    fetch_all(['9501.T'], '2019-01-01', '2020-12-31', tmp_path, incremental=True, base_url=stooq_server.url)
+
+    after = (tmp_path / '9501.T.csv').read_bytes()
+    assert after.startswith(before)
+    df = pd.read_csv(tmp_path / '9501.T.csv', comment='#')
+    assert df['Date'].tolist() == history['Date'].tolist()
+
+
+@pytest.mark.parametrize('chunk_rows', [None, 8])
+def test_incremental_fetch_merges_backdated_rows(stooq_server, tmp_path, chunk_rows):
+    history = make_ohlcv(40)
+    stooq_server.frames['9501.JP'] = history.iloc[:38].drop(index=[35])
+    fetch_all(['9501.T'], '2019-01-01', '2020-12-31', tmp_path, incremental=False, base_url=stooq_server.url)
+
+    stooq_server.frames['9501.JP'] = history
+    fetch_all(['9501.T'], '2019-01-01', '2020-12-31', tmp_path, incremental=True,
+              base_url=stooq_server.url, overlap_days=7, chunk_rows=chunk_rows)
+
+    df = pd.read_csv(tmp_path / '9501.T.csv', comment='#')
+    assert df['Date'].tolist() == history['Date'].tolist()
+    assert list(tmp_path.glob('*.tmp')) == []
+
+
+def test_read_stored_rows_since_reads_only_tail(tmp_path):
+    history = make_ohlcv(50)
+    history['symbol'] = '9501.T'
+    path = tmp_path / '9501.T.csv'
+    write_csv_atomic(history, path)
+
+    tail = read_stored_rows_since(path, history['Date'].iloc[45], block_size=64)
+
+    assert tail['Date'].dt.strftime('%Y-%m-%d').tolist() == history['Date'].iloc[45:].tolist()
+    assert tail['Close'].tolist() == history['Close'].iloc[45:].tolist()
+
+
+def test_binary_format_keeps_csv_export_in_sync(stooq_server, tmp_path):
+    pytest.importorskip('pyarrow')
+    history = make_ohlcv(40)
+    stooq_server.frames['9501.JP'] = history.iloc[:30]
+    fetch_all(['9501.T'], '2019-01-01', '2020-12-31', tmp_path, incremental=True,
+              base_url=stooq_server.url, fmt='parquet')
+    stooq_server.frames['9501.JP'] = history
+    fetch_all(['9501.T'], '2019-01-01', '2020-12-31', tmp_path, incremental=True,
+              base_url=stooq_server.url, fmt='parquet')
+
+    parquet_df = pd.read_parquet(tmp_path / '9501.T.parquet')
+    csv_df = pd.read_csv(tmp_path / '9501.T.csv', comment='#')
+    assert parquet_df['Date'].dt.strftime('%Y-%m-%d').tolist() == history['Date'].tolist()
+    assert csv_df['Date'].tolist() == history['Date'].tolist()
+    assert csv_df['Close'].tolist() == parquet_df['Close'].tolist()
+
+
+def test_fetch_records_changed_symbols_and_row_ranges(stooq_server, tmp_path):
+    history = make_ohlcv(40)
+    stooq_server.frames['9501.JP'] = history.iloc[:30]
+    stooq_server.frames['9502.JP'] = make_ohlcv(30, seed=1)
+    fetch_all(['9501.T', '9502.T'], '2019-01-01', '2020-12-31', tmp_path, incremental=False,
+              base_url=stooq_server.url)
+
+    revised = history.copy()
+    revised.loc[28, 'Close'] += 1
+    stooq_server.frames['9501.JP'] = revised
+    changes = {}
+    fetch_all(['9501.T', '9502.T', '9503.T'], '2019-01-01', '2020-12-31', tmp_path, incremental=True,
+              base_url=stooq_server.url, overlap_days=7, changes=changes)
+
+    assert changes['9501.T'] == {'status': 'updated', 'new_rows': 10, 'revised_rows': 1,
+                                 'first_date': history['Date'][28], 'last_date': history['Date'][39]}
+    assert changes['9502.T'] == {'status': 'unchanged'}
+    assert changes['9503.T'] == {'status': 'failed'}
+
+
+def test_cache_serves_reruns_and_offline_replay(stooq_server, tmp_path):
+    stooq_server.frames['9501.JP'] = make_ohlcv(40)
+    cache = ResponseCache(tmp_path / 'cache')
+
+    def fetch(output, **kwargs):
+        return fetch_all(['9501.T', '9502.T'], '2019-01-01', '2020-12-31', tmp_path / output, incremental=False,
+                         base_url=stooq_server.url, cache=cache, **kwargs)
+
+    assert fetch('first') == {'9501.T': True, '9502.T': False}
+    assert fetch('rerun') == {'9501.T': True, '9502.T': False}
+    assert [r['s'] for r in stooq_server.requests] == ['9501.JP', '9502.JP', '9502.JP']
+    assert (tmp_path / 'rerun' / '9501.T.csv').read_bytes() == (tmp_path / 'first' / '9501.T.csv').read_bytes()
+
+    # オフラインでは期間を含むキャッシュを絞り込んで使用し、ない場合はダウンロードせず失敗
+    cache.offline = True
+    results = fetch_all(['9501.T', '9502.T'], '2020-02-03', '2020-02-14', tmp_path / 'offline',
+                        incremental=False, base_url=stooq_server.url, cache=cache)
+    assert results == {'9501.T': True, '9502.T': False}
+    assert len(stooq_server.requests) == 3
+    offline = pd.read_csv(tmp_path / 'offline' / '9501.T.csv', comment='#')
+    assert offline['Date'].tolist() == pd.bdate_range('2020-02-03', '2020-02-14').strftime('%Y-%m-%d').tolist()
+
+
+def test_cache_expires_and_evicts_oldest_entries(tmp_path):
+    url = 'http://127.0.0.1/q/d/l/'
+    history = make_ohlcv(200)
+    frame = history.assign(Date=pd.to_datetime(history['Date'])).set_index('Date')
+    cache = ResponseCache(tmp_path, ttl_hours=1)
+    cache.put(url, '9501.JP', '2020-01-01', '2020-12-31', frame)
+    path = cache.entry_path(url, '9501.JP', '2020-01-01', '2020-12-31')
+    pd.testing.assert_frame_equal(cache.get(url, '9501.JP', '2020-01-01', '2020-12-31'), frame, check_freq=False)
+
+    stale = time.time() - 2 * 3600
+    os.utime(path, (stale, stale))
+    assert cache.get(url, '9501.JP', '2020-01-01', '2020-12-31') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # 上限を超えると期限切れの項目から削除
+    cache.max_bytes = path.stat().st_size * 2
+    cache.put(url, '9502.JP', '2020-01-01', '2020-12-31', frame)
+    cache.put(url, '9503.JP', '2020-01-01', '2020-12-31', frame)
+    assert not path.exists()
+    assert cache.get(url, '9502.JP', '2020-01-01', '2020-12-31') is not None
+
+
+def test_cache_scans_directory_once(tmp_path, monkeypatch):
+    url = 'http://127.0.0.1/q/d/l/'
+    history = make_ohlcv(50)
+    frame = history.assign(Date=pd.to_datetime(history['Date'])).set_index('Date')
+    ResponseCache(tmp_path).put(url, '9500.JP', '2020-01-01', '2020-12-31', frame)
+    size = ResponseCache(tmp_path).entry_path(url, '9500.JP', '2020-01-01', '2020-12-31').stat().st_size
+
+    scans = []
+    glob = Path.glob
+    monkeypatch.setattr(Path, 'glob', lambda self, pattern: scans.append(pattern) or glob(self, pattern))
+    cache = ResponseCache(tmp_path, max_mb=size * 3 / (1024 * 1024))
+    for code in range(9501, 9511):
+        assert cache.get(url, f"{code}.JP", '2020-02-01', '2020-06-30') is None
+        cache.put(url, f"{code}.JP", '2020-01-01', '2020-12-31', frame)
+        assert len(cache.get(url, f"{code}.JP", '2020-02-03', '2020-02-14')) == 10
+
+    # 保存済みの項目を含めて古い順に削除し、キャッシュディレクトリの走査は初回のみ（取得時も走査しない）
+    assert scans == ['*/*.csv']
+    assert sorted(path.name[:7] for path in tmp_path.glob('*/*.csv')) == ['9508.JP', '9509.JP', '9510.JP']
@@ -0,0 +1,58 @@
+"""
+indicator_registry.py のユニットテスト
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from build_indicators import (build_indicator_state, calculate_bollinger_bands, calculate_macd, calculate_rsi,
+                              calculate_sma, compute_indicators, extend_indicators)
+from conftest import make_ohlcv
+from indicator_registry import (IndicatorGraph, compute_indicator_columns, format_indicator_spec, indicator_outputs,
+                                parse_indicator_spec)
+
+
+def _prices(n_rows):
+    df = make_ohlcv(n_rows)
+    return pd.DataFrame({'date': pd.to_datetime(df['Date']), 'close': df['Close']})
+
+
+def test_default_indicators_match_calculate_functions():
+    expected = calculate_bollinger_bands(calculate_macd(calculate_rsi(calculate_sma(_prices(200)))))
+    actual = compute_indicators(_prices(200))
+    pd.testing.assert_frame_equal(actual[expected.columns], expected)
+
+
+def test_graph_shares_intermediate_results():
+    graph = IndicatorGraph(_prices(100)['close'])
+    columns = compute_indicator_columns(graph, parse_indicator_spec('sma:20;bb:20/2,20/3;macd:12/26/9,12/26/5'))
+
+    assert [key for key in graph.nodes if key.startswith(('mean(', 'std('))] == ['mean(close,20)', 'std(close,20)']
+    assert sorted(key for key in graph.nodes if key.startswith('ema(close')) == ['ema(close,12)', 'ema(close,26)']
+    assert columns['sma_20'] is columns['bb_middle']
+    np.testing.assert_allclose(columns['bb_20_3_upper'] - columns['bb_middle'],
+                               (columns['bb_upper'] - columns['bb_middle']) * 1.5)
+
+
+def test_indicator_spec_parsing():
+    indicators = parse_indicator_spec('sma:5,25; rsi ; bb:20/2.5')
+    assert indicators == {'sma': [(5,), (25,)], 'rsi': [(14,)], 'bb': [(20, 2.5)]}
+    assert format_indicator_spec(indicators) == 'sma:5,25;rsi:14;bb:20/2.5'
+    assert indicator_outputs(indicators)['bb'] == ['date', 'bb_20_2.5_upper', 'bb_20_2.5_middle', 'bb_20_2.5_lower']
+
+    for spec in ('foo:3', 'macd:12/26', 'sma:0', 'sma:2.5', ''):
+        with pytest.raises(ValueError):
+            parse_indicator_spec(spec)
+
+
+def test_extend_indicators_matches_full_recompute_for_custom_spec():
+    indicators = parse_indicator_spec('sma:10,30;rsi:9;macd:5/35/5;bb:15/2.5')
+    prices = _prices(150)
+    full = compute_indicators(prices.copy(), indicators=indicators)
+
+    state = build_indicator_state(compute_indicators(prices.iloc[:120].copy(), indicators=indicators), indicators)
+    tail, _ = extend_indicators(state, prices.iloc[120:].reset_index(drop=True), indicators)
+
+    for col in full.columns.drop(['date', 'close']):
+        np.testing.assert_allclose(tail[col], full[col].iloc[120:], rtol=1e-10, equal_nan=True)
@@ -0,0 +1,69 @@
+"""
+instrumentation.py のユニットテスト
+"""
+
+import json
+import pstats
+import subprocess
+import sys
+
+import instrumentation
+from build_indicators import process_symbols
+from conftest import SCRIPTS_DIR, make_ohlcv
+from storage import CsvStorage
+
+
+def test_stages_accumulate_time_calls_and_rows():
+    recorder = instrumentation.Instrumentation(stages=['read', 'write'])
+    for rows in (100, 200):
+        with recorder.stage('read') as measurement:
+            measurement.rows = rows
+    recorder.merge({'read': [1.0, 3, 700], 'compute': [0.5, 1, 0]})
+
+    report = recorder.report()
+    assert report['stages']['read']['calls'] == 5
+    assert report['stages']['read']['rows'] == 1000
+    assert report['stages']['read']['rows_per_second'] > 0
+    assert report['stages']['write'] == {'seconds': 0.0, 'calls': 0}
+    assert 'rows' not in report['stages']['compute']
+    assert set(report['memory']) >= {'peak_rss_mb'}
+
+
+def test_write_run_report_keeps_other_scripts(tmp_path):
+    path = tmp_path / 'run_report.json'
+    instrumentation.write_run_report(path, 'fetch_price_data', instrumentation.Instrumentation(), symbols=2)
+    instrumentation.write_run_report(path, 'build_indicators', instrumentation.Instrumentation(), symbols=3)
+
+    runs = json.loads(path.read_text(encoding='utf-8'))['runs']
+    assert runs['fetch_price_data']['symbols'] == 2
+    assert runs['build_indicators']['symbols'] == 3
+
+
+def test_parallel_build_merges_worker_metrics(tmp_path):
+    price = CsvStorage(tmp_path / 'price')
+    symbols = ['9501.T', '9502.T', '9503.T']
+    for i, symbol in enumerate(symbols):
+        price.write(symbol, make_ohlcv(80, seed=i))
+
+    recorder = instrumentation.reset()
+    try:
+        process_symbols(symbols, tmp_path / 'price', tmp_path / 'ind', jobs=2)
+        stages = recorder.report()['stages']
+    finally:
+        instrumentation.reset()
+    assert stages['build.read']['calls'] == 3
+    assert stages['build.compute']['rows'] == 240
+
+
+def test_profile_flag_dumps_cprofile_stats(tmp_path):
+    CsvStorage(tmp_path / 'price').write('9501.T', make_ohlcv(80))
+    subprocess.run([sys.executable, str(SCRIPTS_DIR / 'build_indicators.py'), '--symbols', '9501.T',
+                    '--input', str(tmp_path / 'price'), '--output', str(tmp_path / 'ind'),
+                    '--run-report', str(tmp_path / 'run_report.json'), '--profile', str(tmp_path / 'build.prof')],
+                   check=True, capture_output=True)
+
+    stats = pstats.Stats(str(tmp_path / 'build.prof'))
+    assert any(name == 'compute_indicators' for _, _, name in stats.stats)
+    run = json.loads((tmp_path / 'run_report.json').read_text(encoding='utf-8'))['runs']['build_indicators']
+    assert run['stages']['build.write']['rows'] == 80
+    assert run['memory']['traced_peak_mb'] > 0
@@ -0,0 +1,95 @@
+"""
+kernels.py のユニットテスト（pandas 実装との一致）
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import kernels
+from build_indicators import build_indicator_state, calculate_macd, calculate_rsi, compute_indicators, extend_indicators
+from indicator_registry import parse_indicator_spec
+
+BACKENDS = kernels.BACKENDS
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    if request.param not in kernels.available_backends():
+        pytest.skip(f"{request.param} がインストールされていません")
+    return request.param
+
+
+def _closes(n_rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    closes = np.round(1000 * np.exp(np.cumsum(rng.normal(0, 0.015, n_rows))), 1)
+    # 値動きのない期間（下落幅・上昇幅の移動平均が0になる窓）を含める
+    flat = n_rows // 4
+    closes[flat:flat + 30] = closes[flat - 1]
+    return closes
+
+
+def _wilder_reference(closes, window):
+    """Wilder平滑化RSIの素朴な実装"""
+    delta = np.diff(closes)
+    gains, losses = np.maximum(delta, 0), np.maximum(-delta, 0)
+    result = np.full(len(closes), np.nan)
+    avg_gain, avg_loss = gains[:window].mean(), losses[:window].mean()
+    for i in range(window, len(closes)):
+        if i > window:
+            avg_gain = (avg_gain * (window - 1) + gains[i - 1]) / window
+            avg_loss = (avg_loss * (window - 1) + losses[i - 1]) / window
+        result[i] = 100 - 100 / (1 + avg_gain / avg_loss) if avg_loss else 100.0
+    return result
+
+
+def test_ema_and_rolling_mean_match_pandas(backend):
+    closes = pd.Series(_closes())
+    for span in (5, 12, 26, 200):
+        np.testing.assert_allclose(kernels.ema(closes, span=span, backend=backend),
+                                   closes.ewm(span=span, adjust=False).mean(), rtol=1e-12)
+    for window in (5, 20, 75):
+        np.testing.assert_allclose(kernels.rolling_mean(closes, window, backend=backend),
+                                   closes.rolling(window=window).mean(), rtol=1e-12)
+
+
+def test_rsi_matches_calculate_rsi(backend):
+    closes = _closes()
+    expected = calculate_rsi(pd.DataFrame({'close': closes}))['rsi']
+    np.testing.assert_allclose(kernels.rsi(closes, backend=backend), expected, rtol=1e-10, atol=1e-9)
+
+
+def test_wilder_rsi_matches_reference(backend):
+    closes = _closes()
+    np.testing.assert_allclose(kernels.rsi(closes, method='wilder', backend=backend),
+                               _wilder_reference(closes, 14), rtol=1e-10, atol=1e-9)
+
+
+def test_macd_matches_calculate_macd(backend):
+    closes = _closes()
+    expected = calculate_macd(pd.DataFrame({'close': closes}))
+    for actual, col in zip(kernels.macd(closes, backend=backend), ['macd', 'macd_signal', 'macd_hist']):
+        np.testing.assert_allclose(actual, expected[col], rtol=1e-9, atol=1e-9)
+
+
+def test_kernels_skip_leading_and_trailing_nan(backend):
+    closes = _closes(300)
+    padded = np.concatenate([[np.nan] * 10, closes, [np.nan] * 5])
+    np.testing.assert_allclose(kernels.rsi(padded, backend=backend)[10:-5], kernels.rsi(closes, backend=backend))
+    assert np.isnan(kernels.ema(padded, span=12, backend=backend)[:10]).all()
+
+    padded[100] = np.nan
+    with pytest.raises(ValueError):
+        kernels.ema(padded, span=12, backend=backend)
+
+
+def test_wilder_rsi_indicator_supports_incremental_extension():
+    indicators = parse_indicator_spec('wilder_rsi:14')
+    closes = _closes(200)
+    prices = pd.DataFrame({'date': pd.bdate_range('2020-01-06', periods=200), 'close': closes})
+    full = compute_indicators(prices.copy(), indicators=indicators)
+    np.testing.assert_allclose(full['wilder_rsi_14'], _wilder_reference(closes, 14), rtol=1e-10, atol=1e-9)
+
+    state = build_indicator_state(compute_indicators(prices.iloc[:150].copy(), indicators=indicators), indicators)
+    tail, _ = extend_indicators(state, prices.iloc[150:].reset_index(drop=True), indicators)
+    np.testing.assert_allclose(tail['wilder_rsi_14'], full['wilder_rsi_14'].iloc[150:], rtol=1e-10)
@@ -0,0 +1,119 @@
+"""
+pipeline.py のユニットテスト（ローカルStooq代替サーバーを使用）
+"""
+
+import json
+
+import pandas as pd
+
+from build_indicators import process_symbol
+from conftest import make_ohlcv
+from fetch_price_data import fetch_all
+from pipeline import STAGES, run_pipeline, stage_timer
+from storage import CsvStorage
+from validate_data import load_previous_results, validate_file
+
+
+def _files(directory):
+    return {path.relative_to(directory).as_posix(): path.read_bytes()
+            for path in sorted(directory.rglob('*')) if path.is_file()}
+
+
+def test_pipeline_matches_separate_scripts(stooq_server, tmp_path):
+    history = make_ohlcv(120)
+    stooq_server.frames['9501.JP'] = history.iloc[:100]
+    stooq_server.frames['9502.JP'] = make_ohlcv(100, seed=1)
+    symbols = ['9501.T', '9502.T']
+
+    def run_scripts(root):
+        fetch_all(symbols, '2019-01-01', '2020-12-31', root / 'price', base_url=stooq_server.url)
+        for symbol in symbols:
+            process_symbol(symbol, root / 'price', root / 'ind', layout='both')
+
+    def run_in_process(root, timer):
+        return run_pipeline(symbols, root / 'price', root / 'ind', '2019-01-01', '2020-12-31',
+                            layout='both', timer=timer, base_url=stooq_server.url)
+
+    timer = stage_timer()
+    run_scripts(tmp_path / 'scripts')
+    results = run_in_process(tmp_path / 'pipeline', timer)
+    assert _files(tmp_path / 'pipeline') == _files(tmp_path / 'scripts')
+    assert all(ok for ok, _ in results.values())
+    assert [(r['type'], r['valid']) for r in results['9501.T'][1]] == [
+        ('price', True), ('sma', True), ('rsi', True), ('macd', True), ('bb', True), ('indicators', True)]
+    assert set(timer.timings) == set(STAGES) and timer.timings['build'] > 0
+
+    # 増分取得（新規行の追加と重複期間の訂正）も同じ結果になる
+    revised = history.copy()
+    revised.loc[98, 'Close'] += 1
+    stooq_server.frames['9501.JP'] = revised
+    run_scripts(tmp_path / 'scripts')
+    run_in_process(tmp_path / 'pipeline', stage_timer())
+    assert _files(tmp_path / 'pipeline') == _files(tmp_path / 'scripts')
+
+
+def test_pipeline_reports_validation_errors_and_missing_data(stooq_server, tmp_path):
+    broken = make_ohlcv(60)
+    broken.loc[30, 'Volume'] = -1
+    stooq_server.frames['9501.JP'] = broken
+
+    results = run_pipeline(['9501.T', '9502.T'], tmp_path / 'price', tmp_path / 'ind', '2019-01-01', '2020-12-31',
+                           base_url=stooq_server.url)
+
+    ok, validation = results['9501.T']
+    assert ok and not validation[0]['valid']
+    assert [v['rule'] for v in validation[0]['violations']] == ['negative_volume']
+    assert validation[0]['file'] == str(tmp_path / 'price' / '9501.T.csv')
+    assert results['9502.T'] == (False, [])
+
+
+def test_pipeline_skips_unchanged_symbols_unless_forced(stooq_server, tmp_path):
+    stooq_server.frames['9501.JP'] = make_ohlcv(80)
+    report = tmp_path / 'report.json'
+
+    def run(**kwargs):
+        results = run_pipeline(['9501.T'], tmp_path / 'price', tmp_path / 'ind', '2019-01-01', '2020-12-31',
+                               base_url=stooq_server.url, report=report, previous=load_previous_results(report),
+                               **kwargs)
+        report.write_text(json.dumps({'results': results['9501.T'][1]}))
+        return results['9501.T']
+
+    first = run()
+    written = {path: path.stat().st_mtime_ns for path in (tmp_path / 'ind').rglob('*') if path.is_file()}
+
+    timer = stage_timer()
+    assert run(timer=timer) == first
+    assert timer.timings['build'] == timer.timings['write'] == 0
+    assert {path: path.stat().st_mtime_ns for path in written} == written
+
+    run(force=True, timer=timer)
+    assert timer.timings['build'] > 0
+
+
+def test_pipeline_appends_new_rows_from_indicator_state(stooq_server, tmp_path):
+    history = make_ohlcv(160)
+    history.loc[150, 'Volume'] = -1
+    stooq_server.frames['9501.JP'] = history.iloc[:120]
+    report = tmp_path / 'report.json'
+
+    def run(timer):
+        results = run_pipeline(['9501.T'], tmp_path / 'price', tmp_path / 'ind', '2019-01-01', '2020-12-31',
+                               layout='both', multires='all', base_url=stooq_server.url, timer=timer,
+                               report=report, previous=load_previous_results(report))
+        report.write_text(json.dumps({'results': results['9501.T'][1]}))
+        return results['9501.T']
+
+    run(stage_timer())
+    stooq_server.frames['9501.JP'] = history
+    timer = stage_timer()
+    ok, validation = run(timer)
+
+    # 新規行のみ計算・検証し、全期間を計算し直した場合と同じ出力・検証結果になる
+    assert ok and timer.snapshot()['validate'][2] == 40
+    process_symbol('9501.T', tmp_path / 'price', tmp_path / 'full', layout='both', multires='all')
+    assert _files(tmp_path / 'ind').keys() == _files(tmp_path / 'full').keys()
+    for name in CsvStorage(tmp_path / 'full').names():
+        pd.testing.assert_frame_equal(CsvStorage(tmp_path / 'ind').read(name), CsvStorage(tmp_path / 'full').read(name),
+                                      check_exact=False, rtol=1e-10)
+    assert validation == [validate_file(result['file'], result['type']) for result in validation]
+    assert [v['rule'] for v in validation[0]['violations']] == ['negative_volume']
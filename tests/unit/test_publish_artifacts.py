@@ -0,0 +1,62 @@
+"""
+publish_artifacts.py のユニットテスト
+"""
+
+import gzip
+
+import pytest
+
+import publish_artifacts
+from build_indicators import process_symbol
+from conftest import make_ohlcv
+from publish_artifacts import MANIFEST_NAME, load_manifest, publish
+from storage import CsvStorage
+
+
+def _build(root, symbol, df):
+    CsvStorage(root / 'price').write(symbol, df.assign(symbol=symbol))
+    assert process_symbol(symbol, root / 'price', root / 'ind', layout='both')
+
+
+def test_publish_writes_hashed_compressed_files_and_manifest(tmp_path):
+    _build(tmp_path, '9501.T', make_ohlcv(120))
+    _build(tmp_path, '9502.T', make_ohlcv(120, seed=1))
+
+    manifest, stats = publish(tmp_path / 'price', tmp_path / 'ind', tmp_path / 'out', compression=['gzip'])
+
+    assert load_manifest(tmp_path / 'out' / MANIFEST_NAME) == manifest
+    assert set(manifest['symbols']) == {'9501.T', '9502.T'}
+    entry = manifest['symbols']['9501.T']
+    assert set(entry) == {'price', 'indicators', 'sma', 'rsi', 'macd', 'bb'}
+    published = tmp_path / 'out' / entry['indicators']
+    original = (tmp_path / 'ind' / '9501.T_indicators.csv').read_bytes()
+    assert published.read_bytes() == original
+    assert gzip.decompress(published.with_name(published.name + '.gz').read_bytes()) == original
+    assert stats['written'] == 12 and stats['gzip'] < stats['bytes']
+
+
+def test_publish_reuses_unchanged_files_and_prunes_stale(tmp_path):
+    history = make_ohlcv(130)
+    _build(tmp_path, '9501.T', history.iloc[:120])
+    first, _ = publish(tmp_path / 'price', tmp_path / 'ind', tmp_path / 'out', compression=['gzip'])
+    stale = tmp_path / 'out' / first['symbols']['9501.T']['price']
+
+    CsvStorage(tmp_path / 'price').write('9501.T', history.assign(symbol='9501.T'))
+    second, stats = publish(tmp_path / 'price', tmp_path / 'ind', tmp_path / 'out', compression=['gzip'])
+
+    assert second['symbols']['9501.T']['price'] != first['symbols']['9501.T']['price']
+    assert second['symbols']['9501.T']['sma'] == first['symbols']['9501.T']['sma']
+    assert stats['written'] == 1 and stats['reused'] == 5
+    assert stats['removed'] == 2 and not stale.exists()
+
+
+def test_publish_skips_brotli_without_package(tmp_path, monkeypatch):
+    _build(tmp_path, '9501.T', make_ohlcv(60))
+    monkeypatch.setattr(publish_artifacts, 'HAS_BROTLI', False)
+
+    manifest, _ = publish(tmp_path / 'price', tmp_path / 'ind', tmp_path / 'out')
+
+    assert manifest['compression'] == ['gzip']
+    assert not list((tmp_path / 'out').rglob('*.br'))
+    with pytest.raises(ValueError):
+        publish(tmp_path / 'price', tmp_path / 'ind', tmp_path / 'out', compression=['zstd'])
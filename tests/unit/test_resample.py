@@ -0,0 +1,80 @@
+"""
+resample.py と複数解像度の出力（build_indicators.py --multires）のユニットテスト
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import build_indicators
+from build_indicators import multires_names, process_symbol
+from conftest import make_ohlcv
+from resample import downsample, lttb_indices, resample_ohlcv
+from storage import CsvStorage
+
+
+def _daily(n_rows, seed=0):
+    df = make_ohlcv(n_rows, seed=seed)
+    df.columns = df.columns.str.lower()
+    return df.assign(date=pd.to_datetime(df['date']))
+
+
+def test_resample_weekly_aggregates_ohlcv():
+    daily = _daily(10)  # 2020-01-06（月）～ 2020-01-17（金）の2週
+    weekly = resample_ohlcv(daily, 'W-FRI')
+
+    assert weekly['date'].dt.strftime('%Y-%m-%d').tolist() == ['2020-01-10', '2020-01-17']
+    first = daily.iloc[:5]
+    assert weekly.iloc[0][['open', 'high', 'low', 'close', 'volume']].tolist() == [
+        first['open'].iloc[0], first['high'].max(), first['low'].min(), first['close'].iloc[-1], first['volume'].sum()]
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    x = np.arange(1000)
+    y = np.sin(x / 50.0)
+    y[437] = 10.0
+    selected = lttb_indices(x, y, 50)
+
+    assert len(selected) == 50 and selected[0] == 0 and selected[-1] == 999
+    assert np.all(np.diff(selected) > 0)
+    assert 437 in selected
+    assert lttb_indices(x[:10], y[:10], 50).tolist() == list(range(10))
+    with pytest.raises(ValueError):
+        lttb_indices(x, y, 2)
+
+
+def test_downsample_limits_window_and_points():
+    daily = _daily(2000)
+    sampled = downsample(daily, years=3, points=120)
+
+    assert len(sampled) == 120
+    assert sampled['date'].iloc[-1] == daily['date'].iloc[-1]
+    assert sampled['date'].iloc[0] >= daily['date'].iloc[-1] - pd.DateOffset(years=3)
+
+
+@pytest.mark.parametrize('multires', ['downsample', 'all'])
+def test_multires_outputs_match_after_incremental_build(tmp_path, monkeypatch, multires):
+    history = make_ohlcv(1500)
+    price = CsvStorage(tmp_path / 'price')
+    price.write('9501.T', history.iloc[:1490].assign(symbol='9501.T'))
+    assert process_symbol('9501.T', tmp_path / 'price', tmp_path / 'inc', multires=multires)
+    price.write('9501.T', history.assign(symbol='9501.T'))
+
+    # 増分計算では株価データを直近の期間のみ読み込む
+    reads = []
+    load_price_frame = build_indicators.load_price_frame
+    monkeypatch.setattr(build_indicators, 'load_price_frame',
+                        lambda store, symbol, since=None: reads.append(since) or load_price_frame(store, symbol, since))
+    assert process_symbol('9501.T', tmp_path / 'price', tmp_path / 'inc', incremental=True, multires=multires)
+    assert reads and None not in reads
+    monkeypatch.undo()
+    assert process_symbol('9501.T', tmp_path / 'price', tmp_path / 'full', multires=multires)
+
+    incremental, full = CsvStorage(tmp_path / 'inc'), CsvStorage(tmp_path / 'full')
+    for name in multires_names('9501.T', multires):
+        pd.testing.assert_frame_equal(incremental.read(name), full.read(name), check_exact=False, rtol=1e-10)
+    assert len(full.read('9501.T_3y')) <= 250
+    assert full.exists('9501.T_weekly') == (multires == 'all')
+    if multires == 'all':
+        weekly = full.read('9501.T_weekly')
+        assert {'open', 'close', 'volume', 'sma_5', 'rsi', 'bb_upper'} <= set(weekly.columns)
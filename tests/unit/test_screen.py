@@ -0,0 +1,118 @@
+"""
+screen.py と最新スナップショット表（build_indicators.py の update_snapshot）のユニットテスト
+"""
+
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from build_indicators import (SNAPSHOT_NAME, SNAPSHOT_ROWS, process_symbol, process_symbols, process_symbols_panel,
+                              refresh_snapshot, update_snapshot)
+from conftest import SCRIPTS_DIR, make_ohlcv
+from screen import PRESETS, latest_frame, load_snapshot, screen
+from storage import CsvStorage
+
+
+def _build(root, histories, panel=False, **kwargs):
+    price = CsvStorage(root / 'price')
+    for symbol, df in histories.items():
+        price.write(symbol, df.assign(symbol=symbol))
+    process = process_symbols_panel if panel else process_symbols
+    results = process(list(histories), root / 'price', root / 'ind', **kwargs)
+    return update_snapshot(root / 'ind', [symbol for symbol, ok in results.items() if ok])
+
+
+def test_snapshot_matches_indicator_outputs(tmp_path):
+    table = _build(tmp_path, {'9501.T': make_ohlcv(120), '9502.T': make_ohlcv(120, seed=1)}, layout='both')
+
+    assert table['symbol'].value_counts().to_dict() == {'9501.T': SNAPSHOT_ROWS, '9502.T': SNAPSHOT_ROWS}
+    assert table.columns[:4].tolist() == ['symbol', 'date', 'close', 'volume']
+    combined = CsvStorage(tmp_path / 'ind').read('9502.T_indicators').iloc[-SNAPSHOT_ROWS:]
+    rows = table[table['symbol'] == '9502.T'].reset_index(drop=True)
+    pd.testing.assert_frame_equal(rows[combined.columns], combined.reset_index(drop=True), check_dtype=False)
+    pd.testing.assert_frame_equal(load_snapshot(tmp_path / 'ind'), table)
+
+
+def test_snapshot_follows_incremental_and_partial_updates(tmp_path):
+    history = make_ohlcv(130)
+    _build(tmp_path, {'9501.T': history.iloc[:120], '9502.T': make_ohlcv(120, seed=1)})
+    before = load_snapshot(tmp_path / 'ind')
+
+    CsvStorage(tmp_path / 'price').write('9501.T', history.iloc[:122].assign(symbol='9501.T'))
+    assert process_symbol('9501.T', tmp_path / 'price', tmp_path / 'ind', incremental=True)
+    table = update_snapshot(tmp_path / 'ind', ['9501.T'])
+
+    latest = table[table['symbol'] == '9501.T']
+    assert latest['date'].iloc[-1] == pd.Timestamp(history['Date'].iloc[121])
+    assert latest['date'].is_monotonic_increasing and len(latest) == SNAPSHOT_ROWS
+    assert np.allclose(latest['close'], history['Close'].iloc[117:122])
+    pd.testing.assert_frame_equal(table[table['symbol'] == '9502.T'], before[before['symbol'] == '9502.T'])
+
+
+def test_refresh_snapshot_skips_runs_without_rebuilt_symbols(tmp_path):
+    histories = {'9501.T': make_ohlcv(120), '9502.T': make_ohlcv(120, seed=1)}
+    table = _build(tmp_path, histories)
+    path = CsvStorage(tmp_path / 'ind').path(SNAPSHOT_NAME)
+    written = path.stat().st_mtime_ns
+
+    assert refresh_snapshot(tmp_path / 'ind', [], unchanged=list(histories)) is None
+    assert path.stat().st_mtime_ns == written
+
+    # 表がない場合は変更のない銘柄も含めて作成する
+    path.unlink()
+    pd.testing.assert_frame_equal(refresh_snapshot(tmp_path / 'ind', ['9502.T'], unchanged=['9501.T']), table)
+
+
+def test_panel_engine_snapshot_matches_per_symbol_loop(tmp_path):
+    histories = {'9501.T': make_ohlcv(120), '9502.T': make_ohlcv(120, seed=1).drop(index=[60])}
+    loop = _build(tmp_path / 'loop', histories)
+    panel = _build(tmp_path / 'panel', histories, panel=True)
+
+    # パネル方式でも出来高を含む同じカラムの表になる
+    assert panel.columns.tolist() == loop.columns.tolist()
+    pd.testing.assert_frame_equal(panel, loop, check_exact=False, rtol=1e-10)
+
+
+def test_latest_frame_adds_lagged_columns_and_screens():
+    snapshot = pd.DataFrame({
+        'symbol': ['A.T'] * 3 + ['B.T'] * 3,
+        'date': pd.to_datetime(['2024-01-04', '2024-01-05', '2024-01-08'] * 2),
+        'rsi': [40.0, 35.0, 25.0, 60.0, 72.0, 75.0],
+        'macd': [-1.0, -0.5, 0.2, 1.0, 1.2, 1.1],
+        'macd_signal': [0.0, 0.0, 0.0, 0.5, 0.8, 1.2],
+    }).sample(frac=1, random_state=0)
+    frame = latest_frame(snapshot, lags=2)
+
+    assert frame.loc['A.T', ['rsi', 'prev_rsi', 'prev2_rsi']].tolist() == [25.0, 35.0, 40.0]
+    assert screen(frame, [PRESETS['rsi_oversold']]).index.tolist() == ['A.T']
+    assert screen(frame, [PRESETS['macd_cross_up']]).index.tolist() == ['A.T']
+    assert screen(frame, [PRESETS['macd_cross_down']]).index.tolist() == ['B.T']
+    assert screen(frame, ['rsi < 30', 'rsi > 70'], match_any=True).index.tolist() == ['A.T', 'B.T']
+    assert screen(frame, ['rsi < 30', 'rsi > 70']).empty
+    with pytest.raises(ValueError):
+        screen(frame, ['unknown_column > 1'])
+    with pytest.raises(ValueError):
+        screen(frame, ['rsi + 1'])
+
+
+def test_screen_cli_writes_matches(tmp_path):
+    _build(tmp_path, {f"{9500 + i}.T": make_ohlcv(120, seed=i) for i in range(4)})
+    frame = latest_frame(load_snapshot(tmp_path / 'ind'))
+    expected = frame[frame['rsi'] > 0].sort_values('rsi').index[:2].tolist()
+
+    result = subprocess.run([sys.executable, str(SCRIPTS_DIR / 'screen.py'), '--indicator-dir', str(tmp_path / 'ind'),
+                             '--filter', 'rsi > 0', '--sort', 'rsi', '--limit', '2',
+                             '--output', str(tmp_path / 'out.json')],
+                            check=True, capture_output=True, text=True)
+    records = json.loads((tmp_path / 'out.json').read_text(encoding='utf-8'))
+    assert [record['symbol'] for record in records] == expected
+    assert list(records[0]) == ['symbol', 'date', 'close', 'rsi']
+    assert f"/ {len(frame)} 銘柄" in result.stdout
+
+    missing = subprocess.run([sys.executable, str(SCRIPTS_DIR / 'screen.py'), '--indicator-dir', str(tmp_path)],
+                             capture_output=True, text=True)
+    assert missing.returncode == 1 and SNAPSHOT_NAME in missing.stdout
@@ -0,0 +1,78 @@
+"""
+storage.py のユニットテスト
+"""
+
+import pandas as pd
+import pytest
+
+from conftest import make_ohlcv
+from storage import FORMATS, get_storage, iter_price_frames, read_frame, read_price_frame
+
+
+@pytest.fixture(params=FORMATS)
+def store(request, tmp_path):
+    if request.param == 'parquet':
+        pytest.importorskip('pyarrow')
+    return get_storage(request.param, tmp_path)
+
+
+def test_roundtrip_returns_typed_columns(store):
+    df = make_ohlcv(30)
+    df['symbol'] = '9501.T'
+    store.write('9501.T', df)
+
+    loaded = store.read('9501.T')
+
+    assert list(loaded.columns) == list(df.columns)
+    assert pd.api.types.is_datetime64_any_dtype(loaded['Date'])
+    assert loaded['Date'].dt.strftime('%Y-%m-%d').tolist() == df['Date'].tolist()
+    assert loaded['Close'].tolist() == df['Close'].tolist()
+    assert loaded['symbol'].tolist() == df['symbol'].tolist()
+    assert read_frame(store.path('9501.T'))['Volume'].tolist() == df['Volume'].tolist()
+
+
+def test_append_last_date_and_read_since(store):
+    df = make_ohlcv(30)
+    store.write('9501.T', df.iloc[:20])
+    store.append('9501.T', df.iloc[20:])
+
+    assert store.last_date('9501.T') == df['Date'].iloc[-1]
+    since = store.read_since('9501.T', df['Date'].iloc[25])
+    assert since['Date'].dt.strftime('%Y-%m-%d').tolist() == df['Date'].iloc[25:].tolist()
+    assert store.read('9501.T')['Close'].tolist() == df['Close'].tolist()
+
+
+def test_read_price_frame_uses_compact_dtypes(store):
+    df = make_ohlcv(30)
+    df['symbol'] = '9501.T'
+    store.write('9501.T', df)
+
+    compact = read_price_frame(store, '9501.T', price_dtype='float32', symbol='drop')
+    assert list(compact.columns) == ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+    assert compact['Close'].dtype == 'float32' and pd.api.types.is_datetime64_any_dtype(compact['Date'])
+    assert compact['Close'].tolist() == df['Close'].astype('float32').tolist()
+
+    categorical = read_price_frame(store, '9501.T')
+    assert categorical['symbol'].dtype == 'category' and categorical['Open'].dtype == 'float64'
+
+    tail = read_price_frame(store, '9501.T', since=df['Date'].iloc[25], columns=['close'], date_index=True)
+    assert list(tail.columns) == ['Close']
+    assert tail.index.strftime('%Y-%m-%d').tolist() == df['Date'].iloc[25:].tolist()
+
+
+def test_read_and_write_chunks(store):
+    df = make_ohlcv(25)
+    df['symbol'] = '9501.T'
+    store.write('9501.T', df)
+
+    chunks = list(iter_price_frames(store, '9501.T', 10, symbol='drop'))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert chunks[2].index.tolist() == list(range(20, 25))
+    assert 'symbol' not in chunks[0] and pd.api.types.is_datetime64_any_dtype(chunks[0]['Date'])
+
+    store.write_chunks('copy', store.read_chunks('9501.T', 10))
+    pd.testing.assert_frame_equal(store.read('copy'), store.read('9501.T'))
+
+
+def test_last_date_of_missing_file_is_none(store):
+    assert store.last_date('9999.T') is None
@@ -0,0 +1,84 @@
+"""
+universe.py のユニットテスト
+"""
+
+import pytest
+
+from conftest import make_ohlcv
+from storage import CsvStorage
+from universe import load_universe, resolve_symbols, stooq_symbol
+from validate_data import active_universe, check_price_frame, use_universe, validate_file
+
+
+def _write_universe(path):
+    path.write_text('# テスト用ユニバース\n'
+                    'symbol,name,stooq_symbol\n'
+                    '9501.T,東京電力HD,\n'
+                    '7203.T,トヨタ自動車,\n'
+                    'AAPL,Apple,AAPL.US\n', encoding='utf-8')
+    return str(path)
+
+
+def test_universe_maps_exchange_suffix_to_stooq(tmp_path):
+    universe = load_universe(_write_universe(tmp_path / 'universe.csv'))
+
+    assert universe.symbols == ('9501.T', '7203.T', 'AAPL')
+    assert '7203.T' in universe and '9502.T' not in universe
+    assert universe.stooq_symbol('9501.T') == '9501.JP'
+    assert universe.stooq_symbol('AAPL') == 'AAPL.US'
+    assert universe.stooq_symbol('9502.T') == stooq_symbol('9502.T') == '9502.JP'
+    assert stooq_symbol('AT.TO') == 'AT.TO'
+    assert load_universe(str(tmp_path / 'universe.csv')) is universe
+
+
+def test_default_universe_contains_published_symbols():
+    assert {'9501.T', '9502.T'} <= load_universe().index
+
+
+def test_resolve_symbols_expands_keyword_and_globs_stored_files(tmp_path):
+    universe = load_universe(_write_universe(tmp_path / 'universe.csv'))
+    store = CsvStorage(tmp_path / 'price')
+    for symbol in ['9501.T', '9502.T', '9503.T', '7203.T']:
+        store.write(symbol, make_ohlcv(5))
+    (tmp_path / 'price' / '.9504.T.csv.tmp').write_text('')
+
+    assert resolve_symbols(None, universe) == ['9501.T', '7203.T', 'AAPL']
+    assert resolve_symbols('95*.T', universe, store) == ['9501.T', '9502.T', '9503.T']
+    assert resolve_symbols('9502.T,universe,*', universe, store) == [
+        '9502.T', '9501.T', '7203.T', 'AAPL', '9503.T']
+    assert resolve_symbols('*', universe, CsvStorage(tmp_path / 'missing')) == []
+
+
+def test_price_validation_checks_symbols_against_universe(tmp_path):
+    prices = make_ohlcv(10).assign(symbol='7203.T')
+    try:
+        use_universe(_write_universe(tmp_path / 'universe.csv'))
+        assert '7203.T' in active_universe()
+        assert check_price_frame(prices.copy()) == ([], [])
+    finally:
+        use_universe(None)
+    _, violations = check_price_frame(prices.copy())
+    assert [v['rule'] for v in violations] == ['invalid_symbol']
+
+
+def test_wildcard_symbols_outside_universe_pass_validation(tmp_path):
+    store = CsvStorage(tmp_path / 'price')
+    store.write('9503.T', make_ohlcv(10).assign(symbol='9503.T'))
+    store.write('9504.T', make_ohlcv(10).assign(symbol='9999.T'))
+    try:
+        use_universe(_write_universe(tmp_path / 'universe.csv'))
+        assert resolve_symbols('950[34].T', active_universe(), store) == ['9503.T', '9504.T']
+
+        for chunk_rows in (None, 4):
+            assert validate_file(store.path('9503.T'), 'price', chunk_rows=chunk_rows)['valid']
+            mismatched = validate_file(store.path('9504.T'), 'price', chunk_rows=chunk_rows)
+            assert [v['rule'] for v in mismatched['violations']] == ['invalid_symbol']
+    finally:
+        use_universe(None)
+
+
+def test_universe_without_symbol_column_is_rejected(tmp_path):
+    path = tmp_path / 'universe.csv'
+    path.write_text('code,name\n9501.T,東京電力HD\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_universe(str(path))
@@ -0,0 +1,161 @@
+"""
+validate_data.py のユニットテスト
+"""
+
+import json
+import os
+
+import pandas as pd
+
+from build_indicators import process_symbol
+from conftest import make_ohlcv
+from storage import CsvStorage
+from validate_data import (MAX_REPORTED_ROWS, cache_key, check_price_frame, load_validation_cache,
+                           save_validation_cache, validate_file, validate_files, validate_indicator_frame)
+
+
+def _prices(n_rows=100):
+    df = make_ohlcv(n_rows)
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df.assign(symbol='9501.T')
+
+
+def test_price_violations_report_counts_and_first_rows():
+    df = _prices()
+    df.loc[[3, 40, 41], 'High'] = 0
+    df.loc[60:, 'Close'] *= 3
+    df.loc[7, 'symbol'] = 'XXXX'
+
+    errors, violations = check_price_frame(df)
+    by_rule = {v['rule']: v for v in violations}
+
+    assert by_rule['high_lt_open']['count'] == 3
+    assert by_rule['high_lt_open']['rows'] == [3, 40, 41]
+    assert by_rule['high_lt_close']['count'] == 3 + 40
+    assert len(by_rule['high_lt_close']['rows']) == MAX_REPORTED_ROWS
+    assert by_rule['pct_change']['rows'] == [60]
+    assert by_rule['pct_change']['values'][0].startswith('変動率=+')
+    assert by_rule['invalid_symbol']['values'] == ['XXXX']
+    assert len(errors) == len(violations)
+    assert 'high < close の行が存在します: 43行（' in errors[2] and errors[2].endswith('ほか）')
+
+
+def test_price_rows_refer_to_file_order_when_unsorted():
+    df = _prices().iloc[::-1].reset_index(drop=True)
+    df.loc[0, 'Volume'] = -1
+
+    _, violations = check_price_frame(df)
+    assert [(v['rule'], v['rows']) for v in violations] == [('negative_volume', [0])]
+
+
+def test_chunked_validation_matches_whole_file(tmp_path):
+    df = _prices(300)
+    df.loc[[5, 120, 121, 250], 'Volume'] = -1
+    df.loc[100, ['Close', 'High']] = df.loc[98, 'Close'] * 2
+    df.loc[99, 'Close'] = float('nan')  # 前日比は欠損値の前の終値から（チャンクの境界をまたぐ）
+    df.loc[200, 'symbol'] = 'XXXX'
+    CsvStorage(tmp_path / 'price').write('9501.T', df)
+    assert process_symbol('9501.T', tmp_path / 'price', tmp_path / 'ind', layout='combined')
+
+    for path, data_type in [(tmp_path / 'price' / '9501.T.csv', 'price'),
+                            (tmp_path / 'ind' / '9501.T_indicators.csv', 'indicators')]:
+        assert validate_file(path, data_type, chunk_rows=50) == validate_file(path, data_type)
+    violations = validate_file(tmp_path / 'price' / '9501.T.csv', 'price', chunk_rows=50)['violations']
+    by_rule = {v['rule']: v for v in violations}
+    assert by_rule['negative_volume']['rows'] == [5, 120, 121, 250]
+    assert by_rule['pct_change']['rows'][0] == 100
+
+
+def test_indicator_files_validate_clean_and_flag_violations(tmp_path):
+    CsvStorage(tmp_path / 'price').write('9501.T', make_ohlcv(120))
+    process_symbol('9501.T', tmp_path / 'price', tmp_path / 'ind', layout='both')
+    store = CsvStorage(tmp_path / 'ind')
+
+    for indicator_type in ['sma', 'rsi', 'macd', 'bb', 'indicators']:
+        result = validate_file(store.path(f"9501.T_{indicator_type}"), indicator_type)
+        assert result['valid'], result['errors']
+
+    combined = store.read('9501.T_indicators').drop(columns=['sma_75'])
+    combined.loc[50, 'rsi'] = 120
+    combined.loc[60, 'bb_upper'] = 0
+    assert validate_indicator_frame(combined, 'indicators') == [
+        '必須カラム不足: sma_75',
+        f"RSIが範囲外（0～100）: 1行（{combined['date'][50]:%Y-%m-%d} RSI=120.00）",
+        f"bb_upper < bb_middle の行が存在します: 1行（{combined['date'][60]:%Y-%m-%d}）",
+    ]
+
+
+def _build_files(tmp_path):
+    price = CsvStorage(tmp_path / 'price')
+    for i, symbol in enumerate(['9501.T', '9502.T']):
+        price.write(symbol, make_ohlcv(120, seed=i))
+        process_symbol(symbol, tmp_path / 'price', tmp_path / 'ind')
+    indicators = CsvStorage(tmp_path / 'ind')
+    return [(price.path(symbol), 'price') for symbol in ['9501.T', '9502.T']] + [
+        (indicators.path(f"{symbol}_{indicator_type}"), indicator_type)
+        for symbol in ['9501.T', '9502.T'] for indicator_type in ['sma', 'rsi', 'macd', 'bb']
+    ]
+
+
+def test_validation_cache_skips_unchanged_files(tmp_path):
+    tasks = _build_files(tmp_path)
+    cache_path = tmp_path / 'validation_cache.json'
+
+    cache = load_validation_cache(cache_path)
+    first = validate_files(tasks, cache, jobs=2)
+    save_validation_cache(cache_path, cache)
+    assert not any(cached for _, cached in first)
+
+    # 更新日時のみ変わったファイルは内容のハッシュで、内容が変わったファイルは再検証
+    price_path = tasks[0][0]
+    os.utime(tasks[2][0], ns=(0, 0))
+    price_path.write_text(price_path.read_text() + 'broken\n')
+
+    cache = load_validation_cache(cache_path)
+    second = validate_files(tasks, cache)
+    assert [cached for _, cached in second] == [False] + [True] * (len(tasks) - 1)
+    assert not second[0][0]['valid']
+    assert [result for result, _ in second[1:]] == [result for result, _ in first[1:]]
+    assert cache[cache_key(*tasks[2])]['mtime_ns'] == 0
+
+
+def test_validation_cache_is_dropped_when_validator_version_changes(tmp_path):
+    tasks = _build_files(tmp_path)[:1]
+    cache_path = tmp_path / 'validation_cache.json'
+    cache = {}
+    validate_files(tasks, cache)
+    save_validation_cache(cache_path, cache)
+
+    manifest = json.loads(cache_path.read_text())
+    manifest['validator_version'] = '0.0.0'
+    cache_path.write_text(json.dumps(manifest))
+    assert load_validation_cache(cache_path) == {}
+
+
+def test_verify_recompute_detects_stale_and_drifted_indicators(tmp_path):
+    price = CsvStorage(tmp_path / 'price')
+    history = make_ohlcv(120)
+    price.write('9501.T', history)
+    process_symbol('9501.T', price.directory, tmp_path / 'ind', layout='both')
+    indicators = CsvStorage(tmp_path / 'ind')
+    tasks = [(indicators.path(f"9501.T_{indicator_type}"), 'recompute', price.path('9501.T'))
+             for indicator_type in ['sma', 'macd', 'indicators']]
+
+    cache = {}
+    assert all(result['valid'] for result, _ in validate_files(tasks, cache))
+
+    # 過去の終値の訂正と新しい日付の追加（指標は未更新）
+    revised = make_ohlcv(121)
+    revised.loc[100, 'Close'] += 50
+    price.write('9501.T', revised)
+
+    outcomes = validate_files(tasks, cache)
+    assert not any(cached for _, cached in outcomes)
+    sma = {v['rule']: v for v in outcomes[0][0]['violations']}
+    assert sma['missing_rows']['dates'] == [revised['Date'][120]]
+    assert sma['missing_rows']['rows'] == [-1]
+    assert sma['drift_sma_5']['count'] == 5
+    assert sma['drift_sma_5']['rows'][0] == 100
+    assert outcomes[0][0]['errors'][0] == '行数不一致: 指標 120行 / 株価データ 121行'
+    assert 'drift_macd' in {v['rule'] for v in outcomes[1][0]['violations']}
+    assert {'drift_sma_5', 'drift_rsi', 'drift_bb_upper'} <= {v['rule'] for v in outcomes[2][0]['violations']}